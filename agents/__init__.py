@@ -1,92 +1,110 @@
 """
 Agent module initialization file.
-This file dynamically exports all agent factory functions from the agents package.
+This file exports all agent factory functions declared in the agent manifest.
+Agent modules are imported lazily, the first time one of their agents is built.
 """
 
-import os
-import importlib
+import copy
 import inspect
-from typing import Optional
-
-from agno.agent import Agent
-from agno.knowledge.knowledge import Knowledge
-from agno.memory import MemoryManager
-from agno.models.base import Model
-
-# Dynamically discover and import agent modules
-agent_modules = {}
-agent_factory_funcs = {}
-current_dir = os.path.dirname(os.path.abspath(__file__))
-
-# Find all potential agent modules (files ending with _agent.py)
-for filename in os.listdir(current_dir):
-    if filename.endswith('_agent.py') and filename != '__init__.py':
-        module_name = filename[:-3]  # Remove .py extension
-        
-        # Skip commented out modules
-        #if module_name == 'crawler_agent':
-        #    continue
-            
-        try:
-            # Import the module
-            module = importlib.import_module(f'.{module_name}', package='agents')
-            agent_modules[module_name] = module
-            
-            # Find factory functions (those starting with create_)
-            for name, obj in inspect.getmembers(module):
-                if name.startswith('create_') and inspect.isfunction(obj):
-                    agent_factory_funcs[name] = obj
-                    # Make the function available at the package level
-                    globals()[name] = obj
-        except ImportError as e:
-            print(f"Warning: Could not import agent module {module_name}: {e}")
-
-# Dynamically build __all__ list from discovered factory functions
-__all__ = list(agent_factory_funcs.keys()) + ["get_agent"]
+import os
+from typing import TYPE_CHECKING, Optional
+
+from agents.manifest import AGENT_MANIFEST, agent_ids, agent_options, get_spec, load_factory
+from resources import TemplatePool
+
+if TYPE_CHECKING:
+    # Type hints only, so importing the package for the manifest stays cheap
+    from agno.agent import Agent
+    from agno.knowledge.knowledge import Knowledge
+    from agno.memory import MemoryManager
+    from agno.models.base import Model
+
+# Factory function names (e.g. create_pubmed_agent) mapped to agent ids
+_factory_names = {spec.function_name: spec.id for spec in AGENT_MANIFEST}
+
+# Build __all__ list from the manifest
+__all__ = list(_factory_names) + [
+    "get_agent", "agent_ids", "agent_options", "agent_pool", "AGENT_MANIFEST",
+]
+
+
+def __getattr__(name: str):
+    """Import factory functions such as ``create_pubmed_agent`` on first access."""
+    if name in _factory_names:
+        return load_factory(_factory_names[name])
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def _accepts_debug_mode(factory) -> bool:
+    """Check whether a factory function takes a debug_mode argument."""
+    parameters = inspect.signature(factory).parameters.values()
+    return any(p.name == "debug_mode" or p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+
+# Prebuilt agent templates, shared by every team in the process and cloned per team
+agent_pool = TemplatePool("agent", max_size=int(os.getenv("HALO_AGENT_POOL_SIZE", "64")))
+
+
+def _build_agent(
+    agent_name: str, model: "Model", memory: "MemoryManager", knowledge: "Knowledge", debug_mode: bool
+) -> "Agent":
+    """Build an agent with its factory function, importing its module if needed."""
+    factory = load_factory(agent_name)
+    if _accepts_debug_mode(factory):
+        return factory(model, memory, knowledge, debug_mode=debug_mode)
+    return factory(model, memory, knowledge)
+
+
+def _clone_agent(template: "Agent") -> "Agent":
+    """Return a lightweight clone of an agent template.
+
+    The clone shares the model, toolkits (with their function schemas) and knowledge
+    of the template. Top-level dicts and lists are copied so per-team state stays
+    separate.
+    """
+    agent = copy.copy(template)
+    for attr, value in vars(template).items():
+        # type() rather than isinstance() so lazy resource proxies are not resolved
+        if type(value) in (dict, list):
+            setattr(agent, attr, copy.copy(value))
+    return agent
+
 
 def get_agent(
-    agent_name: str, model: Model, memory: MemoryManager, knowledge: Knowledge,
+    agent_name: str, model: "Model", memory: "MemoryManager", knowledge: "Knowledge",
     debug_mode: bool = True
-) -> Optional[Agent]:
+) -> Optional["Agent"]:
     """
     Get an agent by name.
-    
+
+    Agents are built once per (name, model, memory, knowledge, debug_mode) and
+    every call returns a cheap clone of that template.
+
     Args:
         agent_name: The name of the agent to get
         model: The model to use for the agent
         memory: The memory to use for the agent
         knowledge: The knowledge to use for the agent
         debug_mode: Whether to enable debug mode for the agent
-        
+
     Returns:
         An Agent instance if the agent_name is recognized, None otherwise
     """
-    # Dynamically build agent factories dictionary
-    agent_factories = {}
-    
-    # Map agent names to their factory functions
-    for func_name, func in agent_factory_funcs.items():
-        # Extract agent name from function name (remove 'create_' and '_agent' if present)
-        name = func_name.replace('create_', '', 1)
-        if name.endswith('_agent'):
-            name = name[:-6]
-        agent_factories[name] = func
-    
-    # Get the factory function for the requested agent
-    factory = agent_factories.get(agent_name)
-    
-    # If the factory exists, create and return the agent
-    if factory:
-        # Enable debug mode specifically for MCP agents to show raw MCP responses
-        if agent_name in ["airbnb", "onlyfy_mcp"]:
-            return factory(model, memory, knowledge, debug_mode=debug_mode)
-        else:
-            try:
-                # Try with debug_mode parameter first
-                return factory(model, memory, knowledge, debug_mode=debug_mode)
-            except TypeError:
-                # Fall back to standard parameters if debug_mode isn't supported
-                return factory(model, memory, knowledge)
-    
     # If no factory exists for the agent name, return None
-    return None
\ No newline at end of file
+    if get_spec(agent_name) is None:
+        return None
+
+    # Factories copy the model, so templates are keyed by its configuration rather than its identity
+    key = (
+        agent_name,
+        type(model).__qualname__,
+        getattr(model, "id", None),
+        id(memory),
+        id(knowledge),
+        debug_mode,
+    )
+    return agent_pool.checkout(
+        key,
+        builder=lambda: _build_agent(agent_name, model, memory, knowledge, debug_mode),
+        overlay=_clone_agent,
+    )
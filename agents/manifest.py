@@ -0,0 +1,125 @@
+"""
+Declared manifest of the agents available to HALO teams.
+
+The sidebar, the configuration page and ``agents.get_agent`` read agent ids and
+display names from here, so listing agents never imports the agent modules.
+A factory module is only imported when its agent is actually built.
+
+Run ``python -m agents.manifest`` to check the manifest against the
+``*_agent.py`` modules in this package.
+"""
+
+import importlib
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class AgentSpec(NamedTuple):
+    """Manifest entry of an agent."""
+
+    id: str
+    display_name: str
+    factory: str  # "module:function"
+
+    @property
+    def module_name(self) -> str:
+        return self.factory.split(":", 1)[0]
+
+    @property
+    def function_name(self) -> str:
+        return self.factory.split(":", 1)[1]
+
+
+AGENT_MANIFEST = (
+    AgentSpec("calculator", "Calculator", "agents.calculator_agent:create_calculator_agent"),
+    AgentSpec("data_analyst", "Data Analyst", "agents.data_analyst_agent:create_data_analyst_agent"),
+    AgentSpec("folder_image", "Folder Image", "agents.folder_image_agent:create_folder_image_agent"),
+    AgentSpec("gptimage1", "Image Agent", "agents.gptimage1_agent:create_gptimage1_agent"),
+    AgentSpec("medical_imaging", "Medical Imaging", "agents.medical_imaging_agent:create_medical_imaging_agent"),
+    AgentSpec("pubmed", "Pubmed", "agents.pubmed_agent:create_pubmed_agent"),
+    AgentSpec("research", "Research", "agents.research_agent:create_research_agent"),
+    AgentSpec("visualizer", "Visualizer", "agents.visualizer_agent:create_visualizer_agent"),
+    AgentSpec("youtube", "Youtube", "agents.youtube_agent:create_youtube_agent"),
+)
+
+_specs_by_id: Dict[str, AgentSpec] = {spec.id: spec for spec in AGENT_MANIFEST}
+_factories: Dict[str, Callable] = {}
+_factories_lock = threading.Lock()
+
+
+def agent_ids() -> List[str]:
+    """Return the ids of all agents in the manifest."""
+    return list(_specs_by_id)
+
+
+def agent_options() -> Dict[str, str]:
+    """Return a dictionary mapping display names to agent ids."""
+    return {spec.display_name: spec.id for spec in AGENT_MANIFEST}
+
+
+def get_spec(agent_id: str) -> Optional[AgentSpec]:
+    """Return the manifest entry of an agent, or None if the id is unknown."""
+    return _specs_by_id.get(agent_id)
+
+
+def load_factory(agent_id: str) -> Optional[Callable]:
+    """Import the module of an agent on first use and return its factory function.
+
+    Args:
+        agent_id: Id of the agent in the manifest
+
+    Returns:
+        The factory function, or None if the id is unknown
+    """
+    try:
+        return _factories[agent_id]
+    except KeyError:
+        pass
+
+    spec = _specs_by_id.get(agent_id)
+    if spec is None:
+        return None
+
+    with _factories_lock:
+        if agent_id not in _factories:
+            module = importlib.import_module(spec.module_name)
+            _factories[agent_id] = getattr(module, spec.function_name)
+        return _factories[agent_id]
+
+
+def scan_agent_modules() -> Dict[str, str]:
+    """Import every ``*_agent.py`` module and return the factories found, as ``{id: "module:function"}``.
+
+    This is the slow discovery the manifest replaces; it is only used to check the manifest.
+    """
+    import inspect
+    import os
+
+    agents_dir = os.path.dirname(os.path.abspath(__file__))
+    found = {}
+    for filename in sorted(os.listdir(agents_dir)):
+        if not filename.endswith("_agent.py"):
+            continue
+        module_name = f"agents.{filename[:-3]}"
+        module = importlib.import_module(module_name)
+        for name, obj in inspect.getmembers(module, inspect.isfunction):
+            if name.startswith("create_") and obj.__module__ == module_name:
+                agent_id = name.replace("create_", "", 1)
+                if agent_id.endswith("_agent"):
+                    agent_id = agent_id[:-6]
+                # Later modules win, as with the old directory scan
+                found[agent_id] = f"{module_name}:{name}"
+    return found
+
+
+if __name__ == "__main__":
+    scanned = scan_agent_modules()
+    declared = {spec.id: spec.factory for spec in AGENT_MANIFEST}
+    for agent_id in sorted(set(scanned) | set(declared)):
+        if agent_id not in declared:
+            print(f"Missing from manifest: {agent_id} ({scanned[agent_id]})")
+        elif agent_id not in scanned:
+            print(f"Declared but not found: {agent_id} ({declared[agent_id]})")
+        elif scanned[agent_id] != declared[agent_id]:
+            print(f"Factory differs for {agent_id}: declared {declared[agent_id]}, found {scanned[agent_id]}")
+    print(f"{len(declared)} agents declared, {len(scanned)} found")
@@ -13,6 +13,7 @@ import sys
 import asyncio
 import os
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
@@ -101,7 +102,7 @@ FULL_INSTRUCTIONS = BASE_PROMPT + ANALYSIS_TEMPLATE
 
 # Initialize the Medical Imaging Expert agent
 from agno.models.base import Model
-from agno.models.openai import OpenAIResponses
+from http_pool import PooledOpenAIResponses
 
 def create_medical_imaging_agent(
     model: Model, memory: MemoryManager, knowledge: Knowledge
@@ -123,7 +124,7 @@ def create_medical_imaging_agent(
     return Agent(
         name="Medical Imaging and Search Expert",
         role="Specialized medical imaging radiologist for educational analysis",
-        model=OpenAIResponses(id="gpt-5"),
+        model=PooledOpenAIResponses(id="gpt-5"),
         # Give the Agent the ability to update memories
         enable_agentic_memory=True,
         # OR - Run the MemoryManager automatically after each response
@@ -141,21 +142,36 @@ def create_medical_imaging_agent(
         add_history_to_context=True
     )
 
-# Create default agent instance for backward compatibility
+# Default agent instance for backward compatibility, built on first use
 # Note: This is deprecated - use create_medical_imaging_agent() factory function instead
-from agno.models.openai import OpenAIResponses
-agent = Agent(
-    name="Medical Imaging and Search Expert",
-    role="Specialized medical imaging radiologist for educational analysis",
-    model=OpenAIResponses(id="gpt-5"),  # Use GPT-4o for vision capabilities
-    instructions=FULL_INSTRUCTIONS,
-    tools=[{"type": "web_search_preview"}, PubmedTools()],  # Enable OpenAI tools for medical literature
-    markdown=True,  # Enable markdown formatting for structured output
-    debug_mode=True,
-    #show_tool_calls=True,
-    exponential_backoff=True,
-    #add_datetime_to_instructions=True
-)
+_default_agent: Optional[Agent] = None
+
+
+def get_default_agent() -> Agent:
+    """Return the standalone medical imaging agent used by the Medical Image Analysis page."""
+    global _default_agent
+    if _default_agent is None:
+        _default_agent = Agent(
+            name="Medical Imaging and Search Expert",
+            role="Specialized medical imaging radiologist for educational analysis",
+            model=PooledOpenAIResponses(id="gpt-5"),  # Use GPT-4o for vision capabilities
+            instructions=FULL_INSTRUCTIONS,
+            tools=[{"type": "web_search_preview"}, PubmedTools()],  # Enable OpenAI tools for medical literature
+            markdown=True,  # Enable markdown formatting for structured output
+            debug_mode=True,
+            #show_tool_calls=True,
+            exponential_backoff=True,
+            #add_datetime_to_instructions=True
+        )
+    return _default_agent
+
+
+def __getattr__(name: str):
+    # Keep `from agents.medical_agent import agent` working without building the agent at import
+    if name == "agent":
+        return get_default_agent()
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
 
 # Example usage
 if __name__ == "__main__":
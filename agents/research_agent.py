@@ -12,7 +12,7 @@ from agno.agent import Agent
 from agno.knowledge.knowledge import Knowledge
 from agno.memory import MemoryManager
 from agno.models.base import Model
-from agno.models.openai import OpenAIResponses
+from http_pool import PooledOpenAIResponses
 #from agno.tools.duckduckgo import DuckDuckGoTools
 #from agno.tools.pubmed import PubmedTools
 #from agno.tools.openai import OpenAITools
@@ -37,7 +37,7 @@ def create_research_agent(
     return Agent(
         name="Research Agent",
         role="Conduct comprehensive research and produce in-depth reports",
-        model=OpenAIResponses(id="gpt-5"),
+        model=PooledOpenAIResponses(id="gpt-5"),
         #memory=memory,
         # Give the Agent the ability to update memories
         enable_agentic_memory=True,
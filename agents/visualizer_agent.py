@@ -10,7 +10,7 @@ from agno.agent import Agent
 from agno.knowledge.knowledge import Knowledge
 from agno.memory import MemoryManager
 from agno.models.base import Model
-from agno.models.openai import OpenAIChat
+from http_pool import PooledOpenAIChat
 from agno.tools.visualization import VisualizationTools
 
 def create_visualizer_agent(
@@ -35,7 +35,7 @@ def create_visualizer_agent(
         name="Visualizer",
         role="You are a data visualization expert and business analyst.",
         #model=model_copy,
-        model=OpenAIChat(id="gpt-4o"),
+        model=PooledOpenAIChat(id="gpt-4o"),
         #memory=memory,
         # Give the Agent the ability to update memories
         enable_agentic_memory=True,
@@ -0,0 +1,11 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+
+
+def percentile(values, q):
+    """Nearest-rank percentile q (0-100) of a list of values, or None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,141 @@
+"""
+Recall@k versus latency of flat and indexed vector search on a LanceDB table.
+
+Builds a table of synthetic clustered embeddings (the row format of agno's
+LanceDb), computes the exact nearest neighbours of random queries with numpy,
+and runs the queries as a flat scan and through each ANN index type of
+knowledge_index.py with a range of search settings (nprobes, ef,
+refine_factor). For every configuration it reports recall@k against the exact
+neighbours and query latency percentiles, plus the index build time.
+
+Usage:
+    python benchmarks/ann_recall.py [--rows 50000] [--dim 256] [--queries 200] [--k 10] [--index ivf_hnsw_sq,ivf_pq]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+import lancedb  # noqa: E402
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from benchmarks._common import percentile  # noqa: E402
+from knowledge_index import ANN_INDEX_TYPES, create_ann_index  # noqa: E402
+
+# Search settings tried per index type: (nprobes, ef, refine_factor)
+SETTINGS = {
+    "ivf_hnsw_sq": [(1, 20, None), (4, 50, None), (10, 100, None), (20, 200, None)],
+    "ivf_pq": [(5, None, None), (20, None, None), (20, None, 5), (50, None, 10)],
+}
+
+
+def synthetic_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Normalized vectors around random cluster centers, like embeddings of related documents."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.35 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_table(path: str, vectors: np.ndarray):
+    dim = vectors.shape[1]
+    schema = pa.schema([
+        pa.field("id", pa.string()),
+        pa.field("vector", pa.list_(pa.float32(), dim)),
+        pa.field("payload", pa.string()),
+    ])
+    table = lancedb.connect(path).create_table("knowledge", schema=schema)
+    for start in range(0, len(vectors), 10000):
+        chunk = vectors[start:start + 10000]
+        table.add(pa.table({
+            "id": [str(i) for i in range(start, start + len(chunk))],
+            "vector": pa.FixedSizeListArray.from_arrays(pa.array(chunk.reshape(-1)), dim),
+            "payload": ["{}"] * len(chunk),
+        }, schema=schema))
+    return table
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    # Smallest l2 distance == largest dot product for normalized vectors
+    scores = queries @ vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_queries(table, queries: np.ndarray, truth: np.ndarray, k: int, flat: bool = False,
+                nprobes=None, ef=None, refine_factor=None):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        builder = table.search(query.tolist(), vector_column_name="vector").limit(k).select(["id"])
+        if flat:
+            builder = builder.bypass_vector_index()
+        if nprobes:
+            builder = builder.nprobes(nprobes)
+        if ef:
+            builder = builder.ef(ef)
+        if refine_factor:
+            builder = builder.refine_factor(refine_factor)
+        began = time.perf_counter()
+        found = builder.to_arrow()["id"].to_pylist()
+        latencies.append((time.perf_counter() - began) * 1000)
+        recalls.append(len({int(i) for i in found} & set(expected.tolist())) / k)
+    return {
+        "recall_at_k": round(statistics.fmean(recalls), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure recall@k and latency of flat and indexed vector search")
+    parser.add_argument("--rows", type=int, default=50000, help="Rows in the table")
+    parser.add_argument("--dim", type=int, default=256, help="Vector dimensions (text-embedding-3-small: 1536)")
+    parser.add_argument("--clusters", type=int, default=200, help="Clusters of the synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--index", default=",".join(ANN_INDEX_TYPES), help="Comma separated ANN index types")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.rows, args.dim, args.clusters, args.seed)
+    # Queries close to stored documents: the first rows with some noise
+    queries = synthetic_vectors(args.queries, args.dim, args.clusters, args.seed)
+    queries = queries + 0.05 * np.random.default_rng(args.seed + 1).standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = exact_neighbours(vectors, queries, args.k)
+
+    results = {"rows": args.rows, "dim": args.dim, "queries": args.queries, "k": args.k, "configs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        began = time.perf_counter()
+        table = build_table(tmp, vectors)
+        results["load_seconds"] = round(time.perf_counter() - began, 2)
+        results["configs"].append({"search": "flat", **run_queries(table, queries, truth, args.k, flat=True)})
+        for index_type in [name.strip() for name in args.index.split(",") if name.strip()]:
+            began = time.perf_counter()
+            create_ann_index(table, "vector", args.rows, index_type)
+            build_seconds = round(time.perf_counter() - began, 2)
+            for nprobes, ef, refine_factor in SETTINGS.get(index_type, [(None, None, None)]):
+                results["configs"].append({
+                    "search": index_type,
+                    "build_seconds": build_seconds,
+                    "nprobes": nprobes,
+                    "ef": ef,
+                    "refine_factor": refine_factor,
+                    **run_queries(table, queries, truth, args.k, nprobes=nprobes, ef=ef, refine_factor=refine_factor),
+                })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
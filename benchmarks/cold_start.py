@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark for the Home page.
+
+Runs the first script run of ``pages/Home.py`` in a fresh interpreter and reports
+how long it took, which shared resources were built and whether LanceDB was
+loaded. Loading the Home page should not pay for the knowledge base until it is
+actually used.
+
+Usage:
+    python benchmarks/cold_start.py [--runs 3] [--check]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Executed in a fresh interpreter so every run is a real cold start
+CHILD_SCRIPT = r"""
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import halo
+import_seconds = time.perf_counter() - start
+
+from streamlit.testing.v1 import AppTest
+
+start = time.perf_counter()
+app = AppTest.from_file("pages/Home.py", default_timeout=300)
+app.run()
+first_run_seconds = time.perf_counter() - start
+
+from resources import registry
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "first_run_seconds": first_run_seconds,
+    "exceptions": [e.message for e in app.exception],
+    "lancedb_loaded": "lancedb" in sys.modules,
+    "resources": registry.stats(),
+}))
+"""
+
+
+def run_once() -> dict:
+    """Run a single cold start in a subprocess and return its measurements."""
+    env = dict(os.environ)
+    # Page loads must not reach the LLM; a dummy key keeps model construction happy
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The child logs to stdout as well, the measurements are on the last line
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of the Home page")
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold starts to measure")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with an error if the knowledge base was built during page load",
+    )
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    summary = {
+        "runs": args.runs,
+        "import_seconds_median": statistics.median(r["import_seconds"] for r in runs),
+        "first_run_seconds_median": statistics.median(r["first_run_seconds"] for r in runs),
+        "lancedb_loaded": any(r["lancedb_loaded"] for r in runs),
+        "knowledge_built": any(r["resources"]["halo_knowledge"]["built"] for r in runs),
+        "resources": runs[-1]["resources"],
+        "exceptions": runs[-1]["exceptions"],
+    }
+    print(json.dumps(summary, indent=2))
+
+    if args.check and (summary["lancedb_loaded"] or summary["knowledge_built"]):
+        print("Home page cold start paid for the knowledge base", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
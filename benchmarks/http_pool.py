@@ -0,0 +1,157 @@
+"""
+Benchmark of the shared HTTP client pool against a local OpenAI-compatible stub.
+
+Simulates chat turns in which every member of a team sends one chat completion
+request, once with agno's default OpenAIChat (a new HTTP client per request) and
+once with PooledOpenAIChat. The stub server counts the TCP connections it
+accepts, so connection reuse is visible next to the timings.
+
+Usage:
+    python benchmarks/http_pool.py [--turns 20] [--members 6] [--latency-ms 5] [--mode sync|async|both]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+from agno.models.openai import OpenAIChat  # noqa: E402
+
+from http_pool import PooledOpenAIChat, http_pool  # noqa: E402
+
+COMPLETION = json.dumps({
+    "id": "chatcmpl-benchmark",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}).encode()
+
+
+class StubServer(ThreadingHTTPServer):
+    """OpenAI-compatible stub that answers every POST with a fixed chat completion."""
+
+    daemon_threads = True
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), StubHandler)
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def reset(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without this Nagle's algorithm adds ~40ms per response
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.server._lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(COMPLETION)))
+        self.end_headers()
+        self.wfile.write(COMPLETION)
+
+    def log_message(self, format, *args):
+        pass
+
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def run_sync(model_class, base_url, turns, members):
+    for _ in range(turns):
+        # create_halo builds a fresh model per team, and every member gets its own copy
+        models = [model_class(id="stub", base_url=base_url) for _ in range(members)]
+        for model in models:
+            model.get_client().chat.completions.create(model=model.id, messages=MESSAGES)
+
+
+def run_async(model_class, base_url, turns, members):
+    async def turn():
+        models = [model_class(id="stub", base_url=base_url) for _ in range(members)]
+        await asyncio.gather(*[
+            model.get_async_client().chat.completions.create(model=model.id, messages=MESSAGES) for model in models
+        ])
+
+    for _ in range(turns):
+        # Streamlit runs every script run in a new event loop
+        asyncio.run(turn())
+
+
+def measure(server, runner, model_class, base_url, turns, members):
+    server.reset()
+    start = time.perf_counter()
+    runner(model_class, base_url, turns, members)
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "ms_per_request": elapsed * 1000 / (turns * members),
+        "requests": server.requests,
+        "connections": server.connections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default and pooled HTTP clients against a local stub")
+    parser.add_argument("--turns", type=int, default=20, help="Number of chat turns")
+    parser.add_argument("--members", type=int, default=6, help="Requests per turn (one per team member)")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Simulated server latency per request")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = parser.parse_args()
+
+    server = StubServer(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    runners = {"sync": run_sync, "async": run_async}
+    results = {}
+    for mode in modes:
+        results[mode] = {
+            "default": measure(server, runners[mode], OpenAIChat, base_url, args.turns, args.members),
+            "pooled": measure(server, runners[mode], PooledOpenAIChat, base_url, args.turns, args.members),
+        }
+
+    server.shutdown()
+    print(json.dumps({
+        "turns": args.turns,
+        "members": args.members,
+        "latency_ms": args.latency_ms,
+        "results": results,
+        "pool": http_pool.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Retrieval benchmark of the knowledge base at growing corpus sizes.
+
+Generates synthetic medical notes shaped like demo_data/medical_history.txt
+(one chunk per section: demographics, chief complaint, history, examination,
+laboratory, imaging, assessment), embeds them with a deterministic local
+hashing embedder (no network) and loads them into a fresh LanceDB table the
+way ``HaloKnowledge.sync`` does: batched embedding, agno's row format, then
+``knowledge_index.ensure_indexes``. For every scale it reports:
+
+- ingest throughput (chunks/s) and the time spent building the indexes
+- the size of the table on disk
+- query latency p50/p99 of agno's vector, keyword and hybrid search
+
+The retrieval cache is disabled, so every query reaches LanceDB. The output is
+JSON, to be kept and compared across changes.
+
+Usage:
+    python benchmarks/retrieval.py [--scales 1k,100k] [--dim 1536] [--queries 200] [--k 10] [--output results.json]
+
+The 1M scale (``--scales 1k,100k,1m``) needs about 6 GB of disk at 1536 dimensions.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+# Measure LanceDB, not the in-memory retrieval cache
+os.environ["RETRIEVAL_CACHE_QUERIES"] = "0"
+os.environ["RETRIEVAL_CACHE_RESULTS"] = "0"
+
+import numpy as np  # noqa: E402
+from agno.knowledge.document import Document  # noqa: E402
+from agno.knowledge.embedder.base import Embedder  # noqa: E402
+from agno.utils.log import set_log_level_to_warning  # noqa: E402
+from agno.vectordb.lancedb import LanceDb, SearchType  # noqa: E402
+
+from benchmarks._common import percentile  # noqa: E402
+from knowledge import HaloKnowledge  # noqa: E402
+from knowledge_index import ensure_indexes, index_status, mark_existing_indexes  # noqa: E402
+
+# Clinical pictures the notes are drawn from: complaint, symptoms, findings, labs, imaging, diagnosis
+CONDITIONS = [
+    ("persistent abdominal pain and diarrhea", ["crampy right lower quadrant pain", "loose non-bloody stools", "fatigue", "weight loss"],
+     ["tenderness in the right lower quadrant", "no rebound tenderness"], ["CRP elevated", "fecal calprotectin elevated", "hemoglobin low (mild anemia)"],
+     "Colonoscopy: patchy inflammation with ulcerations in the terminal ileum; cobblestone appearance", "Crohn's disease"),
+    ("bloody diarrhea and urgency", ["bloody stools", "tenesmus", "abdominal cramps"], ["diffuse lower abdominal tenderness"],
+     ["ESR elevated", "albumin low", "fecal calprotectin elevated"], "Colonoscopy: continuous mucosal inflammation from the rectum", "Ulcerative colitis"),
+    ("chest pain on exertion", ["retrosternal pressure", "dyspnea on exertion", "diaphoresis"], ["regular rhythm", "no murmurs"],
+     ["troponin mildly elevated", "LDL cholesterol high"], "ECG: ST depression in the lateral leads; echocardiogram: preserved ejection fraction", "Stable angina"),
+    ("shortness of breath and ankle swelling", ["orthopnea", "paroxysmal nocturnal dyspnea", "bilateral leg edema"], ["bibasal crackles", "raised jugular venous pressure"],
+     ["NT-proBNP elevated", "creatinine mildly elevated"], "Chest X-ray: cardiomegaly and pleural effusions", "Heart failure with reduced ejection fraction"),
+    ("productive cough and fever", ["cough with green sputum", "fever", "pleuritic chest pain"], ["bronchial breath sounds over the right base"],
+     ["WBC elevated", "CRP elevated", "procalcitonin elevated"], "Chest X-ray: right lower lobe consolidation", "Community-acquired pneumonia"),
+    ("excessive thirst and frequent urination", ["polyuria", "polydipsia", "blurred vision"], ["dry mucous membranes"],
+     ["HbA1c 9.1%", "fasting glucose elevated", "ketones negative"], "Fundoscopy: mild non-proliferative retinopathy", "Type 2 diabetes mellitus"),
+    ("headaches and high blood pressure readings", ["morning occipital headaches", "palpitations"], ["blood pressure 168/102 mmHg"],
+     ["potassium normal", "urine albumin-to-creatinine ratio elevated"], "Echocardiogram: left ventricular hypertrophy", "Essential hypertension"),
+    ("painful rash on one side of the chest", ["burning pain", "vesicular rash in a dermatomal band", "itching"], ["grouped vesicles on an erythematous base along T5"],
+     ["VZV PCR positive"], "No imaging required", "Herpes zoster (shingles)"),
+    ("joint pain and morning stiffness", ["symmetric small joint pain", "morning stiffness over one hour", "fatigue"], ["synovitis of the MCP joints"],
+     ["rheumatoid factor positive", "anti-CCP positive", "ESR elevated"], "Hand X-ray: periarticular osteopenia and erosions", "Rheumatoid arthritis"),
+    ("fatigue and cold intolerance", ["weight gain", "constipation", "dry skin"], ["delayed ankle reflexes", "non-tender goiter"],
+     ["TSH elevated", "free T4 low", "anti-TPO antibodies positive"], "Thyroid ultrasound: diffusely heterogeneous gland", "Hashimoto's thyroiditis"),
+    ("sudden weakness of the left arm", ["slurred speech", "facial droop"], ["left-sided hemiparesis", "NIHSS 6"],
+     ["glucose normal", "INR normal"], "CT head: no hemorrhage; CT angiography: right MCA occlusion", "Acute ischemic stroke"),
+    ("severe flank pain", ["colicky right flank pain radiating to the groin", "nausea", "hematuria"], ["costovertebral angle tenderness"],
+     ["urinalysis: microscopic hematuria", "creatinine normal"], "CT KUB: 6 mm calculus in the right ureter", "Ureteric colic (nephrolithiasis)"),
+]
+FIRST_NAMES = ["Thandiwe", "Lukas", "Amara", "Mateo", "Yuki", "Fatima", "Noah", "Ingrid", "Ravi", "Chloe", "Kwame", "Sofia", "Arjun", "Lena", "Omar"]
+LAST_NAMES = ["Mokoena", "Schneider", "Okafor", "Garcia", "Tanaka", "Haddad", "Smith", "Larsen", "Patel", "Martin", "Mensah", "Rossi", "Nair", "Vogel"]
+OCCUPATIONS = ["Primary School Teacher", "Software Engineer", "Nurse", "Farmer", "Accountant", "Retired", "Student", "Electrician", "Chef"]
+LOCATIONS = ["Cape Town, South Africa", "Berlin, Germany", "Lagos, Nigeria", "Madrid, Spain", "Osaka, Japan", "Mumbai, India", "Chicago, USA"]
+HISTORY = ["No prior chronic illnesses", "Appendectomy at age 12", "Hypertension for 10 years", "Asthma since childhood", "Cholecystectomy", "Hypothyroidism on levothyroxine"]
+FAMILY = ["Mother: Hypertension", "Father: Type 2 Diabetes Mellitus", "Sibling: Asthma", "No family history of gastrointestinal diseases", "Father: Myocardial infarction at 55"]
+SOCIAL = ["Non-smoker", "Smoker, 20 pack-years", "Occasional alcohol consumption", "Engages in regular physical activity", "Sedentary lifestyle"]
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic local embedder: signed feature hashing of the words of a text.
+
+    Texts sharing words get similar vectors, so vector search ranks like a
+    (crude) semantic search without any model or network.
+    """
+
+    def _vector(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = zlib.crc32(token.encode("utf-8"))
+            vector[digest % self.dimensions] += 1.0 if digest & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self._vector(text), None
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self._vector(text), None
+
+
+def note_sections(rng: random.Random, number: int) -> List[Tuple[str, str, str]]:
+    """Sections (section, condition, markdown) of one synthetic medical history report."""
+    complaint, symptoms, findings, labs, imaging, diagnosis = rng.choice(CONDITIONS)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    months = rng.randint(1, 12)
+    picked = rng.sample(symptoms, k=rng.randint(2, len(symptoms)))
+    return [
+        ("demographics", diagnosis, f"# Medical History Report – {name} (#{number})\n\n**Age:** {rng.randint(18, 90)}  \n"
+         f"**Sex:** {rng.choice(['Female', 'Male'])}  \n**Occupation:** {rng.choice(OCCUPATIONS)}  \n**Location:** {rng.choice(LOCATIONS)}"),
+        ("chief_complaint", diagnosis, f"## Chief Complaint\n\n{complaint.capitalize()} over the past {months} month{'s' if months > 1 else ''}."),
+        ("history", diagnosis, f"## History of Present Illness\n\n{name.split()[0]} reports a {months}-month history of {', '.join(picked)}. "
+         f"Symptoms are {rng.choice(['intermittent', 'progressive', 'constant'])} and {rng.choice(['worse at night', 'worse after meals', 'unrelated to activity'])}."),
+        ("past_history", diagnosis, "## Past Medical, Family and Social History\n\n" + "\n".join(
+            f"- {item}" for item in rng.sample(HISTORY, 2) + rng.sample(FAMILY, 2) + rng.sample(SOCIAL, 2))),
+        ("examination", diagnosis, f"## Physical Examination\n\n- **Vital Signs:** BP {rng.randint(100, 170)}/{rng.randint(60, 105)} mmHg, "
+         f"HR {rng.randint(55, 120)} bpm, Temp {rng.uniform(36.2, 39.4):.1f}°C\n" + "\n".join(f"- {finding}" for finding in findings)),
+        ("laboratory", diagnosis, "## Laboratory Investigations\n\n" + "\n".join(f"- {lab}" for lab in labs)),
+        ("imaging", diagnosis, f"## Imaging and Endoscopy\n\n- {imaging}"),
+        ("assessment", diagnosis, f"## Assessment and Plan\n\nFindings are consistent with {diagnosis}. "
+         f"Plan: {rng.choice(['start treatment and review in 4 weeks', 'refer to specialist', 'admit for further management'])}."),
+    ]
+
+
+def synthetic_chunks(count: int, seed: int) -> Iterator[Document]:
+    """Yield ``count`` chunks of synthetic notes, the same ones for the same seed."""
+    rng = random.Random(seed)
+    produced, number = 0, 0
+    while produced < count:
+        number += 1
+        for section, diagnosis, content in note_sections(rng, number):
+            if produced >= count:
+                return
+            yield Document(
+                name=f"patient_{number:07d}", content=content,
+                meta_data={"section": section, "diagnosis": diagnosis},
+            )
+            produced += 1
+
+
+def synthetic_queries(count: int, seed: int) -> List[str]:
+    """Questions a doctor would ask the knowledge base, built from the same clinical pictures."""
+    rng = random.Random(seed)
+    templates = [
+        "patients with {symptom} and {lab}",
+        "{diagnosis} cases with {finding}",
+        "which patients had {imaging}",
+        "history of {complaint}",
+        "{lab}",
+    ]
+    queries = []
+    for _ in range(count):
+        complaint, symptoms, findings, labs, imaging, diagnosis = rng.choice(CONDITIONS)
+        queries.append(rng.choice(templates).format(
+            symptom=rng.choice(symptoms), lab=rng.choice(labs), diagnosis=diagnosis, finding=rng.choice(findings),
+            imaging=imaging.split(":")[-1].split(";")[0].strip(), complaint=complaint,
+        ))
+    return queries
+
+
+def disk_mb(path: Path) -> float:
+    return round(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / (1024 * 1024), 2)
+
+
+def vector_db(uri: str, search_type: SearchType, dim: int) -> LanceDb:
+    return LanceDb(
+        table_name="halo_knowledge", uri=uri, search_type=search_type, use_tantivy=False,
+        embedder=HashingEmbedder(dimensions=dim),
+    )
+
+
+def ingest(uri: str, chunks: int, dim: int, batch: int, seed: int) -> Dict[str, float]:
+    """Load the synthetic corpus like HaloKnowledge.sync: batched embedding and writes, then the indexes."""
+    knowledge = HaloKnowledge(vector_db=vector_db(uri, SearchType.hybrid, dim))
+    knowledge.vector_db.create()
+    timings = {"embed": 0.0, "write": 0.0}
+    began = time.perf_counter()
+    documents: List[Document] = []
+
+    def flush(number: int) -> None:
+        step = time.perf_counter()
+        knowledge._embed(documents)
+        timings["embed"] += time.perf_counter() - step
+        step = time.perf_counter()
+        knowledge._write_embedded([(f"synthetic-{number}", documents)])
+        timings["write"] += time.perf_counter() - step
+
+    for number, doc in enumerate(synthetic_chunks(chunks, seed), start=1):
+        documents.append(doc)
+        if len(documents) >= batch:
+            flush(number)
+            documents = []
+    if documents:
+        flush(chunks)
+    load_seconds = time.perf_counter() - began
+    step = time.perf_counter()
+    index_report = ensure_indexes(knowledge.vector_db)
+    index_seconds = time.perf_counter() - step
+    return {
+        "seconds": round(load_seconds, 2),
+        "chunks_per_s": round(chunks / load_seconds, 1),
+        "embed_seconds": round(timings["embed"], 2),
+        "write_seconds": round(timings["write"], 2),
+        "index_seconds": round(index_seconds, 2),
+        "chunks_per_s_with_indexes": round(chunks / (load_seconds + index_seconds), 1),
+        "indexes_created": index_report.created,
+    }
+
+
+def measure_queries(uri: str, dim: int, queries: List[str], k: int, warmup: int) -> Dict[str, Dict[str, float]]:
+    """Latency of agno's search of every search type, as the agents call it."""
+    results = {}
+    for search_type in (SearchType.vector, SearchType.keyword, SearchType.hybrid):
+        db = vector_db(uri, search_type, dim)
+        mark_existing_indexes(db)
+        for query in queries[:warmup]:
+            db.search(query, limit=k)
+        latencies, found = [], 0
+        for query in queries:
+            began = time.perf_counter()
+            documents = db.search(query, limit=k)
+            latencies.append((time.perf_counter() - began) * 1000)
+            found += len(documents or [])
+        results[search_type.value] = {
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(statistics.fmean(latencies), 3),
+            "hits_per_query": round(found / len(queries), 2),
+        }
+    return results
+
+
+def run_scale(name: str, chunks: int, args) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix=f"retrieval-{name}-") as tmp:
+        uri = str(Path(tmp, "lancedb"))
+        result: Dict[str, object] = {"scale": name, "chunks": chunks}
+        result["ingest"] = ingest(uri, chunks, args.dim, args.batch, args.seed)
+        result["disk_mb"] = disk_mb(Path(uri))
+        status = index_status(vector_db(uri, SearchType.vector, args.dim))
+        result["indexes"] = {column: info["type"] for column, info in status["indexes"].items()}
+        result["queries"] = measure_queries(uri, args.dim, synthetic_queries(args.queries, args.seed + 1), args.k, args.warmup)
+    print(f"{name}: {json.dumps(result)}", file=sys.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ingest throughput, disk size and query latency of the knowledge base")
+    parser.add_argument("--scales", default="1k,100k", help=f"Comma separated corpus sizes in chunks ({', '.join(SCALES)} or a number)")
+    parser.add_argument("--dim", type=int, default=1536, help="Embedding dimensions (text-embedding-3-small: 1536)")
+    parser.add_argument("--batch", type=int, default=256, help="Chunks per embedding and write batch")
+    parser.add_argument("--queries", type=int, default=200, help="Measured queries per search type")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured queries per search type")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    args = parser.parse_args()
+    # agno logs every search; keep stdout for the JSON results
+    set_log_level_to_warning()
+
+    results = {
+        "dim": args.dim, "batch": args.batch, "queries": args.queries, "k": args.k, "seed": args.seed,
+        "scales": [],
+    }
+    for name in [s.strip().lower() for s in args.scales.split(",") if s.strip()]:
+        chunks = SCALES.get(name) or int(name)
+        results["scales"].append(run_scale(name, chunks, args))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Contention benchmark of the session and memory SQLite databases.
+
+Simulates concurrent doctors on one Streamlit server: writer threads save a team
+session after every turn (and now and then a user memory), while reader threads
+list sessions and memories the way the sidebar does. It runs once against agno's
+default SqliteDb, once against the performance profile of sqlite_profile.py and
+once with one shard per doctor (storage_shards.py), each in fresh databases, and reports throughput, write/read latency
+percentiles and failed operations (e.g. "database is locked").
+
+Usage:
+    python benchmarks/sqlite_contention.py [--writers 8] [--readers 8] [--turns 100] [--payload-kb 16] [--mode default|profiled|sharded|all]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+from agno.db.base import SessionType  # noqa: E402
+from agno.db.schemas.memory import UserMemory  # noqa: E402
+from agno.db.sqlite import SqliteDb  # noqa: E402
+from agno.run.team import TeamRunOutput  # noqa: E402
+from agno.session import TeamSession  # noqa: E402
+
+from benchmarks._common import percentile  # noqa: E402
+from sqlite_profile import create_sqlite_db, sqlite_stats  # noqa: E402
+from storage_shards import ShardRouter  # noqa: E402
+
+
+def summarize(latencies, errors):
+    ms = [v * 1000 for v in latencies]
+    return {
+        "ops": len(ms),
+        "errors": errors,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else None,
+        "mean_ms": statistics.fmean(ms) if ms else None,
+    }
+
+
+def open_db(mode, db_file):
+    """Return a function mapping a user id to their database."""
+    if mode == "sharded":
+        return ShardRouter(db_file, mode="user").db_for
+    if mode == "profiled":
+        db = create_sqlite_db(db_file)
+    else:
+        db = SqliteDb(db_file=db_file)
+        # Create the tables up front, as the app has them after the first turn
+        db._get_table(table_type="sessions", create_table_if_not_found=True)
+        db._get_table(table_type="memories", create_table_if_not_found=True)
+    return lambda user_id: db
+
+
+def writer(db_for, index, turns, payload, results, lock, start):
+    user_id = f"doctor-{index}"
+    db = db_for(user_id)
+    session_id = str(uuid.uuid4())
+    latencies, errors = [], []
+    start.wait()
+    for turn in range(turns):
+        session = TeamSession(
+            session_id=session_id,
+            team_id="halo",
+            user_id=user_id,
+            session_data={"session_name": f"Session {index}", "turn": turn},
+            runs=[
+                TeamRunOutput(run_id=f"{session_id}-{i}", team_id="halo", session_id=session_id, content=payload)
+                for i in range(min(turn + 1, 4))
+            ],
+            created_at=int(time.time()),
+        )
+        began = time.perf_counter()
+        try:
+            db.upsert_session(session)
+            if turn % 4 == 0:
+                db.upsert_user_memory(UserMemory(memory=f"fact {turn}", user_id=user_id, topics=["benchmark"], updated_at=int(time.time())))
+            latencies.append(time.perf_counter() - began)
+        except Exception as e:
+            errors.append(type(e).__name__)
+    with lock:
+        results["write"].extend(latencies)
+        results["write_errors"].extend(errors)
+
+
+def reader(db_for, index, writers_done, results, lock, start):
+    user_id = f"doctor-{index}"
+    db = db_for(user_id)
+    latencies, errors = [], []
+    start.wait()
+    while not writers_done.is_set():
+        began = time.perf_counter()
+        try:
+            db.get_sessions(session_type=SessionType.TEAM, user_id=user_id, limit=20, sort_by="created_at", sort_order="desc", deserialize=False)
+            db.get_user_memories(user_id=user_id, limit=25, page=1, sort_by="updated_at", sort_order="desc", deserialize=False)
+            latencies.append(time.perf_counter() - began)
+        except Exception as e:
+            errors.append(type(e).__name__)
+    with lock:
+        results["read"].extend(latencies)
+        results["read_errors"].extend(errors)
+
+
+def run(mode, writers, readers, turns, payload_kb):
+    payload = "x" * (payload_kb * 1024)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_for = open_db(mode, os.path.join(tmp, "halo_sessions.db"))
+        results = {"write": [], "write_errors": [], "read": [], "read_errors": []}
+        lock = threading.Lock()
+        start = threading.Barrier(writers + readers + 1)
+        writers_done = threading.Event()
+        writer_threads = [
+            threading.Thread(target=writer, args=(db_for, i, turns, payload, results, lock, start)) for i in range(writers)
+        ]
+        reader_threads = [
+            threading.Thread(target=reader, args=(db_for, i % max(writers, 1), writers_done, results, lock, start)) for i in range(readers)
+        ]
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        start.wait()
+        began = time.perf_counter()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        writers_done.set()
+        for thread in reader_threads:
+            thread.join()
+        dbs = {id(db): db for db in (db_for(f"doctor-{i}") for i in range(max(writers, 1)))}
+        stats = sqlite_stats(next(iter(dbs.values())))
+        for db in dbs.values():
+            db.db_engine.dispose()
+
+    return {
+        "seconds": elapsed,
+        "writes_per_second": len(results["write"]) / elapsed if elapsed else None,
+        "write": summarize(results["write"], len(results["write_errors"])),
+        "read": summarize(results["read"], len(results["read_errors"])),
+        "error_types": sorted(set(results["write_errors"] + results["read_errors"])),
+        "databases": len(dbs),
+        "sqlite": {k: v for k, v in stats.items() if k != "pool"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure SQLite contention with concurrent writers and readers")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads (doctors chatting)")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader threads (sidebar reruns)")
+    parser.add_argument("--turns", type=int, default=100, help="Session saves per writer")
+    parser.add_argument("--payload-kb", type=int, default=16, help="Size of the content of every stored run")
+    parser.add_argument("--mode", choices=["default", "profiled", "sharded", "all"], default="all")
+    args = parser.parse_args()
+
+    modes = ["default", "profiled", "sharded"] if args.mode == "all" else [args.mode]
+    print(json.dumps({
+        "writers": args.writers,
+        "readers": args.readers,
+        "turns": args.turns,
+        "payload_kb": args.payload_kb,
+        "results": {mode: run(mode, args.writers, args.readers, args.turns, args.payload_kb) for mode in modes},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Startup benchmark for the Streamlit app and its pages.
+
+Every page is loaded in a fresh interpreter, with network access blocked and a
+dummy OpenAI key, so no LLM or remote service is reached. For each page the
+harness records:
+
+- import time per top-level package (from ``python -X importtime``)
+- the slowest individual module imports
+- the time of the first script run (``streamlit.testing.v1.AppTest``)
+- the peak resident set size of the process
+
+Results are written as JSON so runs can be compared across commits, and budget
+thresholds can fail the run when startup regresses.
+
+Usage:
+    python benchmarks/startup.py [--runs 3] [--output results.json]
+    python benchmarks/startup.py --compare baseline.json [--max-regression 0.2]
+    python benchmarks/startup.py --budgets benchmarks/startup_budgets.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_PAGES = [
+    "app.py",
+    "pages/Home.py",
+    "pages/Medical_Image_Analysis.py",
+    "pages/Experts_Chat.py",
+    "pages/Generated_Images.py",
+    "pages/Configuration.py",
+    "pages/About.py",
+]
+
+# Metrics compared against baselines and budgets
+METRICS = ("first_run_seconds", "peak_rss_mb")
+
+# Executed in a fresh interpreter; the page path is passed as argv[1]
+CHILD_SCRIPT = r"""
+import json
+import socket
+import sys
+import time
+
+# Block every connection that does not stay on this machine, so the LLM and
+# remote services are never reached during the benchmark
+_connect = socket.socket.connect
+
+def _local_only(self, address):
+    host = address[0] if isinstance(address, tuple) else address
+    if isinstance(host, str) and host not in ("127.0.0.1", "::1", "localhost") and "/" not in host:
+        raise ConnectionRefusedError(f"Network access blocked by the startup benchmark: {address}")
+    return _connect(self, address)
+
+socket.socket.connect = _local_only
+
+from streamlit.testing.v1 import AppTest
+
+start = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=600)
+app.run()
+first_run_seconds = time.perf_counter() - start
+
+try:
+    import resource
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+except ImportError:
+    peak_rss_mb = None
+
+print("STARTUP_RESULT " + json.dumps({
+    "first_run_seconds": first_run_seconds,
+    "peak_rss_mb": peak_rss_mb,
+    "exceptions": [e.message for e in app.exception],
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse the output of ``-X importtime`` into a list of modules with their timings in seconds."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules.append({
+                "module": name.strip(),
+                "self_seconds": int(self_us) / 1e6,
+                "cumulative_seconds": int(cumulative_us) / 1e6,
+            })
+        except ValueError:
+            continue
+    return modules
+
+
+def summarize_imports(modules: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Aggregate module import times per top-level package and list the slowest modules."""
+    packages: Dict[str, float] = {}
+    for module in modules:
+        package = module["module"].split(".", 1)[0]
+        packages[package] = packages.get(package, 0.0) + module["self_seconds"]
+
+    slowest = sorted(modules, key=lambda m: m["cumulative_seconds"], reverse=True)[:top]
+    return {
+        "total_seconds": sum(packages.values()),
+        "module_count": len(modules),
+        "packages": dict(sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]),
+        "slowest_modules": [
+            {"module": m["module"], "cumulative_seconds": m["cumulative_seconds"]} for m in slowest
+        ],
+    }
+
+
+def run_page(page: str, top: int) -> Dict[str, Any]:
+    """Load a page once in a fresh interpreter and return its measurements."""
+    env = dict(os.environ)
+    # Page loads must not reach the LLM; a dummy key keeps model construction happy
+    env["OPENAI_API_KEY"] = "sk-benchmark"
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT, page],
+        cwd=ROOT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    measurements = None
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_RESULT "):
+            measurements = json.loads(line[len("STARTUP_RESULT "):])
+    if measurements is None:
+        raise RuntimeError(f"Benchmark of {page} failed:\n{result.stderr[-2000:]}")
+
+    measurements["imports"] = summarize_imports(parse_importtime(result.stderr), top)
+    return measurements
+
+
+def benchmark_page(page: str, runs: int, top: int) -> Dict[str, Any]:
+    """Load a page several times and keep the median of every metric."""
+    samples = [run_page(page, top) for _ in range(runs)]
+    summary: Dict[str, Any] = {"runs": runs}
+    for metric in METRICS:
+        values = [s[metric] for s in samples if s[metric] is not None]
+        summary[metric] = statistics.median(values) if values else None
+    summary["import_seconds"] = statistics.median(s["imports"]["total_seconds"] for s in samples)
+    # Module breakdown of the last run; the import order is the same on every run
+    summary["imports"] = samples[-1]["imports"]
+    summary["exceptions"] = samples[-1]["exceptions"]
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    """Return the current commit hash, if the tree is a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print the change of every metric against a baseline and return the regressions."""
+    regressions = []
+    for page, current in results["pages"].items():
+        previous = baseline.get("pages", {}).get(page)
+        if not previous:
+            continue
+        for metric in METRICS + ("import_seconds",):
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            print(f"{page:40} {metric:20} {old:10.3f} -> {new:10.3f} ({change:+.1%})")
+            if change > max_regression:
+                regressions.append(f"{page}: {metric} regressed by {change:.1%} ({old:.3f} -> {new:.3f})")
+    return regressions
+
+
+def check_budgets(results: Dict[str, Any], budgets: Dict[str, Dict[str, float]]) -> List[str]:
+    """Return the metrics that exceed their budget. A "*" entry applies to every page."""
+    violations = []
+    for page, current in results["pages"].items():
+        page_budgets = {**budgets.get("*", {}), **budgets.get(page, {})}
+        for metric, limit in page_budgets.items():
+            value = current.get(metric)
+            if value is not None and value > limit:
+                violations.append(f"{page}: {metric} {value:.3f} exceeds budget {limit}")
+        if current.get("exceptions"):
+            violations.append(f"{page}: raised {current['exceptions']}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time, first run and peak memory of every page")
+    parser.add_argument("pages", nargs="*", default=DEFAULT_PAGES, help="Pages to benchmark, relative to the repository")
+    parser.add_argument("--runs", type=int, default=3, help="Number of cold starts per page")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages and modules to list per page")
+    parser.add_argument("--output", type=Path, help="Write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="JSON results of an earlier run to compare against")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Fail when a metric is this much worse than the baseline (0.2 = 20%%)",
+    )
+    parser.add_argument("--budgets", type=Path, help="JSON file with per-page metric budgets")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pages": {},
+    }
+    for page in args.pages:
+        print(f"Benchmarking {page}...", file=sys.stderr)
+        results["pages"][page] = benchmark_page(page, args.runs, args.top)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+    failures = []
+    if args.compare:
+        failures += compare(results, json.loads(args.compare.read_text()), args.max_regression)
+    if args.budgets:
+        failures += check_budgets(results, json.loads(args.budgets.read_text()))
+
+    if failures:
+        print("\n".join(["Startup regressed:"] + failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
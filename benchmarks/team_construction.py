@@ -0,0 +1,84 @@
+"""
+Micro-benchmark for building the member agents of a HALO team.
+
+Compares calling every agent factory directly (the old behaviour of
+``agents.get_agent``) with the pooled templates and per-team clones handed out
+by ``agents.get_agent`` now.
+
+Usage:
+    python benchmarks/team_construction.py [--members 6] [--iterations 50]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+os.chdir(ROOT_DIR)
+# Building agents does not reach the LLM; a dummy key keeps model construction happy
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from agno.models.openai import OpenAIChat  # noqa: E402
+
+import agents  # noqa: E402
+from halo import halo_knowledge, halo_memory  # noqa: E402
+
+
+def build_direct(names, model, memory, knowledge):
+    """Build every member by calling its factory, as get_agent used to do."""
+    return [agents._build_agent(name, model, memory, knowledge, True) for name in names]
+
+
+def build_pooled(names, model, memory, knowledge):
+    """Build every member through the pooled get_agent."""
+    return [agents.get_agent(name, model, memory, knowledge, debug_mode=True) for name in names]
+
+
+def measure(build, names, iterations):
+    """Return the per-team construction times in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        # A fresh model per team, as create_halo does
+        model = OpenAIChat(id="gpt-4o")
+        start = time.perf_counter()
+        build(names, model, halo_memory, halo_knowledge)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    return {
+        "first_ms": timings[0],
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.mean(timings),
+        "max_ms": max(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare direct and pooled construction of HALO team members")
+    parser.add_argument("--members", type=int, default=6, help="Number of member agents per team")
+    parser.add_argument("--iterations", type=int, default=50, help="Number of teams to build")
+    args = parser.parse_args()
+
+    names = agents.agent_ids()[: args.members]
+    direct = summarize(measure(build_direct, names, args.iterations))
+    pooled = summarize(measure(build_pooled, names, args.iterations))
+
+    print(json.dumps({
+        "members": names,
+        "iterations": args.iterations,
+        "direct": direct,
+        "pooled": pooled,
+        "median_speedup": direct["median_ms"] / pooled["median_ms"] if pooled["median_ms"] else None,
+        "pool": agents.agent_pool.stats(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 class Config:
@@ -34,5 +35,75 @@ class Config:
     LEAD_AGENT_NAME = "Chief Doctor"
     TEAM_AGENT_NAME = "Specialists"
 
+    # --- Performance tuning ---
+    # Number of prebuilt HALO Team templates kept per process
+    HALO_POOL_SIZE = int(os.getenv("HALO_POOL_SIZE", "8"))
+    # Number of recent chat messages rendered on every rerun; older ones load on demand
+    TRANSCRIPT_EAGER_MESSAGES = int(os.getenv("TRANSCRIPT_EAGER_MESSAGES", "20"))
+    # Memory budget of the transcript of a session; older messages are spilled to disk
+    TRANSCRIPT_MEMORY_BUDGET_MB = float(os.getenv("TRANSCRIPT_MEMORY_BUDGET_MB", "4"))
+    TRANSCRIPT_HOT_MESSAGES = int(os.getenv("TRANSCRIPT_HOT_MESSAGES", "200"))
+    # Size caps of the tool call snapshots kept with chat messages; longer results are
+    # fetched from the session database when the tool call is opened
+    MESSAGE_TOOL_RESULT_CHARS = int(os.getenv("MESSAGE_TOOL_RESULT_CHARS", "2000"))
+    MESSAGE_TOOL_ARG_CHARS = int(os.getenv("MESSAGE_TOOL_ARG_CHARS", "500"))
+    # User memories shown per page in the memory panel
+    MEMORY_PANEL_PAGE_SIZE = int(os.getenv("MEMORY_PANEL_PAGE_SIZE", "25"))
+    # Maximum redraws per second of a streamed response
+    STREAM_FPS = float(os.getenv("STREAM_FPS", "8"))
+    # SQLite profile of the session and memory databases (see sqlite_profile.py)
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+    SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+    # Per-user sharding of the session and memory databases (see storage_shards.py):
+    # "off" (single files), "hash" (STORAGE_SHARD_COUNT files) or "user" (one file per user)
+    STORAGE_SHARDING = os.getenv("STORAGE_SHARDING", "off").lower()
+    STORAGE_SHARD_COUNT = int(os.getenv("STORAGE_SHARD_COUNT", "8"))
+    STORAGE_MAX_OPEN_SHARDS = int(os.getenv("STORAGE_MAX_OPEN_SHARDS", "64"))
+    # Background knowledge ingestion (see ingestion.py): worker threads, documents per
+    # embedding request, attempts per job and the refresh interval of the job status
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+    INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+    INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+    INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", "1"))
+    # Processes parsing knowledge files in parallel (load_knowledge.py --workers)
+    KNOWLEDGE_PARSE_WORKERS = int(os.getenv("KNOWLEDGE_PARSE_WORKERS", "1"))
+    # Indexes of the knowledge table (see knowledge_index.py): the ANN index type
+    # (ivf_hnsw_sq or ivf_pq) and the row count from which it is built, the rows written
+    # since the last index update before they are indexed, and the growth of the table
+    # after which the ANN index is retrained
+    KNOWLEDGE_ANN_INDEX = os.getenv("KNOWLEDGE_ANN_INDEX", "ivf_hnsw_sq").lower()
+    KNOWLEDGE_ANN_MIN_ROWS = int(os.getenv("KNOWLEDGE_ANN_MIN_ROWS", "10000"))
+    KNOWLEDGE_INDEX_OPTIMIZE_ROWS = int(os.getenv("KNOWLEDGE_INDEX_OPTIMIZE_ROWS", "1000"))
+    KNOWLEDGE_INDEX_RETRAIN_GROWTH = float(os.getenv("KNOWLEDGE_INDEX_RETRAIN_GROWTH", "2"))
+    # In-memory cache of knowledge searches (see retrieval_cache.py): query embeddings and
+    # search results kept; results are invalidated by every write to the knowledge table
+    RETRIEVAL_CACHE_QUERIES = int(os.getenv("RETRIEVAL_CACHE_QUERIES", "1024"))
+    RETRIEVAL_CACHE_RESULTS = int(os.getenv("RETRIEVAL_CACHE_RESULTS", "512"))
+    # Seconds between checks of the table version for writes of other processes
+    RETRIEVAL_CACHE_VERSION_CHECK_SECONDS = float(os.getenv("RETRIEVAL_CACHE_VERSION_CHECK_SECONDS", "5"))
+    # Size limit of the disk cache of text embeddings (see embedding_cache.py); 0 disables it
+    EMBEDDING_CACHE_MB = float(os.getenv("EMBEDDING_CACHE_MB", "512"))
+    # Session database maintenance (see maintenance.py): archive sessions not updated for
+    # this many days, externalize larger tool outputs; the background job runs every
+    # MAINTENANCE_INTERVAL_HOURS (0 = only from the command line)
+    SESSION_ARCHIVE_DAYS = int(os.getenv("SESSION_ARCHIVE_DAYS", "180"))
+    TOOL_OUTPUT_MAX_KB = int(os.getenv("TOOL_OUTPUT_MAX_KB", "64"))
+    MAINTENANCE_INTERVAL_HOURS = float(os.getenv("MAINTENANCE_INTERVAL_HOURS", "0"))
+    # Shared HTTP client pool (one client per host) used by models and tools
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+    HTTP_MAX_KEEPALIVE_PER_HOST = int(os.getenv("HTTP_MAX_KEEPALIVE_PER_HOST", "10"))
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "600"))
+    HTTP2 = os.getenv("HTTP2", "true").lower() in ("1", "true", "yes")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+    # TLS verification of outbound requests. HALO_CA_BUNDLE points to a custom CA bundle
+    # (e.g. a corporate proxy certificate); HALO_SSL_VERIFY=false disables verification.
+    SSL_VERIFY = os.getenv("HALO_SSL_VERIFY", "true").lower() in ("1", "true", "yes")
+    CA_BUNDLE = os.getenv("HALO_CA_BUNDLE")
+
 # Create a single instance to be imported by other modules
 config = Config()
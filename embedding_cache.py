@@ -0,0 +1,345 @@
+"""
+Content-addressed, disk-backed cache of text embeddings.
+
+Every rebuild of the knowledge base (``load_knowledge.py --recreate``, the
+schema-mismatch rebuild) and every re-upload of a document used to embed all
+chunks again. ``EmbeddingCache`` keeps the vectors of each (model, dimensions)
+in tmp/embedding_cache/<model>-<dimensions>/:
+
+- vectors.f32: float32 rows in a memory-mapped file, grown on demand
+- slots.u64: generation and key fingerprint of every row, memory-mapped too
+- index.db: SQLite index of sha256(text) -> row, with the last use of each row
+
+Lookups do not write: the last use of the rows they hit is buffered and written
+with the next ``put_many``, or once ``TOUCH_FLUSH_ROWS`` rows or
+``TOUCH_FLUSH_SECONDS`` have accumulated.
+
+The cache holds at most ``EMBEDDING_CACHE_MB`` of vectors; when it is full the
+least recently used rows are reused. Processes share the cache safely: rows are
+allocated inside SQLite write transactions, and a row is written like a seqlock
+(odd generation while it is written, then the fingerprint of its key), so a
+lookup racing with another process reusing the row reads a miss, never the
+vector of another text.
+
+Query embeddings of searches (``retrieval_cache.query_scope``) bypass the disk
+cache; the in-memory retrieval cache keeps them, and one-off queries would only
+push document chunks out.
+
+``CachedOpenAIEmbedder`` is the OpenAIEmbedder of ``halo_knowledge`` with the
+cache in front, so only texts that were never embedded reach the API.
+"""
+
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+from agno.utils.log import logger
+
+from config import config
+from retrieval_cache import in_query_scope
+
+CACHE_DIR = Path(config.THIS_DIR).joinpath("tmp", "embedding_cache")
+
+# Share of the capacity freed at once when the cache is full, so evictions are batched
+EVICT_FRACTION = 0.05
+# Rows added to the vector file when it grows
+GROW_ROWS = 1024
+# Buffered last uses of looked up rows are written once this many rows or seconds have accumulated
+TOUCH_FLUSH_ROWS = 1000
+TOUCH_FLUSH_SECONDS = 60.0
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _fingerprint(key: str) -> int:
+    # Never 0, the fingerprint of rows being written or never written
+    return int(key[:15], 16) + 1
+
+
+class EmbeddingCache:
+    """Embeddings of one model and dimension, keyed by the hash of the embedded text."""
+
+    def __init__(self, model: str, dimensions: int, max_mb: Optional[float] = None, cache_dir: Path = CACHE_DIR):
+        """
+        Args:
+            model: Embedding model id
+            dimensions: Length of the vectors
+            max_mb: Size limit of the vectors. Defaults to config.EMBEDDING_CACHE_MB.
+            cache_dir: Parent directory of the caches
+        """
+        self.model = model
+        self.dimensions = dimensions
+        self.row_bytes = dimensions * 4
+        max_mb = config.EMBEDDING_CACHE_MB if max_mb is None else max_mb
+        self.capacity = max(1, int(max_mb * 1024 * 1024) // self.row_bytes)
+        safe_model = "".join(c if c.isalnum() or c in "-_." else "_" for c in model)
+        self.path = Path(cache_dir).joinpath(f"{safe_model}-{dimensions}")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.path.joinpath("vectors.f32")
+        self.vectors_path.touch(exist_ok=True)
+        self.slots_path = self.path.joinpath("slots.u64")
+        self.slots_path.touch(exist_ok=True)
+        self._vectors: Optional[np.memmap] = None
+        self._slots: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path.joinpath("index.db")), check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE, last_used REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_entries_last_used ON entries (last_used)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS free_slots (slot INTEGER PRIMARY KEY)")
+        # Last use of looked up rows, by key, not yet written to the index
+        self._touched: Dict[str, float] = {}
+        self._touched_flushed_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self) -> str:
+        return f"EmbeddingCache(model={self.model!r}, dimensions={self.dimensions}, capacity={self.capacity})"
+
+    def _map(self, rows: int) -> np.memmap:
+        """Return the vector file mapped with at least the given number of rows (and map the slot file alike)."""
+        if self._vectors is None or self._vectors.shape[0] < rows:
+            size = self.vectors_path.stat().st_size // self.row_bytes
+            if size < rows:
+                # Another process may have grown the file already; only ever grow it
+                size = min(self.capacity, max(rows, size * 2, GROW_ROWS))
+                with open(self.vectors_path, "r+b") as f:
+                    f.truncate(size * self.row_bytes)
+            if self.slots_path.stat().st_size < size * 16:
+                # New rows start as never written (generation 0, fingerprint 0)
+                with open(self.slots_path, "r+b") as f:
+                    f.truncate(size * 16)
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(size, self.dimensions))
+            self._slots = np.memmap(self.slots_path, dtype=np.uint64, mode="r+", shape=(size, 2))
+        return self._vectors
+
+    def _read(self, key: str, slot: int) -> Optional[List[float]]:
+        """Read the vector of a row if it holds the given key and was not rewritten meanwhile."""
+        slots = self._slots
+        generation = int(slots[slot, 0])
+        if generation % 2 or int(slots[slot, 1]) != _fingerprint(key):
+            return None
+        vector = self._vectors[slot].tolist()
+        if int(slots[slot, 0]) != generation or int(slots[slot, 1]) != _fingerprint(key):
+            return None
+        return vector
+
+    def _write(self, key: str, slot: int, vector: Sequence[float]) -> None:
+        slots = self._slots
+        generation = int(slots[slot, 0]) | 1
+        slots[slot, 0] = generation
+        slots[slot, 1] = 0
+        self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+        slots[slot, 1] = _fingerprint(key)
+        slots[slot, 0] = generation + 1
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Return the cached vector of every text, or None where it is not cached."""
+        keys = [text_key(text) for text in texts]
+        found: Dict[str, int] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+            vectors: List[Optional[List[float]]] = []
+            if found:
+                self._map(max(found.values()) + 1)
+                now = time.time()
+                for key in found:
+                    self._touched[key] = now
+                if (len(self._touched) >= TOUCH_FLUSH_ROWS
+                        or time.monotonic() - self._touched_flushed_at >= TOUCH_FLUSH_SECONDS):
+                    self._conn.execute("BEGIN")
+                    self._write_touched()
+                    self._conn.execute("COMMIT")
+            for key in keys:
+                slot = found.get(key)
+                vectors.append(self._read(key, slot) if slot is not None else None)
+            hits = sum(v is not None for v in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store the vectors of texts; empty vectors (failed embeddings) are skipped."""
+        items = {
+            text_key(text): vector for text, vector in zip(texts, vectors)
+            if vector is not None and len(vector) == self.dimensions
+        }
+        if not items:
+            return
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Before allocating, so eviction sees the recent lookups
+                self._write_touched()
+                existing: Dict[str, int] = {}
+                keys = list(items)
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    existing.update(conn.execute(
+                        f"SELECT key, slot FROM entries WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+                new_keys = [key for key in keys if key not in existing][:self.capacity]
+                slots = self._allocate(len(new_keys))
+                written = list(zip(new_keys, slots))
+                if existing:
+                    # Rows of existing keys that do not hold them (written before the slot file existed)
+                    self._map(max(existing.values()) + 1)
+                    written.extend((key, slot) for key, slot in existing.items() if self._read(key, slot) is None)
+                if written:
+                    mapped = self._map(max(slot for _, slot in written) + 1)
+                    for key, slot in written:
+                        self._write(key, slot, items[key])
+                    mapped.flush()
+                    self._slots.flush()
+                now = time.time()
+                conn.executemany("INSERT INTO entries VALUES (?, ?, ?)", [(key, slot, now) for key, slot in zip(new_keys, slots)])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _write_touched(self) -> None:
+        """Write the buffered last uses; called inside a write transaction with the lock held."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key, now in self._touched.items()]
+            )
+            self._touched.clear()
+        self._touched_flushed_at = time.monotonic()
+
+    def flush(self) -> None:
+        """Write the buffered last uses of looked up rows."""
+        with self._lock:
+            if not self._touched:
+                return
+            self._conn.execute("BEGIN")
+            self._write_touched()
+            self._conn.execute("COMMIT")
+
+    def _allocate(self, count: int) -> List[int]:
+        """Take rows for new entries: freed rows first, then new rows, then evict the least recently used."""
+        conn = self._conn
+        next_slot = max(
+            conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0],
+            conn.execute("SELECT COALESCE(MAX(slot) + 1, 0) FROM free_slots").fetchone()[0],
+        )
+        slots = [row[0] for row in conn.execute("SELECT slot FROM free_slots LIMIT ?", (count,))]
+        conn.executemany("DELETE FROM free_slots WHERE slot = ?", [(slot,) for slot in slots])
+        fresh = min(count - len(slots), self.capacity - next_slot)
+        slots.extend(range(next_slot, next_slot + max(fresh, 0)))
+        if len(slots) < count:
+            evict = max(count - len(slots), int(self.capacity * EVICT_FRACTION))
+            victims = [row[0] for row in conn.execute("SELECT slot FROM entries ORDER BY last_used LIMIT ?", (evict,))]
+            conn.executemany("DELETE FROM entries WHERE slot = ?", [(slot,) for slot in victims])
+            self.evictions += len(victims)
+            needed = count - len(slots)
+            slots.extend(victims[:needed])
+            conn.executemany("INSERT INTO free_slots VALUES (?)", [(slot,) for slot in victims[needed:]])
+        return slots
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit and miss counts of this process and the size of the cache."""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "model": self.model,
+            "dimensions": self.dimensions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "entries": entries,
+            "capacity": self.capacity,
+            "size_mb": round(os.path.getsize(self.vectors_path) / (1024 * 1024), 2),
+        }
+
+
+# One cache per model and dimension in the process
+_caches: Dict[Tuple[str, int], EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(model: str, dimensions: int) -> EmbeddingCache:
+    with _caches_lock:
+        cache = _caches.get((model, dimensions))
+        if cache is None:
+            cache = _caches[(model, dimensions)] = EmbeddingCache(model, dimensions)
+            atexit.register(cache.flush)
+        return cache
+
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """Return the statistics of every embedding cache opened in the process."""
+    return [cache.stats() for cache in list(_caches.values())]
+
+
+@dataclass
+class CachedOpenAIEmbedder(OpenAIEmbedder):
+    """OpenAIEmbedder that looks up every text in the embedding cache before calling the API."""
+
+    cache: Optional[EmbeddingCache] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        super().__post_init__()
+        if self.cache is None and config.EMBEDDING_CACHE_MB > 0:
+            try:
+                self.cache = get_cache(self.id, self.dimensions)
+            except Exception as e:
+                logger.warning(f"Embedding cache disabled: {e}")
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        if self.cache is None or in_query_scope():
+            return super().get_embedding_and_usage(text)
+        cached = self.cache.get_many([text])[0]
+        if cached is not None:
+            return cached, None
+        embedding, usage = super().get_embedding_and_usage(text)
+        self.cache.put_many([text], [embedding])
+        return embedding, usage
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embedding_and_usage(text)[0]
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        if self.cache is None:
+            return super().get_embeddings_batch(texts, batch_size=batch_size)
+        vectors = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, super().get_embeddings_batch(missing, batch_size=batch_size)))
+            self.cache.put_many(list(embedded), list(embedded.values()))
+            vectors = [vector if vector is not None else embedded.get(text, []) for text, vector in zip(texts, vectors)]
+        return vectors
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        if self.cache is None or in_query_scope():
+            return await super().async_get_embedding_and_usage(text)
+        cached = self.cache.get_many([text])[0]
+        if cached is not None:
+            return cached, None
+        embedding, usage = await super().async_get_embedding_and_usage(text)
+        self.cache.put_many([text], [embedding])
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return (await self.async_get_embedding_and_usage(text))[0]
@@ -2,26 +2,30 @@ import os
 from dataclasses import dataclass
 from pathlib import Path
 from textwrap import dedent
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from agents import get_agent
+from agents import _clone_agent, get_agent
 from agno.agent import Agent
-from agno.knowledge.embedder.openai import OpenAIEmbedder
 from agno.memory import MemoryManager
 from agno.db.sqlite import SqliteDb
 #from agno.models.anthropic import Claude
 #from agno.models.google import Gemini
 #from agno.models.groq import Groq
-from agno.models.openai import OpenAIChat
+from http_pool import PooledOpenAIChat
 from agno.team import Team
 from agno.tools import Toolkit
 from agno.tools.reasoning import ReasoningTools
 from agno.utils.log import logger
-from agno.vectordb.lancedb import LanceDb, SearchType
 from knowledge import HaloKnowledge
+from maintenance import start_scheduler as start_maintenance
+from resources import LazyResource, TemplatePool, registry
+from sqlite_profile import create_sqlite_db
+from storage_shards import ShardedMemoryDb, ShardRouter
+from transport import transport_manager
 from tools import get_toolkit
 from config import config
 import base64
+import copy
 import json
 
 
@@ -29,6 +33,9 @@ cwd = Path(__file__).parent.resolve()
 tmp_dir = cwd.joinpath("tmp")
 tmp_dir.mkdir(exist_ok=True, parents=True)
 
+# Pooled, verified connections for the requests/httpx calls made by tools and readers
+transport_manager.install()
+
 # Define paths for storage, memory and knowledge
 SESSIONS_PATH = tmp_dir.joinpath("halo_sessions.db")
 MEMORY_PATH = tmp_dir.joinpath("halo_memory.db")
@@ -45,166 +52,66 @@ class HaloConfig:
     agents: Optional[List[str]] = None
 
 
-# Setup memory database
-halo_memory = MemoryManager(
-    db=SqliteDb(db_file=str(MEMORY_PATH)),
-    # Select the model used for memory creation and updates. If unset, the default model of the Agent is used.
-    #model=OpenAIChat(id="gpt-5-mini"),
-    # You can also provide additional instructions for memory management
-    additional_instructions="Store important user information and preferences to personalize interactions"
-)
-
-# Setup sessions storage database
-halo_sessions = SqliteDb(db_file=str(SESSIONS_PATH))
-
-# setup knowledge database
-try:
-    # First try to initialize with existing table
-    halo_knowledge = HaloKnowledge(
-        vector_db=LanceDb(
-            table_name="halo_knowledge",
-            uri=str(KNOWLEDGE_PATH),
-            search_type=SearchType.hybrid,
-            embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-        )
+def _build_halo_memory() -> MemoryManager:
+    """Build the memory manager backed by its own SQLite database."""
+    if config.STORAGE_SHARDING != "off":
+        db = ShardedMemoryDb(registry.get("halo_memory_shards"))
+    else:
+        db = create_sqlite_db(str(MEMORY_PATH), table_types=("memories",))
+    return MemoryManager(
+        db=db,
+        # Select the model used for memory creation and updates. If unset, the default model of the Agent is used.
+        #model=OpenAIChat(id="gpt-5-mini"),
+        # You can also provide additional instructions for memory management
+        additional_instructions="Store important user information and preferences to personalize interactions"
     )
-    logger.info("Successfully initialized LanceDb with existing table")
-except Exception as e:
-    logger.warning(f"Error initializing LanceDb: {e}")
-    try:
-        # Create a new LanceDb instance with schema definition
-        from lancedb import connect
-        import pyarrow as pa
-        
-        # Create a connection to the database
-        logger.info(f"Creating new LanceDB connection to {KNOWLEDGE_PATH}")
-        connection = connect(str(KNOWLEDGE_PATH))
-        
-        # Define schema for the table to match agno's LanceDB implementation
-        schema = pa.schema([
-            pa.field('vector', pa.list_(pa.float32(), 1536)),  # Vector field for embeddings
-            pa.field('id', pa.string()),  # Document ID
-            pa.field('payload', pa.string()),  # JSON string containing name, meta_data, content, usage
-        ])
-        
-        # Create an empty table if it doesn't exist
-        if "halo_knowledge" not in connection.table_names():
-            logger.info("Creating new 'halo_knowledge' table with schema")
-            # Create empty DataFrame with the schema
-            import pandas as pd
-            import numpy as np
-            
-            # Create a single empty row to initialize the table
-            empty_df = pd.DataFrame({
-                'vector': [np.zeros(1536, dtype=np.float32)],  # Vector field for embeddings
-                'id': ['init'],
-                'payload': [json.dumps({
-                    'name': 'initialization',
-                    'meta_data': {},
-                    'content': 'initialization',
-                    'usage': {}
-                })]
-            })
-            
-            # Create the table
-            connection.create_table("halo_knowledge", data=empty_df)
-            logger.info("Successfully created new 'halo_knowledge' table")
-        else:
-            logger.info("Table 'halo_knowledge' already exists in the database")
-        
-        # Initialize Knowledge with the new table
-        halo_knowledge = HaloKnowledge(
-            vector_db=LanceDb(
-                table_name="halo_knowledge",
-                uri=str(KNOWLEDGE_PATH),
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-            )
-        )
-        logger.info("Successfully initialized Knowledge with new table")
-    except Exception as inner_e:
-        logger.error(f"Failed to create LanceDB table: {inner_e}")
-        # Create a fallback by recreating the database directory
-        import shutil
-        logger.warning("Attempting to recreate the database directory as fallback")
-        
-        # Backup the existing directory if it exists
-        if KNOWLEDGE_PATH.exists():
-            backup_path = KNOWLEDGE_PATH.with_name(f"{KNOWLEDGE_PATH.name}_backup")
-            logger.info(f"Backing up existing database to {backup_path}")
-            if backup_path.exists():
-                shutil.rmtree(backup_path)
-            shutil.copytree(KNOWLEDGE_PATH, backup_path)
-            
-            # Remove the existing directory
-            logger.info(f"Removing existing database at {KNOWLEDGE_PATH}")
-            shutil.rmtree(KNOWLEDGE_PATH)
-        
-        # Create a fresh directory
-        KNOWLEDGE_PATH.mkdir(exist_ok=True, parents=True)
-        
-        # Try one more time with a fresh database
-        try:
-            from lancedb import connect
-            import pandas as pd
-            import numpy as np
-            
-            # Create a connection to the fresh database
-            logger.info(f"Creating fresh LanceDB connection to {KNOWLEDGE_PATH}")
-            connection = connect(str(KNOWLEDGE_PATH))
-            
-            # Create a single empty row to initialize the table with correct schema
-            empty_df = pd.DataFrame({
-                'vector': [np.zeros(1536, dtype=np.float32)],  # Vector field for embeddings
-                'id': ['init'],
-                'payload': [json.dumps({
-                    'name': 'initialization',
-                    'meta_data': {},
-                    'content': 'initialization',
-                    'usage': {}
-                })]
-
-            })
-            
-            # Define schema for the table
-            schema = pa.schema([
-                pa.field('vector', pa.list_(pa.float32(), 1536)),  # Vector field for embeddings
-                pa.field('id', pa.string()),  # Document ID
-                pa.field('payload', pa.string()),  # JSON string containing name, meta_data, content, usage
-            ])
-            
-            # Create the table with explicit schema
-            connection.create_table("halo_knowledge", data=empty_df, schema=schema)
-            logger.info("Successfully created fresh 'halo_knowledge' table")
-            
-            # Initialize Knowledge with the new table
-            halo_knowledge = HaloKnowledge(
-                vector_db=LanceDb(
-                    table_name="halo_knowledge",
-                    uri=str(KNOWLEDGE_PATH),
-                    search_type=SearchType.hybrid,
-                    embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-                )
-            )
-            logger.info("Successfully initialized HaloKnowledge with fresh table")
-        except Exception as final_e:
-            logger.error(f"All attempts to create LanceDB failed: {final_e}")
-            # Create a mock HaloKnowledge as absolute fallback
-            logger.warning("Creating mock HaloKnowledge instance as final fallback")
-            
-            # Create a minimal mock class that implements the required interface
-            class MockKnowledge:
-                def search(self, *args, **kwargs):
-                    return []
-                    
-                def add(self, *args, **kwargs):
-                    logger.warning("Mock knowledge base cannot store data")
-                    return True
-                    
-                def delete(self, *args, **kwargs):
-                    return True
-            
-            halo_knowledge = MockKnowledge()
+
+
+def _build_halo_sessions() -> SqliteDb:
+    """Build the sessions storage database and schedule its maintenance if enabled."""
+    db = create_sqlite_db(str(SESSIONS_PATH))
+    start_maintenance(session_dbs)
+    return db
+
+
+def session_dbs() -> List[Any]:
+    """Return every session database in use: the unsharded one and the shards on disk."""
+    dbs = [registry.get("halo_sessions")]
+    if registry.is_built("halo_session_shards"):
+        dbs.extend(registry.get("halo_session_shards").all_dbs())
+    return dbs
+
+
+def _build_halo_knowledge():
+    """Build the knowledge base, creating or rebuilding the LanceDB table if needed (see knowledge_setup.py)."""
+    # Imported here so that LanceDB is only loaded once knowledge is actually used
+    from knowledge_index import mark_existing_indexes
+    from knowledge_setup import halo_knowledge
+    from retrieval_cache import install_query_cache
+
+    # Reuse the full-text index built by earlier syncs instead of rebuilding it on the first search
+    mark_existing_indexes(getattr(halo_knowledge, "vector_db", None))
+    # Repeated queries of the leader and the members are embedded once
+    install_query_cache(getattr(halo_knowledge, "vector_db", None))
+    return halo_knowledge
+
+
+# Shared resources are built lazily on first use and reused by every session in the process
+registry.register("halo_memory", _build_halo_memory)
+registry.register("halo_sessions", _build_halo_sessions)
+registry.register("halo_knowledge", _build_halo_knowledge)
+registry.register("halo_session_shards", lambda: ShardRouter(SESSIONS_PATH))
+registry.register("halo_memory_shards", lambda: ShardRouter(MEMORY_PATH, table_types=("memories",)))
+
+halo_memory = LazyResource(registry, "halo_memory")
+halo_sessions = LazyResource(registry, "halo_sessions")
+halo_knowledge = LazyResource(registry, "halo_knowledge")
+
+
+def startup_timings() -> Dict[str, float]:
+    """Return the build time in seconds of every shared resource built so far."""
+    return registry.timings()
+
 
 # Function to show bot 
 def show_scotty(show=True):
@@ -264,23 +171,86 @@ def show_scotty(show=True):
     )
 
 
+# Prebuilt HALO Team templates shared by all sessions in the process
+halo_pool = TemplatePool("HALO team", max_size=config.HALO_POOL_SIZE)
+
+
 def create_halo(
     config: HaloConfig, session_id: Optional[str] = None, debug_mode: bool = True
 ) -> Team:
     """Returns an instance of the HALO Agent Interface (HALO)
 
+    The Team and its members are taken from a process-wide pool keyed by model,
+    tools and agents. Only the user and session are bound per call, and the
+    members are cloned from their templates, so changing the User ID or switching
+    sessions does not rebuild the team.
+
     Args:
         config: HALO configuration
         session_id: Session identifier
         debug_mode: Enable debug logging
     """
+    tools = tuple(sorted(set(config.tools or [])))
+    agents = tuple(config.agents or [])
+    key = (config.model_id, tools, agents, debug_mode)
+
+    return halo_pool.checkout(
+        key,
+        builder=lambda: _build_halo_template(config.model_id, list(tools), list(agents), debug_mode),
+        overlay=lambda template: _bind_halo(template, user_id=config.user_id, session_id=session_id),
+    )
+
+
+def halo_pool_stats() -> Dict[str, Any]:
+    """Return hit/miss counters and build/bind timings of the HALO team pool."""
+    return halo_pool.stats()
+
+
+def _bind_halo(template: Team, user_id: str, session_id: Optional[str]) -> Team:
+    """Bind a pooled HALO template to a user and session.
+
+    The copy shares the model and toolkits of the template. Top-level dicts and
+    lists are copied, and every member agent is cloned: agno rebinds the tools of a
+    member on each run with functions capturing the run's user and references, so
+    members shared between sessions would mix the runs of different users.
+    """
+    halo = copy.copy(template)
+    for attr, value in vars(template).items():
+        # type() rather than isinstance() so the lazy knowledge proxy is not resolved
+        if type(value) in (dict, list):
+            setattr(halo, attr, copy.copy(value))
+    halo.members = [_clone_agent(member) if isinstance(member, Agent) else member for member in template.members or []]
+    halo.user_id = user_id
+    halo.session_id = session_id
+    if config.STORAGE_SHARDING != "off":
+        # Sessions and team memories of the user go to their shard; the memory manager
+        # is created from halo.db on the first run of the bound team
+        halo.db = registry.get("halo_session_shards").db_for(user_id)
+        memory_manager = getattr(halo, "memory_manager", None)
+        if memory_manager is not None and memory_manager.db is template.db:
+            halo.memory_manager = copy.copy(memory_manager)
+            halo.memory_manager.db = halo.db
+    return halo
+
+
+def _build_halo_template(
+    model_id: str, tool_names: List[str], agent_names: List[str], debug_mode: bool = True
+) -> Team:
+    """Build a HALO Team that is not bound to a user or session yet.
+
+    Args:
+        model_id: Model identifier in the form provider:model
+        tool_names: Names of the toolkits for the team leader
+        agent_names: Names of the member agents
+        debug_mode: Enable debug logging
+    """
     # Parse model provider and name
-    provider, model_name = config.model_id.split(":")
+    provider, model_name = model_id.split(":")
 
     # Create model class based on provider
     model = None
     if provider == "openai":
-        model = OpenAIChat(id=model_name)
+        model = PooledOpenAIChat(id=model_name)
     elif provider == "google":
         model = Gemini(id=model_name)
     elif provider == "anthropic":
@@ -290,13 +260,13 @@ def create_halo(
     else:
         raise ValueError(f"Unsupported model provider: {provider}")
     if model is None:
-        raise ValueError(f"Failed to create model instance for {config.model_id}")
+        raise ValueError(f"Failed to create model instance for {model_id}")
 
     # Default tools that should always be available
     default_tools = []
     
     # Combine default tools with user-selected tools, removing duplicates
-    all_tools = list(set((config.tools or []) + default_tools))
+    all_tools = list(set(tool_names + default_tools))
     
     tools: List[Toolkit] = [ReasoningTools(add_instructions=True)]
     for tool_name in all_tools:
@@ -307,8 +277,8 @@ def create_halo(
             logger.warning(f"Tool {tool_name} not found")
 
     agents: List[Agent] = []
-    if config.agents:
-        for agent_name in config.agents:
+    if agent_names:
+        for agent_name in agent_names:
             agent = get_agent(agent_name, model, halo_memory, halo_knowledge, debug_mode=debug_mode)
             if agent is not None:
                 agents.append(agent)
@@ -353,11 +323,10 @@ def create_halo(
     halo = Team(
         name="HALO Agent Interface",
         model=model,
-        user_id=config.user_id,
-        session_id=session_id,
         tools=tools,
         members=agents,
-        db=halo_sessions,
+        db=registry.get("halo_sessions"),
+        # Passed as a lazy proxy so LanceDB is only opened once knowledge is searched or loaded
         knowledge=halo_knowledge,
         description=description,
         instructions=instructions,
@@ -373,6 +342,6 @@ def create_halo(
         debug_mode=debug_mode,
     )
 
-    agent_names = [a.name for a in agents] if agents else []
-    logger.info(f"HALO created with members: {agent_names}")
+    member_names = [a.name for a in agents] if agents else []
+    logger.info(f"HALO created with members: {member_names}")
     return halo
@@ -0,0 +1,315 @@
+"""
+Process-wide HTTP client pool for the HALO Agent Interface.
+
+Model providers and tools share long-lived httpx clients instead of opening new
+connections (and TLS handshakes) for every client they construct. There is one
+client per host, so connection limits apply per host, and keep-alive
+connections are reused by every team member and tool talking to that host.
+
+httpx async clients are bound to the event loop they were used in. Streamlit
+runs every script run in its own event loop, so async clients are kept per host
+and per running loop, and closed when their loop shuts down (``asyncio.run``
+cancels the remaining tasks, including the one waiting to close the client).
+"""
+
+import asyncio
+import functools
+import ssl
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+import httpx
+from agno.models.openai import OpenAIChat, OpenAIResponses
+from agno.utils.log import logger
+from openai import AsyncOpenAI, OpenAI
+
+from config import config
+
+DEFAULT_OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+def ca_bundle() -> Optional[str]:
+    """Return the CA bundle used to verify TLS connections, or None if verification is disabled."""
+    if not config.SSL_VERIFY:
+        return None
+    if config.CA_BUNDLE:
+        return config.CA_BUNDLE
+    import certifi
+
+    return certifi.where()
+
+
+@functools.lru_cache(maxsize=None)
+def ssl_context() -> Union[ssl.SSLContext, bool]:
+    """Return the SSL context shared by all pooled httpx clients, or False if verification is disabled."""
+    bundle = ca_bundle()
+    if bundle is None:
+        return False
+    return ssl.create_default_context(cafile=bundle)
+
+
+def no_cookies() -> DefaultCookiePolicy:
+    """Cookie policy of the pooled clients: they serve every user, so no cookie is kept between requests."""
+    return DefaultCookiePolicy(allowed_domains=[])
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass
+class HostStats:
+    """Connection counters of one host, updated with the lock of the pool held."""
+
+    requests: int = 0
+    connections: int = 0
+    tls_handshakes: int = 0
+    http2_requests: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "tls_handshakes": self.tls_handshakes,
+            "http2_requests": self.http2_requests,
+            "errors": self.errors,
+            # Share of requests sent on an already open connection
+            "hit_rate": 1 - self.connections / self.requests if self.requests else None,
+        }
+
+
+@dataclass
+class HttpPoolSettings:
+    """Limits and timeouts of the pooled clients, read from the app config."""
+
+    max_connections: int = config.HTTP_MAX_CONNECTIONS_PER_HOST
+    max_keepalive_connections: int = config.HTTP_MAX_KEEPALIVE_PER_HOST
+    keepalive_expiry: float = config.HTTP_KEEPALIVE_EXPIRY
+    timeout: float = config.HTTP_TIMEOUT
+    http2: bool = field(default_factory=lambda: config.HTTP2 and _http2_available())
+
+
+class HttpClientPool:
+    """Shared httpx clients, one per host, with connection statistics."""
+
+    def __init__(self, settings: Optional[HttpPoolSettings] = None):
+        self.settings = settings or HttpPoolSettings()
+        self._sync_clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[Tuple[str, int], Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+        self._openai_clients: Dict[str, OpenAI] = {}
+        self._stats: Dict[str, HostStats] = {}
+        # Re-entrant: clients are created (and their stats registered) while the lock is held
+        self._lock = threading.RLock()
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.settings.max_connections,
+                max_keepalive_connections=self.settings.max_keepalive_connections,
+                keepalive_expiry=self.settings.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.settings.timeout, connect=10.0),
+            "http2": self.settings.http2,
+            "verify": ssl_context(),
+            "follow_redirects": True,
+            "cookies": CookieJar(no_cookies()),
+        }
+
+    def _host_stats(self, host: str) -> HostStats:
+        with self._lock:
+            return self._stats.setdefault(host, HostStats())
+
+    def _count(self, stats: HostStats, counter: str) -> None:
+        # Clients of a host are used from several threads (and event loops) at once
+        with self._lock:
+            setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def _trace(self, stats: HostStats):
+        """Build an httpcore trace callback that counts new connections and TLS handshakes."""
+        counters = {
+            "connection.connect_tcp.complete": "connections",
+            "connection.start_tls.complete": "tls_handshakes",
+            "http2.send_request_headers.started": "http2_requests",
+        }
+
+        def count(event_name: str) -> None:
+            counter = counters.get(event_name)
+            if counter is not None:
+                self._count(stats, counter)
+
+        return count
+
+    def _sync_hooks(self, host: str) -> Dict[str, Any]:
+        stats = self._host_stats(host)
+        trace = self._trace(stats)
+
+        def on_request(request: httpx.Request) -> None:
+            self._count(stats, "requests")
+            request.extensions["trace"] = lambda event_name, info: trace(event_name)
+
+        def on_response(response: httpx.Response) -> None:
+            if response.status_code >= 500:
+                self._count(stats, "errors")
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def _async_hooks(self, host: str) -> Dict[str, Any]:
+        stats = self._host_stats(host)
+        trace = self._trace(stats)
+
+        async def traced(event_name: str, info: Dict[str, Any]) -> None:
+            trace(event_name)
+
+        async def on_request(request: httpx.Request) -> None:
+            self._count(stats, "requests")
+            request.extensions["trace"] = traced
+
+        async def on_response(response: httpx.Response) -> None:
+            if response.status_code >= 500:
+                self._count(stats, "errors")
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def sync_client(self, host: str) -> httpx.Client:
+        """Return the shared synchronous client of a host.
+
+        Args:
+            host: Host name (optionally with port) the client talks to
+        """
+        client = self._sync_clients.get(host)
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._sync_clients.get(host)
+                if client is None or client.is_closed:
+                    client = httpx.Client(event_hooks=self._sync_hooks(host), **self._client_kwargs())
+                    self._sync_clients[host] = client
+                    logger.debug(f"Created pooled HTTP client for {host}")
+        return client
+
+    def async_client(self, host: str) -> httpx.AsyncClient:
+        """Return the shared asynchronous client of a host for the running event loop.
+
+        Args:
+            host: Host name (optionally with port) the client talks to
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = asyncio.get_event_loop()
+        key = (host, id(loop))
+        with self._lock:
+            # Drop clients of loops that were closed without shutting them down (not through
+            # asyncio.run); their connections cannot be used or closed on another loop
+            for stale_key in [k for k, (l, _) in self._async_clients.items() if l.is_closed()]:
+                del self._async_clients[stale_key]
+                logger.debug(f"Dropped the pooled HTTP client of {stale_key[0]} of a closed event loop")
+            entry = self._async_clients.get(key)
+            if entry is None or entry[0] is not loop or entry[1].is_closed:
+                client = httpx.AsyncClient(event_hooks=self._async_hooks(host), **self._client_kwargs())
+                self._async_clients[key] = (loop, client)
+                if loop.is_running():
+                    loop.create_task(self._close_with_loop(key, client), name=f"close-http-client-{host}")
+                return client
+            return entry[1]
+
+    async def _close_with_loop(self, key: Tuple[str, int], client: httpx.AsyncClient) -> None:
+        """Close an async client when its event loop shuts down and cancels this task."""
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            with self._lock:
+                entry = self._async_clients.get(key)
+                if entry is not None and entry[1] is client:
+                    del self._async_clients[key]
+            await client.aclose()
+
+    def openai_client(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> OpenAI:
+        """Return a cached OpenAI client that sends its requests through the pool.
+
+        Args:
+            base_url: API base URL. Defaults to OPENAI_BASE_URL or the OpenAI API.
+            api_key: API key. Defaults to OPENAI_API_KEY.
+        """
+        base_url = base_url or config.OPENAI_BASE_URL or DEFAULT_OPENAI_BASE_URL
+        key = f"{base_url}|{api_key or ''}"
+        client = self._openai_clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._openai_clients.get(key)
+                if client is None:
+                    client = OpenAI(api_key=api_key, base_url=base_url, http_client=self.sync_client(host_of(base_url)))
+                    self._openai_clients[key] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the connection counters per host and the number of open clients."""
+        with self._lock:
+            return {
+                "http2": self.settings.http2,
+                "sync_clients": len(self._sync_clients),
+                "async_clients": len(self._async_clients),
+                "hosts": {host: stats.as_dict() for host, stats in self._stats.items()},
+            }
+
+    def close(self) -> None:
+        """Close all synchronous clients. Async clients are dropped with their event loop."""
+        with self._lock:
+            for client in self._sync_clients.values():
+                client.close()
+            self._sync_clients.clear()
+            self._async_clients.clear()
+            self._openai_clients.clear()
+
+
+def host_of(base_url: Optional[str]) -> str:
+    """Return the host (and port) of a base URL, defaulting to the OpenAI API."""
+    url = str(base_url or config.OPENAI_BASE_URL or DEFAULT_OPENAI_BASE_URL)
+    return urlparse(url).netloc or url
+
+
+class _PooledClients:
+    """OpenAI clients of a model, sending their requests through the shared HTTP pool.
+
+    The synchronous client is kept on the model; the asynchronous one is built per call
+    around the pooled client of the running event loop.
+    """
+
+    def get_client(self):
+        client = getattr(self, "client", None)
+        if client is not None and not client.is_closed():
+            return client
+        client_params = self._get_client_params()
+        client_params["http_client"] = http_pool.sync_client(host_of(client_params.get("base_url")))
+        self.client = OpenAI(**client_params)
+        return self.client
+
+    def get_async_client(self):
+        client_params = self._get_client_params()
+        client_params["http_client"] = http_pool.async_client(host_of(client_params.get("base_url")))
+        return AsyncOpenAI(**client_params)
+
+    def __deepcopy__(self, memo):
+        # Agents copy their model; a copied client would carry a copy of the pooled HTTP client
+        model = super().__deepcopy__(memo)
+        model.client = None
+        return model
+
+
+class PooledOpenAIChat(_PooledClients, OpenAIChat):
+    """OpenAIChat that sends its requests through the shared HTTP pool."""
+
+
+class PooledOpenAIResponses(_PooledClients, OpenAIResponses):
+    """OpenAIResponses that sends its requests through the shared HTTP pool."""
+
+
+# Single pool shared by the whole process
+http_pool = HttpClientPool()
@@ -0,0 +1,222 @@
+"""
+Background ingestion of uploaded documents and URLs into the knowledge base.
+
+The knowledge widget used to parse uploads and scrape URLs in the script
+thread and then embed every chunk with its own request, freezing the page for
+the whole upload and starting over if the rerun was interrupted. Now the widget
+only enqueues a job and polls its status:
+
+- worker threads (``INGEST_WORKERS``) parse, embed in batches
+  (``HaloKnowledge.load_documents``) and write the documents
+- a job is identified by the hash of its source; submitting a source that is
+  still queued or running returns the existing job
+- failed steps are retried with backoff (``INGEST_MAX_ATTEMPTS``); parsed
+  documents are kept across attempts, and writes replace the documents of the
+  same source, so retries never add duplicates
+"""
+
+import hashlib
+import io
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from agno.utils.log import logger
+
+from config import config
+from knowledge import reader_for
+
+
+SUPPORTED_TYPES = ("pdf", "csv", "txt", "docx")
+
+
+class IngestionError(Exception):
+    """A job failure that retrying cannot fix, e.g. a source without text."""
+
+
+@dataclass
+class IngestionJob:
+    """An upload or URL being added to the knowledge base."""
+
+    job_id: str
+    name: str
+    kind: str
+    content_hash: str
+    status: str = "queued"  # queued, parsing, embedding, writing, done, failed
+    done: int = 0
+    total: int = 0
+    attempts: int = 0
+    error: Optional[str] = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Source and parsed documents, released when the job finishes
+    payload: Any = field(default=None, repr=False)
+    knowledge: Any = field(default=None, repr=False)
+    documents: Optional[List[Any]] = field(default=None, repr=False)
+
+    @property
+    def active(self) -> bool:
+        return self.status not in ("done", "failed")
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the job completed, for a progress bar."""
+        if self.status == "done":
+            return 1.0
+        if self.status == "writing":
+            return 0.95
+        if self.status == "embedding" and self.total:
+            # Parsing counts for the first 10%, embedding up to 90%
+            return 0.1 + 0.8 * self.done / self.total
+        return 0.05 if self.status == "parsing" else 0.0
+
+    @property
+    def seconds(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return round((self.finished_at or time.time()) - self.started_at, 1)
+
+
+class IngestionQueue:
+    """Queue of ingestion jobs processed by a pool of daemon worker threads."""
+
+    def __init__(self, workers: Optional[int] = None, max_attempts: Optional[int] = None, history: int = 200):
+        """
+        Args:
+            workers: Number of worker threads. Defaults to config.INGEST_WORKERS.
+            max_attempts: Attempts per job before it fails. Defaults to config.INGEST_MAX_ATTEMPTS.
+            history: Finished jobs kept for status queries
+        """
+        self.workers = max(1, workers or config.INGEST_WORKERS)
+        self.max_attempts = max(1, max_attempts or config.INGEST_MAX_ATTEMPTS)
+        self.history = history
+        self._queue: "queue.Queue[IngestionJob]" = queue.Queue()
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit_file(self, knowledge: Any, filename: str, data: bytes) -> str:
+        """Queue an uploaded file and return the id of its job.
+
+        Raises:
+            ValueError: If the file type is not supported
+        """
+        file_type = filename.rsplit(".", 1)[-1].lower()
+        if file_type not in SUPPORTED_TYPES:
+            raise ValueError(f"Unsupported file type: {file_type}")
+        content_hash = hashlib.sha256(data).hexdigest()
+        return self._submit(knowledge, filename, "file", content_hash, data)
+
+    def submit_url(self, knowledge: Any, url: str) -> str:
+        """Queue a website to scrape and return the id of its job."""
+        content_hash = hashlib.sha256(f"url:{url}".encode("utf-8")).hexdigest()
+        return self._submit(knowledge, url, "url", content_hash, url)
+
+    def _submit(self, knowledge: Any, name: str, kind: str, content_hash: str, payload: Any) -> str:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.content_hash == content_hash and job.active:
+                    return job.job_id
+            job = IngestionJob(
+                job_id=uuid.uuid4().hex[:12], name=name, kind=kind, content_hash=content_hash,
+                payload=payload, knowledge=knowledge,
+            )
+            self._jobs[job.job_id] = job
+            self._prune()
+            self._start_workers()
+        self._queue.put(job)
+        logger.info(f"Queued ingestion job {job.job_id} for {name}")
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        finished = [job for job in self._jobs.values() if not job.active]
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[:max(0, len(self._jobs) - self.history)]:
+            del self._jobs[job.job_id]
+
+    def _start_workers(self) -> None:
+        # Started on the first submit, so importing the module costs nothing
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"halo-ingest-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: IngestionJob) -> None:
+        job.started_at = time.time()
+        while True:
+            job.attempts += 1
+            try:
+                self._ingest(job)
+                job.status = "done"
+                break
+            except Exception as e:
+                logger.warning(f"Ingestion job {job.job_id} ({job.name}) failed in attempt {job.attempts}: {e}")
+                if isinstance(e, IngestionError) or job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = str(e)
+                    break
+                time.sleep(min(2 ** job.attempts, 30))
+        job.finished_at = time.time()
+        job.payload = job.knowledge = job.documents = None
+        logger.info(f"Ingestion job {job.job_id} {job.status} after {job.seconds}s")
+
+    def _ingest(self, job: IngestionJob) -> None:
+        if job.documents is None:
+            job.status = "parsing"
+            job.documents = self._parse(job)
+            if not job.documents:
+                raise IngestionError("No text could be read from the source")
+        job.status = "embedding"
+        job.done, job.total = 0, len(job.documents)
+
+        def progress(done: int, total: int) -> None:
+            job.done = done
+            if done >= total:
+                job.status = "writing"
+
+        job.knowledge.load_documents(job.documents, upsert=True, content_hash=job.content_hash, progress=progress)
+
+    @staticmethod
+    def _parse(job: IngestionJob) -> List[Any]:
+        if job.kind == "url":
+            from agno.knowledge.reader.website_reader import WebsiteReader
+
+            return WebsiteReader(max_links=2, max_depth=1).read(job.payload)
+        file = io.BytesIO(job.payload)
+        file.name = job.name
+        reader = reader_for(job.name.rsplit(".", 1)[-1].lower())
+        return reader.read(file)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of jobs per status and the queue length."""
+        counts: Dict[str, int] = {}
+        for job in list(self._jobs.values()):
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {"queued": self._queue.qsize(), "workers": len(self._threads), "jobs": counts}
+
+    def wait(self, job_id: str, timeout: Optional[float] = None, poll: float = 0.1) -> Optional[IngestionJob]:
+        """Block until a job has finished (for scripts and benchmarks) and return it."""
+        deadline = None if timeout is None else time.time() + timeout
+        job = self.get(job_id)
+        while job is not None and job.active and (deadline is None or time.time() < deadline):
+            time.sleep(poll)
+        return job
+
+
+# Single queue shared by all sessions of the process
+ingestion_queue = IngestionQueue()
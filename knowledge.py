@@ -2,20 +2,37 @@
 Custom knowledge implementation for the HALO Agent Interface
 """
 
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterator, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from agno.knowledge.document import Document
 from agno.knowledge.reader.text_reader import TextReader
 from agno.knowledge.knowledge import Knowledge
 from agno.utils.log import logger
 
+from config import config
+from knowledge_index import IndexReport, ensure_indexes
+from retrieval_cache import get_retrieval_cache, query_scope
+
+# LanceDB tables are written by one thread at a time
+_write_lock = threading.Lock()
+
+# Sources per delete statement
+DELETE_CHUNK = 100
+MANIFEST_VERSION = 1
+
 
 class HaloKnowledge(Knowledge):
     """Custom knowledge implementation for the HALO Agent Interface."""
     
     knowledge_dir: Optional[Path] = None
-    formats: List[str] = [".txt", ".md"]
+    formats: List[str] = [".txt", ".md", ".pdf", ".docx"]
     reader: TextReader = TextReader()
     
     def __init__(self, **kwargs):
@@ -77,21 +94,8 @@ class HaloKnowledge(Knowledge):
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(content)
             
-            # Load the document into the vector database
-            documents = self.reader.read(file=file_path)
-            
-            if metadata:
-                for doc in documents:
-                    doc.meta_data.update(metadata)
-            
-            # Process and index the documents
-            self.process_documents(
-                documents=documents,
-                metadata=metadata,
-                upsert=True,
-                skip_existing=False,
-                source_info=str(file_path),
-            )
+            # Load the new file (and any other change of the directory) into the vector database
+            self.sync(metadata={file_path.name: metadata} if metadata else None)
             
             logger.info(f"Added document to knowledge base: {file_path}")
             return True
@@ -99,3 +103,486 @@ class HaloKnowledge(Knowledge):
         except Exception as e:
             logger.exception(f"Failed to add document {filename}: {e}")
             return False
+
+    def search(
+        self, query: str, max_results: Optional[int] = None, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Return relevant documents for a query, from the retrieval cache when the table did not change."""
+        cache = get_retrieval_cache(self.vector_db)
+        if cache is None:
+            with query_scope():
+                return super().search(query=query, max_results=max_results, filters=filters)
+        key = cache.result_key(self.vector_db, query, max_results or self.max_results, filters)
+        documents, version = cache.get_results(self.vector_db, key)
+        if documents is None:
+            with query_scope():
+                documents = super().search(query=query, max_results=max_results, filters=filters)
+            if documents:
+                cache.put_results(key, version, documents)
+        return documents
+
+    async def async_search(
+        self, query: str, max_results: Optional[int] = None, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        cache = get_retrieval_cache(self.vector_db)
+        if cache is None:
+            with query_scope():
+                return await super().async_search(query=query, max_results=max_results, filters=filters)
+        key = cache.result_key(self.vector_db, query, max_results or self.max_results, filters)
+        documents, version = cache.get_results(self.vector_db, key)
+        if documents is None:
+            with query_scope():
+                documents = await super().async_search(query=query, max_results=max_results, filters=filters)
+            if documents:
+                cache.put_results(key, version, documents)
+        return documents
+
+    def _invalidate_retrieval_cache(self) -> None:
+        cache = get_retrieval_cache(self.vector_db)
+        if cache is not None:
+            cache.invalidate()
+
+    def load_documents(
+        self,
+        documents: List[Document],
+        upsert: bool = True,
+        content_hash: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """Embed documents in batches and write them to the vector database.
+
+        Args:
+            documents: Chunked documents, as returned by a reader
+            upsert: Replace the documents previously loaded with the same content hash
+            content_hash: Identifies the source of the documents (e.g. the hash of the uploaded
+                file), so loading the same source again replaces it instead of adding duplicates.
+                Defaults to a hash of the document contents.
+            filters: Metadata added to every document
+            batch_size: Documents per embedding request. Defaults to config.INGEST_EMBED_BATCH.
+            progress: Called with (embedded, total) after every batch
+
+        Returns:
+            Number of documents written
+        """
+        documents = [doc for doc in documents if doc.content]
+        if not documents:
+            return 0
+        if content_hash is None:
+            digest = hashlib.sha256()
+            for doc in documents:
+                digest.update(doc.content.encode("utf-8"))
+            content_hash = digest.hexdigest()
+        self._embed(documents, batch_size, progress)
+
+        with _write_lock:
+            if upsert and self.vector_db.content_hash_exists(content_hash):
+                self._delete_sources_unlocked([content_hash])
+            self._write_embedded([(content_hash, documents)], filters)
+        self._invalidate_retrieval_cache()
+        ensure_indexes(self.vector_db)
+        logger.info(f"Loaded {len(documents)} documents into the knowledge base")
+        return len(documents)
+
+    def _embed(
+        self,
+        documents: List[Document],
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Set the embedding of every document, with one embedding request per batch."""
+        batch_size = batch_size or config.INGEST_EMBED_BATCH
+        embedder = self.vector_db.embedder
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            texts = [doc.content for doc in batch]
+            if hasattr(embedder, "get_embeddings_batch"):
+                vectors = embedder.get_embeddings_batch(texts, batch_size=batch_size)
+            else:
+                vectors = [embedder.get_embedding(text) for text in texts]
+            if len(vectors) != len(batch) or not all(vectors):
+                raise RuntimeError(f"Embedding failed for {sum(not v for v in vectors)} of {len(batch)} documents")
+            for doc, vector in zip(batch, vectors):
+                doc.embedding = vector
+            if progress is not None:
+                progress(min(start + batch_size, len(documents)), len(documents))
+
+    def _write_embedded(self, sources: List[Tuple[str, List[Document]]], filters: Optional[Dict[str, Any]] = None) -> None:
+        """Write documents with their embeddings already set, in the row format of agno's LanceDb.
+
+        Args:
+            sources: Content hash and documents of every source, written with a single table update
+            filters: Metadata added to every document
+        """
+        vector_db = self.vector_db
+        if getattr(vector_db, "table", None) is None or not hasattr(vector_db, "_prepare_vector"):
+            # Other vector databases embed on insert
+            for content_hash, documents in sources:
+                vector_db.insert(content_hash=content_hash, documents=documents, filters=filters)
+            return
+        rows = []
+        for content_hash, documents in sources:
+            for doc in documents:
+                meta_data = dict(doc.meta_data or {})
+                if filters:
+                    meta_data.update(filters)
+                content = _clean(doc.content)
+                rows.append({
+                    "id": row_id(content),
+                    "vector": vector_db._prepare_vector(doc.embedding),
+                    "payload": json.dumps({
+                        "name": doc.name,
+                        "meta_data": meta_data,
+                        "content": content,
+                        "usage": doc.usage,
+                        "content_id": doc.content_id,
+                        "content_hash": content_hash,
+                    }),
+                })
+        if not rows:
+            return
+        if getattr(vector_db, "on_bad_vectors", None) is not None:
+            vector_db.table.add(rows, on_bad_vectors=vector_db.on_bad_vectors, fill_value=vector_db.fill_value)
+        else:
+            vector_db.table.add(rows)
+
+    def delete_sources(self, content_hashes: List[str]) -> int:
+        """Delete the rows of sources by their content hash, with one delete per chunk of hashes.
+
+        Rows are matched on the content hash in their payload, not on their id: the id
+        is derived from the chunk text alone, so a chunk found in two files has the same
+        id in both.
+
+        Returns:
+            Rows deleted
+        """
+        with _write_lock:
+            deleted = self._delete_sources_unlocked(content_hashes)
+        self._invalidate_retrieval_cache()
+        return deleted
+
+    def _delete_sources_unlocked(self, content_hashes: List[str]) -> int:
+        """Body of ``delete_sources``; the caller holds ``_write_lock``."""
+        content_hashes = list(dict.fromkeys(content_hashes))
+        if not content_hashes:
+            return 0
+        table = getattr(self.vector_db, "table", None)
+        if table is None:
+            # Other vector databases delete by content hash themselves, without a row count
+            for content_hash in content_hashes:
+                self.vector_db._delete_by_content_hash(content_hash)
+            return 0
+        before = table.count_rows()
+        for start in range(0, len(content_hashes), DELETE_CHUNK):
+            # Hex digests, as serialized in the JSON payload of agno's LanceDb rows
+            table.delete(" OR ".join(
+                f"payload LIKE '%\"content_hash\": \"{content_hash}\"%'"
+                for content_hash in content_hashes[start:start + DELETE_CHUNK]
+            ))
+        return before - table.count_rows()
+
+    # --- Manifest-driven sync of the knowledge directory ---
+
+    @property
+    def manifest_path(self) -> Path:
+        """Manifest of the files loaded from the knowledge directory, stored with the vector table."""
+        uri = getattr(self.vector_db, "uri", None)
+        table_name = getattr(self.vector_db, "table_name", "knowledge")
+        folder = Path(uri) if uri else self.knowledge_dir
+        return folder / f"{table_name}_manifest.json"
+
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        # A manifest without the vectors it describes (table dropped or emptied) is stale
+        table = getattr(self.vector_db, "table", None)
+        try:
+            if table is not None and table.count_rows() == 0:
+                return {}
+        except Exception:
+            pass
+        return manifest.get("files", {})
+
+    def _write_manifest(self, files: Dict[str, Dict[str, Any]]) -> None:
+        path = self.manifest_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".tmp")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": files}, f)
+        os.replace(partial, path)
+
+    def knowledge_files(self) -> List[Path]:
+        """Supported files in the knowledge directory."""
+        if not self.knowledge_dir or not self.knowledge_dir.exists():
+            return []
+        return sorted(p for fmt in self.formats for p in self.knowledge_dir.glob(f"*{fmt}") if p.is_file())
+
+    def sync(
+        self,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[str, int, int], None]] = None,
+        metadata: Optional[Dict[str, dict]] = None,
+        workers: Optional[int] = None,
+    ) -> "SyncReport":
+        """Bring the vector database in line with the knowledge directory.
+
+        Files are compared with the manifest by size and modification time, and by
+        content hash when those differ. Only new and changed files are parsed and
+        embedded; the vectors of changed and removed files are deleted by content hash.
+
+        Args:
+            batch_size: Documents per embedding request. Defaults to config.INGEST_EMBED_BATCH.
+            progress: Called with (file name, files done, files to load) after every file
+            metadata: Metadata of the documents of a file, by file name; kept in the manifest
+                and applied again when the file changes
+            workers: Processes parsing and chunking files in parallel. Defaults to
+                config.KNOWLEDGE_PARSE_WORKERS; 1 parses in this process.
+
+        Returns:
+            Counts and timings of the sync
+        """
+        report = SyncReport()
+        began = time.perf_counter()
+        manifest = self._read_manifest()
+        files: Dict[str, Dict[str, Any]] = {}
+        pending: List[Tuple[str, Path, os.stat_result, str]] = []
+
+        # Scan: stat every file, hash only those whose size or mtime changed
+        for path in self.knowledge_files():
+            key = path.name
+            stat = path.stat()
+            entry = manifest.get(key)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                files[key] = entry
+                report.unchanged += 1
+                continue
+            sha256 = _file_hash(path)
+            if entry and entry["sha256"] == sha256:
+                files[key] = {**entry, "mtime_ns": stat.st_mtime_ns}
+                report.unchanged += 1
+                continue
+            pending.append((key, path, stat, sha256))
+        report.seconds["scan"] = time.perf_counter() - began
+
+        # Vectors of changed and removed files
+        pending_keys = {key for key, *_ in pending}
+        stale_hashes: List[str] = []
+        for key, entry in manifest.items():
+            if key not in files:
+                stale_hashes.append(entry["content_hash"])
+                if key not in pending_keys:
+                    report.removed += 1
+        report.changed = len(pending_keys & manifest.keys())
+        report.added = len(pending) - report.changed
+        step = time.perf_counter()
+        report.chunks_deleted = self.delete_sources(stale_hashes)
+        report.seconds["delete"] = time.perf_counter() - step
+
+        # Parse, embed and write the new and changed files in batches
+        batch: List[Tuple[str, os.stat_result, str, Optional[dict], List[Document]]] = []
+        batch_docs = 0
+        flush_at = (batch_size or config.INGEST_EMBED_BATCH) * 4
+        parsed = self._parse_files(pending, workers or config.KNOWLEDGE_PARSE_WORKERS, report)
+        for done, (key, path, stat, sha256, documents) in enumerate(parsed, start=1):
+            meta_data = (metadata or {}).get(key) or manifest.get(key, {}).get("meta_data")
+            if meta_data:
+                for doc in documents:
+                    doc.meta_data.update(meta_data)
+            batch.append((key, stat, sha256, meta_data, documents))
+            batch_docs += len(documents)
+            if batch_docs >= flush_at or done == len(pending):
+                self._flush(batch, files, report, batch_size)
+                # Progress survives an interrupted sync
+                self._write_manifest(files)
+                batch, batch_docs = [], 0
+            if progress is not None:
+                progress(path.name, done, len(pending))
+
+        self._write_manifest(files)
+        step = time.perf_counter()
+        if report.chunks_written or report.chunks_deleted:
+            self._invalidate_retrieval_cache()
+        report.indexes = ensure_indexes(self.vector_db)
+        report.seconds["index"] = time.perf_counter() - step
+        report.seconds["total"] = time.perf_counter() - began
+        logger.info(f"Knowledge sync: {report.summary()}")
+        return report
+
+    def _parse_files(self, pending, workers: int, report: "SyncReport") -> Iterator[Tuple[str, Path, os.stat_result, str, List[Document]]]:
+        """Parse and chunk files, in a process pool if workers > 1, yielding them as they finish.
+
+        At most two files per worker are in flight, so parsed documents waiting to be
+        embedded and written stay bounded however large the directory is.
+        """
+        report.workers = max(1, workers)
+        if report.workers == 1 or len(pending) < 2:
+            for key, path, stat, sha256 in pending:
+                step = time.perf_counter()
+                documents = [doc for doc in read_file(path, self.reader) if doc.content]
+                report.seconds["parse"] += time.perf_counter() - step
+                yield key, path, stat, sha256, documents
+            return
+
+        import multiprocessing
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        items = iter(pending)
+        in_flight = {}
+        # Spawned, not forked: the LanceDB runtime of this process is not fork safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=report.workers, mp_context=context) as pool:
+            while True:
+                while len(in_flight) < report.workers * 2:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    in_flight[pool.submit(_timed_read, item[1], self.reader)] = item
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    key, path, stat, sha256 = in_flight.pop(future)
+                    documents, seconds = future.result()
+                    report.seconds["parse"] += seconds
+                    yield key, path, stat, sha256, [doc for doc in documents if doc.content]
+
+    def _flush(self, batch, files: Dict[str, Dict[str, Any]], report: "SyncReport", batch_size: Optional[int]) -> None:
+        documents = [doc for *_, docs in batch for doc in docs]
+        step = time.perf_counter()
+        if documents:
+            self._embed(documents, batch_size)
+        report.seconds["embed"] += time.perf_counter() - step
+        step = time.perf_counter()
+        sources = []
+        for key, stat, sha256, meta_data, docs in batch:
+            # Per path, so the rows of a file are deleted without those of a copy of it elsewhere
+            content_hash = hashlib.sha256(f"{key}:{sha256}".encode("utf-8")).hexdigest()
+            sources.append((content_hash, docs))
+            files[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": sha256,
+                "content_hash": content_hash,
+                "chunks": len(docs),
+            }
+            if meta_data:
+                files[key]["meta_data"] = meta_data
+        with _write_lock:
+            self._write_embedded(sources)
+        report.seconds["write"] += time.perf_counter() - step
+        report.chunks_written += len(documents)
+
+    def load(self, recreate: bool = False, **kwargs) -> "SyncReport":
+        """Load the knowledge directory into the vector database.
+
+        Args:
+            recreate: Drop the vector table and load every file again; otherwise only
+                new, changed and removed files are processed (see ``sync``)
+            kwargs: Passed to ``sync`` (batch_size, progress, metadata, workers)
+        """
+        if recreate:
+            self.vector_db.drop()
+            self.manifest_path.unlink(missing_ok=True)
+        if not self.vector_db.exists():
+            self.vector_db.create()
+        return self.sync(**kwargs)
+
+
+def _clean(content: str) -> str:
+    return content.replace("\x00", "\ufffd")
+
+
+def row_id(content: str) -> str:
+    """Id of the vector row of a chunk, as agno's LanceDb derives it."""
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def reader_for(file_type: str) -> Any:
+    """Return a reader for a file extension (without the dot), or None if the type is not supported."""
+    if file_type == "pdf":
+        from agno.knowledge.reader.pdf_reader import PDFReader
+
+        return PDFReader()
+    if file_type == "csv":
+        from agno.knowledge.reader.csv_reader import CSVReader
+
+        return CSVReader()
+    if file_type in ("txt", "md"):
+        return TextReader()
+    if file_type == "docx":
+        from agno.knowledge.reader.docx_reader import DocxReader
+
+        return DocxReader()
+    return None
+
+
+def read_file(path: Path, reader: Any = None) -> List[Document]:
+    """Read and chunk a knowledge file, with the reader for its extension unless it is a text file."""
+    file_type = path.suffix.lstrip(".").lower()
+    if reader is None or file_type not in ("txt", "md"):
+        reader = reader_for(file_type)
+    try:
+        return (reader.read(path) or []) if reader is not None else []
+    except Exception as e:
+        logger.exception(f"Failed to read document {path}: {e}")
+        return []
+
+
+def _timed_read(path: Path, reader: Any = None) -> Tuple[List[Document], float]:
+    """read_file in a worker process, with the time it took."""
+    began = time.perf_counter()
+    documents = read_file(path, reader)
+    return documents, time.perf_counter() - began
+
+
+@dataclass
+class SyncReport:
+    """Counts and timings of a knowledge sync."""
+
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    chunks_written: int = 0
+    chunks_deleted: int = 0
+    workers: int = 1
+    seconds: Dict[str, float] = field(
+        default_factory=lambda: {"scan": 0.0, "delete": 0.0, "parse": 0.0, "embed": 0.0, "write": 0.0, "index": 0.0, "total": 0.0}
+    )
+    indexes: Optional[IndexReport] = None
+
+    def throughput(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Files and chunks per second of the parse, embed and write stages.
+
+        Parse time is summed over the worker processes, so its rate is per worker
+        times the number of workers.
+        """
+        files = self.added + self.changed
+        rates: Dict[str, Dict[str, Optional[float]]] = {}
+        for stage in ("parse", "embed", "write"):
+            seconds = self.seconds[stage] / (self.workers if stage == "parse" else 1)
+            rates[stage] = {
+                "docs_per_s": round(files / seconds, 1) if seconds else None,
+                "chunks_per_s": round(self.chunks_written / seconds, 1) if seconds else None,
+            }
+        return rates
+
+    def summary(self) -> str:
+        return (
+            f"{self.added} added, {self.changed} changed, {self.removed} removed, {self.unchanged} unchanged; "
+            f"{self.chunks_written} chunks written, {self.chunks_deleted} deleted in {self.seconds['total']:.2f}s"
+        )
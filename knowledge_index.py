@@ -0,0 +1,239 @@
+"""
+Lifecycle of the vector and full-text indexes of the knowledge table.
+
+agno's LanceDb never builds a vector index, so every search scans all vectors,
+and it rebuilds the full-text index of the payload column from scratch on the
+first hybrid search of every process. ``ensure_indexes`` keeps both indexes in
+line with the table after every write:
+
+- the full-text (FTS) index of the payload is created as soon as the table has rows
+- the ANN index of the vectors (``KNOWLEDGE_ANN_INDEX``) is created once the table
+  holds ``KNOWLEDGE_ANN_MIN_ROWS`` rows; below that a flat scan is as fast
+- rows written after an index was built are searched by a flat scan until
+  ``KNOWLEDGE_INDEX_OPTIMIZE_ROWS`` of them have accumulated; then they are added
+  to the indexes incrementally (``optimize``)
+- the ANN index is retrained when the table has grown ``KNOWLEDGE_INDEX_RETRAIN_GROWTH``
+  times since the last training, so its partitions follow the data
+
+The row count of the last training is kept next to the table in
+``<table>_indexes.json``. ``python load_knowledge.py --reindex`` rebuilds both
+indexes from scratch.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agno.utils.log import logger
+
+from config import config
+
+# Column holding the JSON payload (content) of agno's LanceDb rows
+FTS_COLUMN = "payload"
+ANN_INDEX_TYPES = ("ivf_hnsw_sq", "ivf_pq")
+
+# Index builds of this process; LanceDB itself resolves concurrent commits of other processes
+_index_lock = threading.Lock()
+
+
+@dataclass
+class IndexReport:
+    """What ``ensure_indexes`` did to the indexes of a table."""
+
+    rows: int = 0
+    created: List[str] = field(default_factory=list)
+    optimized: bool = False
+    retrained: bool = False
+    unindexed_rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created) or self.optimized or self.retrained
+
+    def summary(self) -> str:
+        actions = [f"created {', '.join(self.created)}"] if self.created else []
+        if self.retrained:
+            actions.append("retrained the vector index")
+        elif self.optimized:
+            actions.append(f"indexed {self.unindexed_rows} new rows")
+        return f"{self.rows} rows; {'; '.join(actions) or 'indexes up to date'} in {self.seconds:.2f}s"
+
+
+def _table(vector_db: Any) -> Any:
+    # Only agno's LanceDb has a LanceDB table; other vector databases manage their own indexes
+    return getattr(vector_db, "table", None) if hasattr(vector_db, "_vector_col") else None
+
+
+def _state_path(vector_db: Any) -> Optional[Path]:
+    uri = getattr(vector_db, "uri", None)
+    if not uri:
+        return None
+    return Path(uri) / f"{getattr(vector_db, 'table_name', 'knowledge')}_indexes.json"
+
+
+def _read_state(vector_db: Any) -> Dict[str, Any]:
+    path = _state_path(vector_db)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (TypeError, OSError, ValueError):
+        return {}
+
+
+def _write_state(vector_db: Any, state: Dict[str, Any]) -> None:
+    path = _state_path(vector_db)
+    if path is None:
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".tmp")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(partial, path)
+
+
+def _indexes(table: Any) -> Dict[str, Dict[str, Any]]:
+    """Indexes of a table by column, with their type and indexed and unindexed row counts."""
+    indexes: Dict[str, Dict[str, Any]] = {}
+    for index in table.list_indices():
+        columns = list(getattr(index, "columns", []) or [])
+        info = {"name": index.name, "type": str(getattr(index, "index_type", "")), "indexed": None, "unindexed": None}
+        try:
+            stats = table.index_stats(index.name)
+            if stats is not None:
+                info["indexed"] = stats.num_indexed_rows
+                info["unindexed"] = stats.num_unindexed_rows
+        except Exception as e:
+            logger.debug(f"No statistics for index {index.name}: {e}")
+        for column in columns:
+            indexes[column] = info
+    return indexes
+
+
+def index_status(vector_db: Any) -> Dict[str, Any]:
+    """Return the row count and the indexes of the knowledge table (for the admin views and the CLI)."""
+    table = _table(vector_db)
+    if table is None:
+        return {"rows": None, "indexes": {}}
+    state = _read_state(vector_db)
+    return {
+        "rows": table.count_rows(),
+        "indexes": _indexes(table),
+        "ann_trained_rows": state.get("ann_trained_rows"),
+    }
+
+
+def _create_fts_index(table: Any) -> None:
+    try:
+        from lancedb.index import FTS
+
+        table.create_index(FTS_COLUMN, config=FTS(), replace=True)
+    except ImportError:
+        # LanceDB releases before the index configs
+        table.create_fts_index(FTS_COLUMN, replace=True)
+
+
+def create_ann_index(table: Any, column: str, rows: int, index_type: Optional[str] = None) -> None:
+    """Build (or rebuild) the ANN index of a vector column.
+
+    Args:
+        table: LanceDB table
+        column: Vector column
+        rows: Rows in the table, to size the partitions
+        index_type: "ivf_hnsw_sq" or "ivf_pq". Defaults to config.KNOWLEDGE_ANN_INDEX.
+    """
+    index_type = (index_type or config.KNOWLEDGE_ANN_INDEX).lower()
+    if index_type not in ANN_INDEX_TYPES:
+        index_type = "ivf_hnsw_sq"
+    # Partitions of a few thousand rows each, so k-means has enough rows to train; agno
+    # queries with the default l2 distance, which ranks normalized OpenAI embeddings like cosine
+    partitions = max(1, rows // 4096)
+    try:
+        from lancedb.index import HnswSq, IvfPq
+
+        if index_type == "ivf_pq":
+            index_config = IvfPq(distance_type="l2", num_partitions=partitions)
+        else:
+            index_config = HnswSq(distance_type="l2", num_partitions=partitions)
+        table.create_index(column, config=index_config, replace=True)
+    except ImportError:
+        table.create_index(
+            metric="l2", num_partitions=partitions, vector_column_name=column, replace=True,
+            index_type=index_type.upper(),
+        )
+
+
+def ensure_indexes(vector_db: Any, rebuild: bool = False) -> IndexReport:
+    """Create, update or retrain the indexes of the knowledge table as its size requires.
+
+    Cheap when nothing is to be done, so it runs after every sync and ingestion batch.
+
+    Args:
+        vector_db: agno LanceDb of the knowledge base; other vector databases are left alone
+        rebuild: Build both indexes from scratch, whatever their state
+
+    Returns:
+        What was done
+    """
+    report = IndexReport()
+    table = _table(vector_db)
+    if table is None:
+        return report
+    began = time.perf_counter()
+    with _index_lock:
+        try:
+            rows = report.rows = table.count_rows()
+            if rows == 0:
+                return report
+            column = getattr(vector_db, "_vector_col", "vector")
+            indexes = _indexes(table)
+            state = _read_state(vector_db)
+
+            if rebuild or FTS_COLUMN not in indexes:
+                _create_fts_index(table)
+                report.created.append("fts")
+
+            ann_wanted = rows >= config.KNOWLEDGE_ANN_MIN_ROWS
+            trained = state.get("ann_trained_rows") or 0
+            if ann_wanted and (rebuild or column not in indexes):
+                create_ann_index(table, column, rows)
+                report.created.append(config.KNOWLEDGE_ANN_INDEX)
+                state["ann_trained_rows"] = rows
+            elif column in indexes and trained and rows >= trained * config.KNOWLEDGE_INDEX_RETRAIN_GROWTH:
+                # New rows were added to partitions trained on a much smaller table
+                create_ann_index(table, column, rows)
+                report.retrained = True
+                state["ann_trained_rows"] = rows
+
+            if not report.created and not report.retrained:
+                report.unindexed_rows = max((info["unindexed"] or 0) for info in indexes.values()) if indexes else 0
+                if report.unindexed_rows >= config.KNOWLEDGE_INDEX_OPTIMIZE_ROWS:
+                    table.optimize()
+                    report.optimized = True
+
+            if report.changed:
+                _write_state(vector_db, state)
+            # agno builds its own full-text index on the first search unless told it exists
+            vector_db.fts_index_exists = True
+        except Exception as e:
+            logger.warning(f"Updating the knowledge indexes failed: {e}")
+    report.seconds = time.perf_counter() - began
+    if report.changed:
+        logger.info(f"Knowledge indexes: {report.summary()}")
+    return report
+
+
+def mark_existing_indexes(vector_db: Any) -> None:
+    """Tell agno's LanceDb about a full-text index built earlier, so it is not rebuilt on the first search."""
+    table = _table(vector_db)
+    if table is None:
+        return
+    try:
+        if FTS_COLUMN in _indexes(table):
+            vector_db.fts_index_exists = True
+    except Exception as e:
+        logger.debug(f"Could not list the knowledge indexes: {e}")
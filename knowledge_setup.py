@@ -0,0 +1,170 @@
+"""
+Knowledge base of the HALO Agent Interface, backed by LanceDB.
+
+Importing this module opens the knowledge table, creating it (and, as a last
+resort, the database directory) when it cannot be opened. halo.py imports it
+the first time the knowledge base is used, so LanceDB is not loaded when halo
+is imported; the result is ``halo_knowledge``.
+"""
+
+import json
+
+from agno.utils.log import logger
+from agno.vectordb.lancedb import LanceDb, SearchType
+
+from embedding_cache import CachedOpenAIEmbedder
+from halo import KNOWLEDGE_PATH
+from http_pool import http_pool
+from knowledge import HaloKnowledge
+
+# setup knowledge database
+try:
+    # First try to initialize with existing table
+    halo_knowledge = HaloKnowledge(
+        vector_db=LanceDb(
+            table_name="halo_knowledge",
+            uri=str(KNOWLEDGE_PATH),
+            search_type=SearchType.hybrid,
+            use_tantivy=False,
+            embedder=CachedOpenAIEmbedder(id="text-embedding-3-small", openai_client=http_pool.openai_client()),
+        )
+    )
+    logger.info("Successfully initialized LanceDb with existing table")
+except Exception as e:
+    logger.warning(f"Error initializing LanceDb: {e}")
+    try:
+        # Create a new LanceDb instance with schema definition
+        from lancedb import connect
+        import pyarrow as pa
+        
+        # Create a connection to the database
+        logger.info(f"Creating new LanceDB connection to {KNOWLEDGE_PATH}")
+        connection = connect(str(KNOWLEDGE_PATH))
+        
+        # Define schema for the table to match agno's LanceDB implementation
+        schema = pa.schema([
+            pa.field('vector', pa.list_(pa.float32(), 1536)),  # Vector field for embeddings
+            pa.field('id', pa.string()),  # Document ID
+            pa.field('payload', pa.string()),  # JSON string containing name, meta_data, content, usage
+        ])
+        
+        # Create an empty table if it doesn't exist
+        if "halo_knowledge" not in connection.table_names():
+            logger.info("Creating new 'halo_knowledge' table with schema")
+            # Create empty DataFrame with the schema
+            import pandas as pd
+            import numpy as np
+            
+            # Create a single empty row to initialize the table
+            empty_df = pd.DataFrame({
+                'vector': [np.zeros(1536, dtype=np.float32)],  # Vector field for embeddings
+                'id': ['init'],
+                'payload': [json.dumps({
+                    'name': 'initialization',
+                    'meta_data': {},
+                    'content': 'initialization',
+                    'usage': {}
+                })]
+            })
+            
+            # Create the table
+            connection.create_table("halo_knowledge", data=empty_df)
+            logger.info("Successfully created new 'halo_knowledge' table")
+        else:
+            logger.info("Table 'halo_knowledge' already exists in the database")
+        
+        # Initialize Knowledge with the new table
+        halo_knowledge = HaloKnowledge(
+            vector_db=LanceDb(
+                table_name="halo_knowledge",
+                uri=str(KNOWLEDGE_PATH),
+                search_type=SearchType.hybrid,
+                use_tantivy=False,
+                embedder=CachedOpenAIEmbedder(id="text-embedding-3-small", openai_client=http_pool.openai_client()),
+            )
+        )
+        logger.info("Successfully initialized Knowledge with new table")
+    except Exception as inner_e:
+        logger.error(f"Failed to create LanceDB table: {inner_e}")
+        # Create a fallback by recreating the database directory
+        import shutil
+        logger.warning("Attempting to recreate the database directory as fallback")
+        
+        # Backup the existing directory if it exists
+        if KNOWLEDGE_PATH.exists():
+            backup_path = KNOWLEDGE_PATH.with_name(f"{KNOWLEDGE_PATH.name}_backup")
+            logger.info(f"Backing up existing database to {backup_path}")
+            if backup_path.exists():
+                shutil.rmtree(backup_path)
+            shutil.copytree(KNOWLEDGE_PATH, backup_path)
+            
+            # Remove the existing directory
+            logger.info(f"Removing existing database at {KNOWLEDGE_PATH}")
+            shutil.rmtree(KNOWLEDGE_PATH)
+        
+        # Create a fresh directory
+        KNOWLEDGE_PATH.mkdir(exist_ok=True, parents=True)
+        
+        # Try one more time with a fresh database
+        try:
+            from lancedb import connect
+            import pandas as pd
+            import numpy as np
+            
+            # Create a connection to the fresh database
+            logger.info(f"Creating fresh LanceDB connection to {KNOWLEDGE_PATH}")
+            connection = connect(str(KNOWLEDGE_PATH))
+            
+            # Create a single empty row to initialize the table with correct schema
+            empty_df = pd.DataFrame({
+                'vector': [np.zeros(1536, dtype=np.float32)],  # Vector field for embeddings
+                'id': ['init'],
+                'payload': [json.dumps({
+                    'name': 'initialization',
+                    'meta_data': {},
+                    'content': 'initialization',
+                    'usage': {}
+                })]
+
+            })
+            
+            # Define schema for the table
+            schema = pa.schema([
+                pa.field('vector', pa.list_(pa.float32(), 1536)),  # Vector field for embeddings
+                pa.field('id', pa.string()),  # Document ID
+                pa.field('payload', pa.string()),  # JSON string containing name, meta_data, content, usage
+            ])
+            
+            # Create the table with explicit schema
+            connection.create_table("halo_knowledge", data=empty_df, schema=schema)
+            logger.info("Successfully created fresh 'halo_knowledge' table")
+            
+            # Initialize Knowledge with the new table
+            halo_knowledge = HaloKnowledge(
+                vector_db=LanceDb(
+                    table_name="halo_knowledge",
+                    uri=str(KNOWLEDGE_PATH),
+                    search_type=SearchType.hybrid,
+                    use_tantivy=False,
+                    embedder=CachedOpenAIEmbedder(id="text-embedding-3-small", openai_client=http_pool.openai_client()),
+                )
+            )
+            logger.info("Successfully initialized HaloKnowledge with fresh table")
+        except Exception as final_e:
+            logger.error(f"All attempts to create LanceDB failed: {final_e}")
+            # Create a mock HaloKnowledge as absolute fallback
+            logger.warning("Creating mock HaloKnowledge instance as final fallback")
+            
+            # Create a minimal mock class that implements the required interface
+            class MockKnowledge:
+                def search(self, *args, **kwargs):
+                    return []
+                    
+                def add(self, *args, **kwargs):
+                    logger.warning("Mock knowledge base cannot store data")
+                    return True
+                    
+                def delete(self, *args, **kwargs):
+                    return True
+            
+            halo_knowledge = MockKnowledge()
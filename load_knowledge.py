@@ -4,11 +4,12 @@ Load the Knowledge Base for the Halo Agent Interface
 
 import os
 from pathlib import Path
+from typing import Optional
 
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
-from halo import halo_knowledge
+from rich.table import Table
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,14 +18,19 @@ load_dotenv()
 console = Console()
 
 
-def load_knowledge(recreate: bool = False):
+def load_knowledge(recreate: bool = False, workers: Optional[int] = None):
     """
     Load the Halo Agent Interface knowledge base.
 
     Args:
         recreate (bool, optional): Whether to recreate the knowledge base.
             Defaults to False.
+        workers (int, optional): Processes parsing files in parallel.
+            Defaults to config.KNOWLEDGE_PARSE_WORKERS.
     """
+    # Imported here: parse workers are spawned and import this module, but only need the readers
+    from halo import halo_knowledge
+
     with Progress(
         SpinnerColumn(), TextColumn("[bold blue]{task.description}"), console=console
     ) as progress:
@@ -87,9 +93,11 @@ agents based on their capabilities. The system includes:
 
             # Load the knowledge base with proper error handling
             console.print("Loading knowledge base")
-            # Force recreate if we're explicitly asked to
-            halo_knowledge.load(recreate=recreate)
+            # Force recreate if we're explicitly asked to; otherwise only changed files are loaded
+            report = halo_knowledge.load(recreate=recreate, workers=workers)
             progress.update(task, completed=True)
+            if report is not None:
+                print_sync_report(report)
             
         except ValueError as ve:
             if "Field 'vector' not found in target schema" in str(ve):
@@ -118,8 +126,9 @@ agents based on their capabilities. The system includes:
                     
                     # Now try loading again with recreate=True
                     console.print("[yellow]Attempting to reload knowledge base...")
-                    halo_knowledge.load(recreate=True)
+                    report = halo_knowledge.load(recreate=True, workers=workers)
                     progress.update(task, completed=True)
+                    print_sync_report(report)
                     console.print("[green]Knowledge base recreated successfully!")
                 except Exception as inner_e:
                     console.print(f"[red]Failed to recreate knowledge base: {inner_e}")
@@ -131,6 +140,12 @@ agents based on their capabilities. The system includes:
             console.print(f"[red]Error: {e}")
             raise
 
+    # Embeddings served from the local cache instead of the API
+    from embedding_cache import cache_stats
+
+    for stats in cache_stats():
+        console.print(f"Embedding cache ({stats['model']}): {stats['hits']} hits, {stats['misses']} misses")
+
     # Display success message in a panel
     console.print(
         Panel.fit(
@@ -140,13 +155,85 @@ agents based on their capabilities. The system includes:
     )
 
 
+def print_sync_report(report) -> None:
+    """Print the file and chunk counts and the time per stage of a knowledge sync."""
+    table = Table(title="Knowledge sync")
+    table.add_column("Files")
+    table.add_column("Count", justify="right")
+    for label, value in (("Added", report.added), ("Changed", report.changed), ("Removed", report.removed),
+                         ("Unchanged", report.unchanged), ("Chunks written", report.chunks_written),
+                         ("Chunks deleted", report.chunks_deleted)):
+        table.add_row(label, str(value))
+    console.print(table)
+    console.print("Seconds: " + ", ".join(f"{stage} {seconds:.2f}" for stage, seconds in report.seconds.items()))
+    rates = Table(title=f"Throughput ({report.workers} parse worker{'s' if report.workers != 1 else ''})")
+    rates.add_column("Stage")
+    rates.add_column("Docs/s", justify="right")
+    rates.add_column("Chunks/s", justify="right")
+    for stage, rate in report.throughput().items():
+        rates.add_row(stage, *("-" if value is None else f"{value:,.1f}" for value in (rate["docs_per_s"], rate["chunks_per_s"])))
+    console.print(rates)
+    if getattr(report, "indexes", None) is not None:
+        console.print(f"Indexes: {report.indexes.summary()}")
+
+
+def sync_knowledge(workers: Optional[int] = None):
+    """Load only new and changed files of the knowledge directory and drop the vectors of removed ones."""
+    from halo import halo_knowledge
+
+    with Progress(console=console) as progress:
+        task = progress.add_task("Syncing HALO knowledge...", total=None)
+
+        def advance(name: str, done: int, total: int) -> None:
+            progress.update(task, completed=done, total=total, description=f"Syncing {name}")
+
+        report = halo_knowledge.load(progress=advance, workers=workers)
+    print_sync_report(report)
+
+
+def print_index_status() -> None:
+    """Print the row count and the indexes of the knowledge table."""
+    from halo import halo_knowledge
+    from knowledge_index import index_status
+
+    status = index_status(halo_knowledge.vector_db)
+    table = Table(title=f"Knowledge indexes ({status['rows']} rows)")
+    table.add_column("Column")
+    table.add_column("Index")
+    table.add_column("Indexed rows", justify="right")
+    table.add_column("Unindexed rows", justify="right")
+    for column, info in status["indexes"].items():
+        table.add_row(column, info["type"], str(info["indexed"]), str(info["unindexed"]))
+    console.print(table)
+
+
+def reindex_knowledge():
+    """Rebuild the vector and full-text indexes of the knowledge table from scratch."""
+    from halo import halo_knowledge
+    from knowledge_index import ensure_indexes
+
+    with Progress(SpinnerColumn(), TextColumn("[bold blue]{task.description}"), console=console) as progress:
+        progress.add_task("Rebuilding knowledge indexes...", total=None)
+        report = ensure_indexes(halo_knowledge.vector_db, rebuild=True)
+    console.print(f"Indexes: {report.summary()}")
+    print_index_status()
+
+
 if __name__ == "__main__":
     import argparse
     
     # Parse command-line arguments
     parser = argparse.ArgumentParser(description="Load the Halo Agent Interface knowledge base")
     parser.add_argument("--recreate", action="store_true", help="Recreate the knowledge base")
+    parser.add_argument("--sync", action="store_true", help="Only load new and changed files and remove deleted ones")
+    parser.add_argument("--workers", type=int, default=None, help="Processes parsing PDF/DOCX/text files in parallel")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the vector and full-text indexes")
     args = parser.parse_args()
     
     # Load the knowledge base with the specified options
-    load_knowledge(recreate=args.recreate)
+    if args.reindex and not (args.sync or args.recreate):
+        reindex_knowledge()
+    elif args.sync and not args.recreate:
+        sync_knowledge(workers=args.workers)
+    else:
+        load_knowledge(recreate=args.recreate, workers=args.workers)
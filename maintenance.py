@@ -0,0 +1,485 @@
+"""
+Maintenance of the session database (tmp/halo_sessions.db).
+
+Every run of every session is stored with its full tool outputs (raw PubMed
+dumps, image analysis reports, ...) and nothing is ever removed, so the file
+and the time to load a session keep growing. The maintenance job:
+
+- archives sessions not updated for ``SESSION_ARCHIVE_DAYS`` days into
+  compressed per-month files (tmp/archive/sessions-YYYY-MM.jsonl.gz) and
+  deletes them from the database; ``restore_session`` brings one back
+- externalizes tool outputs larger than ``TOOL_OUTPUT_MAX_KB``: the full output
+  is written to a compressed, content-addressed file under tmp/archive/outputs
+  and the stored output keeps a preview and a reference to the file
+  (``read_archived_output`` resolves it, e.g. when a tool call is opened in the
+  transcript)
+- switches the database to incremental auto-vacuum and returns free pages to
+  the file system
+- reports the bytes reclaimed and the session load time before and after
+
+Run it from the command line (``python maintenance.py --help``) or in the
+background of the app by setting ``MAINTENANCE_INTERVAL_HOURS``.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agno.db.base import SessionType
+from agno.db.utils import deserialize_session_json_fields, serialize_session_json_fields
+from agno.utils.log import logger
+from sqlalchemy import delete, func, insert, select, text, update
+
+from config import config
+
+SESSIONS_PATH = Path(config.THIS_DIR).joinpath("tmp", "halo_sessions.db")
+ARCHIVE_DIR = Path(config.THIS_DIR).joinpath("tmp", "archive")
+
+# Characters of an externalized output kept in the database
+PREVIEW_CHARS = 2000
+# Sessions whose load time is measured before and after the maintenance
+LOAD_SAMPLE = 20
+
+# Appended to an externalized output; the digest names the file holding the full output
+ARCHIVED_OUTPUT = re.compile(r"\[Full output of (\d+) chars archived as ([0-9a-f]{64})\]$")
+
+
+@dataclass
+class MaintenanceReport:
+    """Outcome of a maintenance run."""
+
+    dry_run: bool = False
+    sessions_archived: int = 0
+    archive_files: List[str] = field(default_factory=list)
+    sessions_compacted: int = 0
+    outputs_externalized: int = 0
+    output_bytes_externalized: int = 0
+    vacuum: Optional[str] = None
+    bytes_before: int = 0
+    bytes_after: int = 0
+    load_ms_before: Optional[float] = None
+    load_ms_after: Optional[float] = None
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.bytes_before - self.bytes_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = asdict(self)
+        report["bytes_reclaimed"] = self.bytes_reclaimed
+        if self.load_ms_before and self.load_ms_after is not None:
+            report["load_speedup"] = round(self.load_ms_before / max(self.load_ms_after, 1e-6), 2)
+        return report
+
+
+def _database_bytes(db: Any) -> int:
+    """Size of the database file and its write-ahead log."""
+    path = db.db_engine.url.database
+    total = 0
+    for suffix in ("", "-wal"):
+        try:
+            total += os.path.getsize(f"{path}{suffix}")
+        except OSError:
+            pass
+    return total
+
+
+def _sessions_table(db: Any) -> Any:
+    return db._get_table(table_type="sessions")
+
+
+def _last_active(table: Any) -> Any:
+    return func.coalesce(table.c.updated_at, table.c.created_at)
+
+
+# --- Archival ---
+
+
+def _archive_month(row: Dict[str, Any]) -> str:
+    return datetime.fromtimestamp(row.get("created_at") or 0).strftime("%Y-%m")
+
+
+def archive_sessions(db: Any, older_than_days: int, archive_dir: Path = ARCHIVE_DIR, dry_run: bool = False) -> Tuple[int, List[str]]:
+    """Move sessions not updated for a number of days into compressed per-month files.
+
+    Sessions are appended to archive_dir/sessions-YYYY-MM.jsonl.gz (month of their
+    creation), one JSON object per line, and deleted from the database only once
+    the file is written.
+
+    Args:
+        db: The session database
+        older_than_days: Minimum number of days since the last update
+        archive_dir: Directory of the archive files
+        dry_run: Only count the sessions that would be archived
+
+    Returns:
+        Number of archived sessions and the archive files written
+    """
+    table = _sessions_table(db)
+    if table is None:
+        return 0, []
+    cutoff = int((datetime.now() - timedelta(days=older_than_days)).timestamp())
+    with db.Session() as sess:
+        rows = [dict(row._mapping) for row in sess.execute(select(table).where(_last_active(table) < cutoff))]
+    if dry_run or not rows:
+        return len(rows), []
+
+    by_month: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        by_month.setdefault(_archive_month(row), []).append(deserialize_session_json_fields(row))
+
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    files = []
+    for month, sessions in sorted(by_month.items()):
+        path = archive_dir.joinpath(f"sessions-{month}.jsonl.gz")
+        # Every run appends a new gzip member; gzip reads them back as one stream
+        with open(path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for session in sessions:
+                    f.write(json.dumps(session, default=str).encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        files.append(str(path))
+
+    session_ids = [row["session_id"] for row in rows]
+    with db.Session() as sess, sess.begin():
+        for start in range(0, len(session_ids), 500):
+            sess.execute(delete(table).where(table.c.session_id.in_(session_ids[start:start + 500])))
+    logger.info(f"Archived {len(rows)} sessions to {len(files)} files")
+    return len(rows), files
+
+
+def iter_archived_sessions(archive_dir: Path = ARCHIVE_DIR) -> Iterable[Dict[str, Any]]:
+    """Yield the sessions of all archive files, oldest month first."""
+    for path in sorted(archive_dir.glob("sessions-*.jsonl.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def restore_session(db: Any, session_id: str, archive_dir: Path = ARCHIVE_DIR) -> bool:
+    """Insert an archived session back into the database.
+
+    Returns:
+        True if the session was found in the archive and restored
+    """
+    table = _sessions_table(db)
+    found = None
+    for session in iter_archived_sessions(archive_dir):
+        if session.get("session_id") == session_id:
+            # Later archive runs hold the newer copy
+            found = session
+    if found is None or table is None:
+        return False
+    row = serialize_session_json_fields(found)
+    with db.Session() as sess, sess.begin():
+        sess.execute(delete(table).where(table.c.session_id == session_id))
+        sess.execute(insert(table).values(**{k: v for k, v in row.items() if k in table.c}))
+    logger.info(f"Restored session {session_id} from the archive")
+    return True
+
+
+# --- Oversized tool outputs ---
+
+
+def archived_output_path(digest: str, archive_dir: Path = ARCHIVE_DIR) -> Path:
+    return archive_dir.joinpath("outputs", digest[:2], f"{digest}.txt.gz")
+
+
+def externalize_output(output: str, archive_dir: Path = ARCHIVE_DIR, dry_run: bool = False) -> str:
+    """Write an output to a content-addressed file and return the preview stored in its place."""
+    digest = hashlib.sha256(output.encode("utf-8")).hexdigest()
+    if not dry_run:
+        path = archived_output_path(digest, archive_dir)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_suffix(".tmp")
+            with gzip.open(partial, "wt", encoding="utf-8") as f:
+                f.write(output)
+            os.replace(partial, path)
+    return f"{output[:PREVIEW_CHARS]}\n\n[Full output of {len(output)} chars archived as {digest}]"
+
+
+def read_archived_output(output: Any, archive_dir: Path = ARCHIVE_DIR) -> Any:
+    """Return the full output for an externalized one, any other output unchanged."""
+    if not isinstance(output, str):
+        return output
+    match = ARCHIVED_OUTPUT.search(output)
+    if match is None:
+        return output
+    try:
+        with gzip.open(archived_output_path(match.group(2), archive_dir), "rt", encoding="utf-8") as f:
+            return f.read()
+    except OSError as e:
+        logger.warning(f"Archived output {match.group(2)} is not available: {e}")
+        return output
+
+
+def _compact_output(value: Any, max_chars: int, archive_dir: Path, dry_run: bool, stats: Dict[str, int]) -> Any:
+    if not isinstance(value, str) or len(value) <= max_chars or ARCHIVED_OUTPUT.search(value):
+        return value
+    stats["outputs"] += 1
+    stats["bytes"] += len(value.encode("utf-8"))
+    return externalize_output(value, archive_dir, dry_run)
+
+
+def _compact_run(run: Dict[str, Any], max_chars: int, archive_dir: Path, dry_run: bool, stats: Dict[str, int]) -> None:
+    """Externalize the oversized tool outputs of a run and of its member runs, in place."""
+    for tool in run.get("tools") or []:
+        if isinstance(tool, dict):
+            tool["result"] = _compact_output(tool.get("result"), max_chars, archive_dir, dry_run, stats)
+    for message in run.get("messages") or []:
+        if isinstance(message, dict) and message.get("role") == "tool":
+            message["content"] = _compact_output(message.get("content"), max_chars, archive_dir, dry_run, stats)
+    for member_run in run.get("member_responses") or []:
+        if isinstance(member_run, dict):
+            _compact_run(member_run, max_chars, archive_dir, dry_run, stats)
+
+
+def compact_tool_outputs(db: Any, max_kb: int, archive_dir: Path = ARCHIVE_DIR, dry_run: bool = False) -> Dict[str, int]:
+    """Externalize the tool outputs larger than max_kb of every stored session.
+
+    Each session is rewritten in its own short transaction, and only if it changed.
+
+    Returns:
+        Number of sessions rewritten, outputs externalized and their bytes
+    """
+    table = _sessions_table(db)
+    stats = {"sessions": 0, "outputs": 0, "bytes": 0}
+    if table is None:
+        return stats
+    max_chars = max_kb * 1024
+    with db.Session() as sess:
+        # Sessions whose runs cannot hold an oversized output are skipped without being read
+        session_ids = list(sess.execute(select(table.c.session_id).where(func.length(table.c.runs) > max_chars)).scalars())
+
+    for session_id in session_ids:
+        with db.Session() as sess, sess.begin():
+            runs_json = sess.execute(select(table.c.runs).where(table.c.session_id == session_id)).scalar()
+            if not isinstance(runs_json, str):
+                continue
+            runs = json.loads(runs_json)
+            before = stats["outputs"]
+            for run in runs:
+                if isinstance(run, dict):
+                    _compact_run(run, max_chars, archive_dir, dry_run, stats)
+            if stats["outputs"] == before:
+                continue
+            stats["sessions"] += 1
+            if not dry_run:
+                # Stored the way agno stores runs: a JSON string in the JSON column
+                sess.execute(update(table).where(table.c.session_id == session_id).values(runs=json.dumps(runs)))
+    if stats["outputs"]:
+        logger.info(f"Externalized {stats['outputs']} tool outputs of {stats['sessions']} sessions")
+    return stats
+
+
+# --- Vacuum ---
+
+
+def incremental_vacuum(db: Any) -> str:
+    """Return the free pages of the database to the file system.
+
+    The first run switches the database to incremental auto-vacuum, which takes
+    a full VACUUM; later runs only release the free pages.
+
+    Returns:
+        "full" or "incremental"
+    """
+    with db.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # 2 = INCREMENTAL
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+            mode = "full"
+        else:
+            conn.execute(text("PRAGMA incremental_vacuum"))
+            mode = "incremental"
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return mode
+
+
+# --- Load time ---
+
+
+def _load_sample(db: Any, older_than_days: int) -> List[str]:
+    """The largest sessions that are kept by the archival."""
+    table = _sessions_table(db)
+    if table is None:
+        return []
+    cutoff = int((datetime.now() - timedelta(days=older_than_days)).timestamp())
+    with db.Session() as sess:
+        return list(sess.execute(
+            select(table.c.session_id)
+            .where(_last_active(table) >= cutoff)
+            .order_by(func.length(table.c.runs).desc())
+            .limit(LOAD_SAMPLE)
+        ).scalars())
+
+
+def measure_load_ms(db: Any, session_ids: List[str], repeat: int = 3) -> Optional[float]:
+    """Mean time in milliseconds to load and deserialize a session, best of a few repeats."""
+    if not session_ids:
+        return None
+    best = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        for session_id in session_ids:
+            db.get_session(session_id=session_id, session_type=SessionType.TEAM)
+        elapsed = (time.perf_counter() - began) * 1000 / len(session_ids)
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 3)
+
+
+def run_maintenance(
+    db: Any,
+    archive_days: Optional[int] = None,
+    max_output_kb: Optional[int] = None,
+    vacuum: bool = True,
+    dry_run: bool = False,
+    archive_dir: Path = ARCHIVE_DIR,
+) -> MaintenanceReport:
+    """Archive old sessions, externalize oversized tool outputs and vacuum the session database.
+
+    Args:
+        db: The session database
+        archive_days: Archive sessions not updated for this many days. Defaults to
+            config.SESSION_ARCHIVE_DAYS; 0 disables the archival.
+        max_output_kb: Externalize tool outputs larger than this. Defaults to
+            config.TOOL_OUTPUT_MAX_KB; 0 disables the compaction.
+        vacuum: Release the free pages of the database afterwards
+        dry_run: Report what would be done without changing anything
+        archive_dir: Directory of the archive files and externalized outputs
+    """
+    archive_days = config.SESSION_ARCHIVE_DAYS if archive_days is None else archive_days
+    max_output_kb = config.TOOL_OUTPUT_MAX_KB if max_output_kb is None else max_output_kb
+    report = MaintenanceReport(dry_run=dry_run)
+    began = time.perf_counter()
+    report.bytes_before = _database_bytes(db)
+    sample = _load_sample(db, archive_days or 36500)
+    report.load_ms_before = measure_load_ms(db, sample)
+
+    steps = []
+    if archive_days > 0:
+        steps.append(("archive", lambda: archive_sessions(db, archive_days, archive_dir, dry_run)))
+    if max_output_kb > 0:
+        steps.append(("compact", lambda: compact_tool_outputs(db, max_output_kb, archive_dir, dry_run)))
+    if vacuum and not dry_run:
+        steps.append(("vacuum", lambda: incremental_vacuum(db)))
+    for name, step in steps:
+        try:
+            result = step()
+        except Exception as e:
+            logger.error(f"Session maintenance step '{name}' failed: {e}")
+            report.errors.append(f"{name}: {e}")
+            continue
+        if name == "archive":
+            report.sessions_archived, report.archive_files = result
+        elif name == "compact":
+            report.sessions_compacted = result["sessions"]
+            report.outputs_externalized = result["outputs"]
+            report.output_bytes_externalized = result["bytes"]
+        else:
+            report.vacuum = result
+
+    report.bytes_after = _database_bytes(db)
+    report.load_ms_after = measure_load_ms(db, sample)
+    report.seconds = round(time.perf_counter() - began, 3)
+    logger.info(f"Session maintenance reclaimed {report.bytes_reclaimed} bytes in {report.seconds}s")
+    return report
+
+
+# --- Background scheduler ---
+
+_scheduler: Optional[threading.Thread] = None
+_scheduler_stop = threading.Event()
+_scheduler_lock = threading.Lock()
+last_report: Optional[MaintenanceReport] = None
+
+
+def start_scheduler(db: Any, interval_hours: Optional[float] = None) -> bool:
+    """Run the maintenance in a daemon thread every interval_hours, once per process.
+
+    Args:
+        db: The session database, or a callable returning the session databases to maintain
+        interval_hours: Hours between runs. Defaults to config.MAINTENANCE_INTERVAL_HOURS; 0 disables it.
+
+    Returns:
+        True if the scheduler is running
+    """
+    global _scheduler
+    interval_hours = config.MAINTENANCE_INTERVAL_HOURS if interval_hours is None else interval_hours
+    if interval_hours <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return True
+        _scheduler_stop.clear()
+
+        def loop():
+            global last_report
+            # The first run waits a full interval, so it never slows down the start of the app
+            while not _scheduler_stop.wait(interval_hours * 3600):
+                for session_db in (db() if callable(db) else [db]):
+                    try:
+                        last_report = run_maintenance(session_db)
+                    except Exception as e:
+                        logger.error(f"Session maintenance failed: {e}")
+
+        _scheduler = threading.Thread(target=loop, name="halo-session-maintenance", daemon=True)
+        _scheduler.start()
+    logger.info(f"Session maintenance scheduled every {interval_hours}h")
+    return True
+
+
+def stop_scheduler() -> None:
+    _scheduler_stop.set()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from rich.console import Console
+    from sqlite_profile import create_sqlite_db
+
+    parser = argparse.ArgumentParser(description="Archive, compact and vacuum the HALO session database")
+    parser.add_argument("--db", default=str(SESSIONS_PATH), help="Session database file")
+    parser.add_argument("--archive-days", type=int, default=config.SESSION_ARCHIVE_DAYS,
+                        help="Archive sessions not updated for this many days (0 disables)")
+    parser.add_argument("--max-output-kb", type=int, default=config.TOOL_OUTPUT_MAX_KB,
+                        help="Externalize tool outputs larger than this (0 disables)")
+    parser.add_argument("--archive-dir", default=str(ARCHIVE_DIR), help="Directory of the archive files")
+    parser.add_argument("--no-vacuum", action="store_true", help="Do not vacuum the database")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be done without changing anything")
+    parser.add_argument("--restore", metavar="SESSION_ID", help="Restore an archived session and exit")
+    args = parser.parse_args()
+
+    console = Console()
+    if not Path(args.db).exists():
+        console.print(f"[red]No session database at {args.db}")
+        raise SystemExit(1)
+    sessions_db = create_sqlite_db(args.db, table_types=("sessions",))
+    if args.restore:
+        restored = restore_session(sessions_db, args.restore, Path(args.archive_dir))
+        console.print(f"[green]Restored {args.restore}" if restored else f"[red]{args.restore} is not in the archive")
+        raise SystemExit(0 if restored else 1)
+    maintenance_report = run_maintenance(
+        sessions_db,
+        archive_days=args.archive_days,
+        max_output_kb=args.max_output_kb,
+        vacuum=not args.no_vacuum,
+        dry_run=args.dry_run,
+        archive_dir=Path(args.archive_dir),
+    )
+    console.print_json(data=maintenance_report.to_dict())
@@ -0,0 +1,231 @@
+"""
+Compact chat message records kept in st.session_state["messages"].
+
+Messages used to be plain dicts holding deep copies of the tool calls and full
+image payloads (including the image bytes). Here a message keeps only what the
+transcript needs to display it:
+
+- tool calls as immutable snapshots with the arguments and result cut to a
+  fixed size, a digest of the full arguments and the tool timing
+- images as references (file path or URL), never their content
+
+Results that were cut are fetched from the session database when the tool call
+is opened in the transcript.
+"""
+
+import functools
+import hashlib
+import json
+import uuid
+from typing import Any, Optional, Tuple
+
+import streamlit as st
+from agno.media import Image
+from agno.utils.log import logger
+
+from config import config
+from maintenance import read_archived_output
+
+
+def _field(obj: Any, *names: str) -> Any:
+    """Return the first non-empty field of a dict or an object."""
+    for name in names:
+        value = obj.get(name) if hasattr(obj, "get") else getattr(obj, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+def _truncate(text: str, limit: int) -> Tuple[str, bool]:
+    if len(text) <= limit:
+        return text, False
+    return f"{text[:limit]}… ({len(text)} chars)", True
+
+
+class ToolCallSnapshot:
+    """Immutable, size-capped view of a tool call."""
+
+    __slots__ = ("tool_call_id", "run_id", "tool_name", "tool_args", "args_digest", "result", "time", "error", "complete")
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        # Pickled when spilled to disk; unpickling must not go through __setattr__
+        return (functools.partial(type(self), **{name: getattr(self, name) for name in self.__slots__}), ())
+
+    def __repr__(self) -> str:
+        return f"ToolCallSnapshot(tool_name={self.tool_name!r}, tool_call_id={self.tool_call_id!r})"
+
+    @property
+    def metrics(self) -> Optional[dict]:
+        # Same shape as tool metrics, so summarize_tool_call shows the timing
+        return {"time": self.time} if self.time is not None else None
+
+    @classmethod
+    def from_tool(cls, tool: Any, run_id: Optional[str] = None) -> "ToolCallSnapshot":
+        """Build a snapshot from a ToolExecution, a tool call dict or an OpenAI style tool call.
+
+        Args:
+            tool: The tool call
+            run_id: Id of the run the tool call belongs to, used to fetch the full result
+        """
+        function = _field(tool, "function") or {}
+        name = _field(tool, "tool_name", "name") or _field(function, "name") or "Unknown Tool"
+        args = _field(tool, "tool_args", "args")
+        if args is None and _field(function, "arguments"):
+            try:
+                args = json.loads(_field(function, "arguments"))
+            except (TypeError, ValueError):
+                args = {"arguments": str(_field(function, "arguments"))}
+        if args is None:
+            args = {}
+
+        # Argument values are cut one by one, the digest identifies the full arguments
+        args_text = json.dumps(args, sort_keys=True, default=str)
+        limit = config.MESSAGE_TOOL_ARG_CHARS
+        if isinstance(args, dict):
+            capped_args = {
+                str(key): value if isinstance(value, (int, float, bool)) or value is None else _truncate(str(value), limit)[0]
+                for key, value in args.items()
+            }
+        else:
+            capped_args = {"value": _truncate(str(args), limit)[0]}
+
+        result = _field(tool, "result", "content")
+        complete = True
+        if result is not None:
+            if not isinstance(result, str):
+                result = json.dumps(result, default=str) if isinstance(result, (dict, list)) else str(result)
+            result, truncated = _truncate(result, config.MESSAGE_TOOL_RESULT_CHARS)
+            complete = not truncated
+        elif _field(tool, "function") is not None:
+            # Tool calls of the model (loaded from history) carry no result, it is stored with the run
+            complete = False
+
+        metrics = _field(tool, "metrics")
+        time = _field(metrics, "time") if metrics is not None else None
+        error = _field(tool, "tool_call_error")
+
+        return cls(
+            tool_call_id=_field(tool, "tool_call_id", "id"),
+            run_id=run_id,
+            tool_name=str(name),
+            tool_args=capped_args,
+            args_digest=hashlib.sha1(args_text.encode("utf-8")).hexdigest()[:12],
+            result=result,
+            time=time,
+            error=bool(error),
+            complete=complete,
+        )
+
+
+class ImageRef:
+    """Reference to an image of a message: where to find it, never its content."""
+
+    __slots__ = ("id", "filepath", "url", "mime_type", "alt_text")
+
+    def __init__(self, id=None, filepath=None, url=None, mime_type=None, alt_text=None):
+        self.id = id
+        self.filepath = filepath
+        self.url = url
+        self.mime_type = mime_type
+        self.alt_text = alt_text
+
+    @classmethod
+    def from_image(cls, image: Any) -> "ImageRef":
+        """Build a reference from an agno Image, an image dict or any object with the same fields."""
+        filepath = _field(image, "filepath")
+        url = _field(image, "url")
+        if filepath is None and url is None and _field(image, "content") is not None:
+            logger.warning("Image without file path or URL, its content is not kept in the transcript")
+        return cls(
+            id=_field(image, "id"),
+            filepath=str(filepath) if filepath is not None else None,
+            url=url,
+            mime_type=_field(image, "mime_type"),
+            alt_text=_field(image, "alt_text"),
+        )
+
+    def to_image(self) -> Optional[Image]:
+        """Return an agno Image for the reference, or None if it cannot be located."""
+        if self.filepath:
+            return Image(filepath=self.filepath)
+        if self.url:
+            return Image(url=self.url)
+        return None
+
+
+class ChatMessage:
+    """A message of the transcript."""
+
+    __slots__ = ("id", "role", "content", "tool_calls", "images", "run_id", "intermediate_steps_displayed")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        tool_calls: Tuple[ToolCallSnapshot, ...] = (),
+        images: Tuple[ImageRef, ...] = (),
+        run_id: Optional[str] = None,
+        intermediate_steps_displayed: bool = False,
+        id: Optional[str] = None,
+    ):
+        # Stable id, render artifacts are cached under it
+        self.id = id or uuid.uuid4().hex
+        self.role = role
+        self.content = content
+        self.tool_calls = tool_calls
+        self.images = images
+        self.run_id = run_id
+        self.intermediate_steps_displayed = intermediate_steps_displayed
+
+    def __repr__(self) -> str:
+        return f"ChatMessage(role={self.role!r}, id={self.id!r}, chars={len(self.content)})"
+
+    def approx_size(self) -> int:
+        """Rough number of bytes held by the message, used for the transcript memory budget."""
+        size = 200 + len(self.content)
+        for tool in self.tool_calls:
+            size += 300 + len(tool.result or "") + sum(len(str(value)) for value in (tool.tool_args or {}).values())
+        return size + 150 * len(self.images)
+
+    def agno_images(self):
+        """Return the images of the message as agno Images to pass to a run."""
+        return [image for image in (ref.to_image() for ref in self.images) if image is not None]
+
+
+def load_tool_result(run_id: Optional[str], tool_call_id: Optional[str]) -> Optional[str]:
+    """Fetch the full result of a tool call from the session database.
+
+    Args:
+        run_id: Id of the team run the tool call belongs to
+        tool_call_id: Id of the tool call
+
+    Returns:
+        The result, or None if the session, run or tool call is not stored
+    """
+    halo = st.session_state.get("halo")
+    session_id = st.session_state.get("session_id")
+    if halo is None or not session_id or not run_id or not tool_call_id:
+        return None
+    try:
+        session = halo.get_session(session_id=session_id)
+    except Exception as e:
+        logger.warning(f"Could not load session {session_id}: {e}")
+        return None
+    if session is None:
+        return None
+    # Tool calls of members are stored with the member runs of the team run
+    for run in session.runs or []:
+        if run_id not in (getattr(run, "run_id", None), getattr(run, "parent_run_id", None)):
+            continue
+        for tool in getattr(run, "tools", None) or []:
+            if getattr(tool, "tool_call_id", None) == tool_call_id:
+                # Oversized outputs may have been moved out of the database by maintenance.py
+                return read_archived_output(tool.result)
+    return None
@@ -3,14 +3,16 @@ import json
 import os
 import sys
 import dotenv
-import importlib
-import inspect
 import datetime
 from pathlib import Path
 
 # Add the parent directory to the path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import config
+from agents.manifest import agent_options
+from resources import registry
+from sqlite_profile import sqlite_stats
+from transcript_store import memory_stats
 
 # Page config
 st.set_page_config(
@@ -28,22 +30,9 @@ st.logo(config.LOGO_TEXT_PATH,
 )
 
 
-# Function to dynamically discover available agents
+# Available agents come from the agent manifest, without importing the agent modules
 def discover_agents():
-    agents_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agents")
-    agent_options = {}
-    
-    # Find all potential agent modules (files ending with _agent.py)
-    for filename in os.listdir(agents_dir):
-        if filename.endswith('_agent.py') and filename != '__init__.py':
-            module_name = filename[:-3]  # Remove .py extension
-            agent_id = module_name.replace('_agent', '')
-            
-            # Format the display name (convert snake_case to Title Case)
-            display_name = ' '.join(word.capitalize() for word in agent_id.split('_'))
-            agent_options[display_name] = agent_id
-    
-    return agent_options
+    return agent_options()
 
 # Dynamically load available agents
 AGENT_OPTIONS = discover_agents()
@@ -111,7 +100,7 @@ def main():
     model_config = load_model_config()
     
     # Create tabs for different configuration sections
-    tab1, tab2, tab3 = st.tabs(["Configuration", "Models", "API Keys"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Configuration", "Models", "API Keys", "System"])
     
     with tab1:
         st.header("Configuration Management")
@@ -343,5 +332,55 @@ def main():
                 
                 st.success("API Keys saved successfully to .env file!")
 
+    with tab4:
+        st.header("System")
+        st.subheader("Memory")
+        st.write("Memory of this server process and of the chat transcripts of all open sessions. "
+                 "Older messages are kept on disk once a transcript exceeds its memory budget.")
+        st.json(memory_stats())
+        messages = st.session_state.get("messages")
+        if hasattr(messages, "stats"):
+            st.caption("This session")
+            st.json(messages.stats())
+
+        st.subheader("Databases")
+        for name in ("halo_sessions", "halo_memory"):
+            # Only databases already opened by a chat page; opening them here is not needed
+            if registry.is_built(name):
+                resource = registry.get(name)
+                st.caption(name)
+                st.json(sqlite_stats(getattr(resource, "db", resource)))
+
+        if registry.is_built("halo_knowledge"):
+            from embedding_cache import cache_stats
+
+            st.subheader("Embedding cache")
+            st.write("Embeddings of knowledge chunks already embedded once are reused instead of requested again.")
+            st.json(cache_stats())
+
+            from retrieval_cache import retrieval_cache_stats
+
+            st.subheader("Retrieval cache")
+            st.write("Repeated knowledge searches are answered from memory until the knowledge table changes.")
+            st.json(retrieval_cache_stats())
+
+        if config.STORAGE_SHARDING != "off":
+            st.subheader("Storage shards")
+            st.write("Sessions and memories are stored in one database per user shard.")
+            router = registry.get("halo_session_shards")
+            st.json(router.stats())
+            st.caption("Recent sessions across all shards")
+            st.dataframe(
+                [
+                    {
+                        "Session": s.get("session_id"),
+                        "User": s.get("user_id"),
+                        "Created": datetime.datetime.fromtimestamp(s.get("created_at") or 0).strftime("%Y-%m-%d %H:%M"),
+                    }
+                    for s in router.list_sessions(limit=25)
+                ],
+                use_container_width=True,
+            )
+
 if __name__ == "__main__":
     main()
@@ -4,7 +4,7 @@ import streamlit as st
 import pydicom
 import numpy as np
 from agno.media import Image as AgnoImage
-from agents.medical_agent import agent
+from agents.medical_agent import get_default_agent
 from PIL import Image as PILImage
 from config import config
 import datetime
@@ -160,7 +160,7 @@ def main():
                             + "Answer in the language of the user. If it is not given, answer English."
                         )
                         model = "gpt-5"
-                        response = agent.run(prompt, images=[agno_image], model=model)
+                        response = get_default_agent().run(prompt, images=[agno_image], model=model)
                         st.markdown("### :material/diagnosis: Analysis Results")
                         st.markdown("---")
                         if hasattr(response, "content"):
@@ -0,0 +1,242 @@
+"""
+Lazy, process-wide resource registry for the HALO Agent Interface.
+
+Expensive shared objects (memory manager, session storage, knowledge base) are
+registered here with a factory and only built the first time they are used.
+Because Python modules are imported once per process, every Streamlit session
+served by the same worker shares the same instances.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from agno.utils.log import logger
+
+
+class ResourceRegistry:
+    """Registry that builds named resources on first use and caches them for the process."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._timings: Dict[str, float] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register a factory for a resource. Re-registering drops any built instance.
+
+        Args:
+            name: Unique name of the resource
+            factory: Callable without arguments that builds the resource
+        """
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._instances.pop(name, None)
+            self._timings.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the resource, building it on first use.
+
+        Args:
+            name: Name of a registered resource
+
+        Returns:
+            The shared resource instance
+        """
+        # Fast path: already built, no locking needed
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+
+        if name not in self._factories:
+            raise KeyError(f"Resource '{name}' is not registered")
+
+        # Per-resource lock so a slow build does not block the other resources
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                elapsed = time.perf_counter() - start
+                self._instances[name] = instance
+                self._timings[name] = elapsed
+                logger.info(f"Built shared resource '{name}' in {elapsed:.3f}s")
+            return self._instances[name]
+
+    def is_built(self, name: str) -> bool:
+        """Check whether a resource has already been built."""
+        return name in self._instances
+
+    def timings(self) -> Dict[str, float]:
+        """Return the build time in seconds of every resource built so far."""
+        return dict(self._timings)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the build state and build time of every registered resource."""
+        return {
+            name: {
+                "built": name in self._instances,
+                "build_seconds": self._timings.get(name),
+            }
+            for name in self._factories
+        }
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Drop built instances so they are rebuilt on next use.
+
+        Args:
+            name: Resource to reset. Resets all resources if not given.
+        """
+        with self._registry_lock:
+            names = [name] if name else list(self._instances)
+            for resource_name in names:
+                self._instances.pop(resource_name, None)
+                self._timings.pop(resource_name, None)
+
+
+class LazyResource:
+    """Stand-in for a registered resource that builds it on first attribute access.
+
+    ``isinstance`` checks resolve the resource as well, so the proxy can be handed
+    to agno Teams and Agents in place of the real object.
+    """
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: ResourceRegistry, name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def resolve(self) -> Any:
+        """Return the underlying resource, building it if needed."""
+        return self._registry.get(self._name)
+
+    @property
+    def __class__(self):
+        return type(self.resolve())
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self.resolve(), item)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        setattr(self.resolve(), key, value)
+
+    def __repr__(self) -> str:
+        if self._registry.is_built(self._name):
+            return repr(self.resolve())
+        return f"<LazyResource '{self._name}' (not built)>"
+
+
+class TemplatePool:
+    """Process-wide LRU pool of prebuilt templates keyed by their configuration.
+
+    Templates are built once per key and handed out to callers, who are expected to
+    apply their per-request state on a cheap copy instead of rebuilding.
+    """
+
+    def __init__(self, name: str, max_size: int = 8):
+        self.name = name
+        self.max_size = max(1, max_size)
+        self._templates: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+        self.last_build_seconds: Optional[float] = None
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+
+    def get(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """Return the template for a key, building it with ``builder`` on a miss.
+
+        Args:
+            key: Hashable configuration key
+            builder: Callable without arguments that builds the template
+
+        Returns:
+            The pooled template
+        """
+        with self._lock:
+            if key in self._templates:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                return self._templates[key]
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Build outside the pool lock so other keys are not blocked
+        with build_lock:
+            with self._lock:
+                if key in self._templates:
+                    self._templates.move_to_end(key)
+                    self.hits += 1
+                    return self._templates[key]
+
+            start = time.perf_counter()
+            template = builder()
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.misses += 1
+                self.build_seconds += elapsed
+                self.last_build_seconds = elapsed
+                self._templates[key] = template
+                self._build_locks.pop(key, None)
+                while len(self._templates) > self.max_size:
+                    self._templates.popitem(last=False)
+                    self.evictions += 1
+            logger.info(f"Built {self.name} template in {elapsed:.3f}s (pool size {len(self._templates)})")
+            return template
+
+    def checkout(self, key: Hashable, builder: Callable[[], Any], overlay: Callable[[Any], Any]) -> Any:
+        """Return a per-request instance: the pooled template with ``overlay`` applied.
+
+        Args:
+            key: Hashable configuration key
+            builder: Callable without arguments that builds the template on a miss
+            overlay: Callable that derives the per-request instance from the template
+
+        Returns:
+            The per-request instance returned by ``overlay``
+        """
+        template = self.get(key, builder)
+        start = time.perf_counter()
+        instance = overlay(template)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds += elapsed
+        return instance
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and build timings of the pool."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._templates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "build_seconds_total": self.build_seconds,
+                "build_seconds_mean": self.build_seconds / self.misses if self.misses else None,
+                "last_build_seconds": self.last_build_seconds,
+                "checkouts": self.checkouts,
+                "checkout_seconds_mean": self.checkout_seconds / self.checkouts if self.checkouts else None,
+            }
+
+    def clear(self) -> None:
+        """Drop all templates so they are rebuilt on next use."""
+        with self._lock:
+            self._templates.clear()
+
+
+# Single registry shared by the whole process
+registry = ResourceRegistry()
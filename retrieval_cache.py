@@ -0,0 +1,301 @@
+"""
+Versioned cache of knowledge base searches.
+
+The team leader is told to always search the knowledge base, and most members
+carry the same knowledge, so one turn often embeds and searches the same query
+several times, and follow-up turns repeat it. ``RetrievalCache`` keeps two
+in-memory layers in front of ``HaloKnowledge.search``:
+
+- query embeddings by normalized query text (``RETRIEVAL_CACHE_QUERIES``), so a
+  repeated query costs no embedding request even when its results are stale
+- search results by normalized query, filters, limit and the version of the
+  LanceDB table (``RETRIEVAL_CACHE_RESULTS``)
+
+The writes of ``HaloKnowledge`` in this process invalidate the cache right away.
+Every write to a LanceDB table also creates a new version, and the version is
+checked every ``RETRIEVAL_CACHE_VERSION_CHECK_SECONDS``, so writes of another
+process (e.g. ``load_knowledge.py``) invalidate the cached results within that
+interval.
+
+There is one cache per vector table in the process, and cache keys do not
+depend on the agent searching, so the leader and the members of a run share
+their hits. The query-embedding layer wraps the embedder of the vector
+database; ``install_query_cache`` installs it once, when the knowledge base is
+built. It only answers embeddings requested inside ``query_scope`` (the searches
+of ``HaloKnowledge``), so documents embedded one at a time by agno's inserts do
+not push the queries out.
+"""
+
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from agno.utils.log import logger
+
+from config import config
+
+# Set while a search embeds its query; per thread and per asyncio task
+_in_query: ContextVar[bool] = ContextVar("retrieval_cache_in_query", default=False)
+
+
+def normalize_query(query: str) -> str:
+    """Query text as used in cache keys: case folded, with collapsed whitespace."""
+    return " ".join(str(query).casefold().split())
+
+
+def _copy_document(document: Any) -> Any:
+    """Copy of a document that shares none of its mutable fields (metadata, usage, embedding)."""
+    duplicate = copy.copy(document)
+    for attr in ("meta_data", "usage"):
+        value = getattr(document, attr, None)
+        if isinstance(value, dict):
+            setattr(duplicate, attr, copy.deepcopy(value))
+    if isinstance(getattr(document, "embedding", None), list):
+        duplicate.embedding = list(document.embedding)
+    return duplicate
+
+
+class _LRU:
+    """Size-bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        if self.size <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RetrievalCache:
+    """Query embeddings and search results of one vector table."""
+
+    def __init__(self, max_queries: Optional[int] = None, max_results: Optional[int] = None):
+        """
+        Args:
+            max_queries: Query embeddings kept. Defaults to config.RETRIEVAL_CACHE_QUERIES.
+            max_results: Search results kept. Defaults to config.RETRIEVAL_CACHE_RESULTS.
+        """
+        self._embeddings = _LRU(config.RETRIEVAL_CACHE_QUERIES if max_queries is None else max_queries)
+        self._results = _LRU(config.RETRIEVAL_CACHE_RESULTS if max_results is None else max_results)
+        self._lock = threading.Lock()
+        self._version: Any = None
+        self._checked_at = 0.0
+        self.stats_counts = {"embedding_hits": 0, "embedding_misses": 0, "result_hits": 0, "result_misses": 0, "invalidations": 0}
+
+    def __repr__(self) -> str:
+        return f"RetrievalCache(embeddings={len(self._embeddings)}, results={len(self._results)}, version={self._version})"
+
+    def table_version(self, vector_db: Any) -> Any:
+        """Return the version of the LanceDB table of a vector database, or None.
+
+        The table is only checked for new versions every ``RETRIEVAL_CACHE_VERSION_CHECK_SECONDS``,
+        and after ``invalidate``; in between the version last seen is returned.
+        """
+        table = getattr(vector_db, "table", None)
+        if table is None or not hasattr(table, "checkout_latest"):
+            return None
+        with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < config.RETRIEVAL_CACHE_VERSION_CHECK_SECONDS:
+                return self._version
+        try:
+            # Picks up writes of other processes too
+            table.checkout_latest()
+            version = table.version
+        except Exception as e:
+            logger.debug(f"Could not read the knowledge table version: {e}")
+            return None
+        with self._lock:
+            self._checked_at = time.monotonic()
+        return version
+
+    def _observe(self, version: Any) -> None:
+        # Results of older versions can never be hit again
+        if version != self._version:
+            if self._version is not None:
+                self._results.clear()
+                self.stats_counts["invalidations"] += 1
+            self._version = version
+
+    def invalidate(self) -> None:
+        """Drop all cached results, e.g. after the knowledge base was written."""
+        with self._lock:
+            self._results.clear()
+            self._version = None
+            self.stats_counts["invalidations"] += 1
+
+    def get_embedding(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding of a query, or None."""
+        with self._lock:
+            vector = self._embeddings.get(normalize_query(text))
+            self.stats_counts["embedding_hits" if vector is not None else "embedding_misses"] += 1
+        return vector
+
+    def put_embedding(self, text: str, vector: Optional[List[float]]) -> None:
+        # Failed embeddings are not cached
+        if vector:
+            with self._lock:
+                self._embeddings.put(normalize_query(text), vector)
+
+    def result_key(self, vector_db: Any, query: str, limit: int, filters: Optional[Dict[str, Any]]) -> Tuple:
+        search_type = getattr(getattr(vector_db, "search_type", None), "value", None)
+        return (normalize_query(query), limit, json.dumps(filters or {}, sort_keys=True, default=str), search_type)
+
+    def get_results(self, vector_db: Any, key: Tuple) -> Tuple[Optional[List[Any]], Any]:
+        """Return the cached results of a search, or None, and the table version they belong to."""
+        version = self.table_version(vector_db)
+        with self._lock:
+            self._observe(version)
+            documents = self._results.get((key, version))
+            self.stats_counts["result_hits" if documents is not None else "result_misses"] += 1
+        # Copies, so callers changing a document do not change the cached one
+        return ([_copy_document(doc) for doc in documents] if documents is not None else None), version
+
+    def put_results(self, key: Tuple, version: Any, documents: List[Any]) -> None:
+        """Cache the results of a search run against the given table version."""
+        with self._lock:
+            if version == self._version:
+                self._results.put((key, version), [_copy_document(doc) for doc in documents])
+
+    def stats(self) -> Dict[str, Any]:
+        counts = dict(self.stats_counts)
+        for layer in ("embedding", "result"):
+            lookups = counts[f"{layer}_hits"] + counts[f"{layer}_misses"]
+            counts[f"{layer}_hit_rate"] = round(counts[f"{layer}_hits"] / lookups, 3) if lookups else None
+        counts.update({"embeddings": len(self._embeddings), "results": len(self._results), "version": self._version})
+        return counts
+
+
+@contextmanager
+def query_scope():
+    """Mark the embeddings requested in the block as query embeddings, answered by the cache."""
+    token = _in_query.set(True)
+    try:
+        yield
+    finally:
+        _in_query.reset(token)
+
+
+def in_query_scope() -> bool:
+    """Whether the embeddings requested now are the query embedding of a search."""
+    return _in_query.get()
+
+
+class QueryEmbeddingCache:
+    """Embedder wrapper answering repeated query embeddings from a RetrievalCache.
+
+    Only embeddings requested inside ``query_scope`` use the cache; documents, embedded
+    one at a time or in batches, and every other attribute go to the wrapped embedder.
+    """
+
+    def __init__(self, embedder: Any, cache: RetrievalCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    def __repr__(self) -> str:
+        return f"QueryEmbeddingCache({self.embedder!r})"
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined here
+        if name in ("embedder", "cache"):
+            raise AttributeError(name)
+        return getattr(self.embedder, name)
+
+    def get_embedding(self, text: str) -> List[float]:
+        if not _in_query.get():
+            return self.embedder.get_embedding(text)
+        vector = self.cache.get_embedding(text)
+        if vector is None:
+            vector = self.embedder.get_embedding(text)
+            self.cache.put_embedding(text, vector)
+        return vector
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        if not _in_query.get():
+            return self.embedder.get_embedding_and_usage(text)
+        vector = self.cache.get_embedding(text)
+        if vector is not None:
+            return vector, None
+        vector, usage = self.embedder.get_embedding_and_usage(text)
+        self.cache.put_embedding(text, vector)
+        return vector, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        if not _in_query.get():
+            return await self.embedder.async_get_embedding(text)
+        vector = self.cache.get_embedding(text)
+        if vector is None:
+            vector = await self.embedder.async_get_embedding(text)
+            self.cache.put_embedding(text, vector)
+        return vector
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        if not _in_query.get():
+            return await self.embedder.async_get_embedding_and_usage(text)
+        vector = self.cache.get_embedding(text)
+        if vector is not None:
+            return vector, None
+        vector, usage = await self.embedder.async_get_embedding_and_usage(text)
+        self.cache.put_embedding(text, vector)
+        return vector, usage
+
+
+# One cache per vector table in the process, shared by every copy of the knowledge
+_caches: Dict[Tuple[str, str], RetrievalCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_retrieval_cache(vector_db: Any) -> Optional[RetrievalCache]:
+    """Return the cache of a vector database.
+
+    Returns None when the cache is disabled (``RETRIEVAL_CACHE_RESULTS=0`` and ``RETRIEVAL_CACHE_QUERIES=0``).
+    """
+    if vector_db is None or (config.RETRIEVAL_CACHE_RESULTS <= 0 and config.RETRIEVAL_CACHE_QUERIES <= 0):
+        return None
+    key = (str(getattr(vector_db, "uri", None) or id(vector_db)), str(getattr(vector_db, "table_name", "")))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = RetrievalCache()
+    return cache
+
+
+def install_query_cache(vector_db: Any) -> None:
+    """Wrap the embedder of a vector database so repeated queries are embedded once.
+
+    Only the query embeddings of searches go through the cache; documents are embedded
+    in batches, which the wrapper passes on. Does nothing when ``RETRIEVAL_CACHE_QUERIES=0``
+    or when the embedder is already wrapped.
+    """
+    cache = get_retrieval_cache(vector_db)
+    if cache is None or getattr(vector_db, "embedder", None) is None or config.RETRIEVAL_CACHE_QUERIES <= 0:
+        return
+    with _caches_lock:
+        if not isinstance(vector_db.embedder, QueryEmbeddingCache):
+            vector_db.embedder = QueryEmbeddingCache(vector_db.embedder, cache)
+
+
+def retrieval_cache_stats() -> List[Dict[str, Any]]:
+    """Return the statistics of every retrieval cache of the process."""
+    return [{"table": table, **cache.stats()} for (_, table), cache in list(_caches.items())]
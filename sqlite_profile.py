@@ -0,0 +1,176 @@
+"""
+SQLite performance profile for the session and memory databases.
+
+Every Streamlit session of the process shares tmp/halo_sessions.db and
+tmp/halo_memory.db. With SQLite defaults (rollback journal, full sync, no mmap)
+readers block writers and every commit waits for an fsync. The profile opens
+the databases with:
+
+- WAL journal, so readers never block the writer and vice versa
+- synchronous=NORMAL (safe with WAL, no fsync per commit)
+- a larger page cache, memory mapped I/O and in-memory temp tables
+- a busy timeout, so concurrent writers wait instead of failing with "database is locked"
+- a pool of connections reused across script runs
+
+and adds the indexes used by the session list and the memory panel.
+
+agno checks, validates and reflects a table before every operation, and
+concurrent threads reflecting into the same metadata fail intermittently.
+``ProfiledSqliteDb`` resolves each table once, under a lock, and reuses it.
+"""
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from agno.db.sqlite import SqliteDb
+from agno.utils.log import logger
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from config import config
+
+
+@dataclass
+class SqliteProfile:
+    """Pragmas and pool settings applied to every connection, read from the app config."""
+
+    journal_mode: str = config.SQLITE_JOURNAL_MODE
+    synchronous: str = config.SQLITE_SYNCHRONOUS
+    cache_mb: int = config.SQLITE_CACHE_MB
+    mmap_mb: int = config.SQLITE_MMAP_MB
+    busy_timeout_ms: int = config.SQLITE_BUSY_TIMEOUT_MS
+    pool_size: int = config.SQLITE_POOL_SIZE
+
+    def pragmas(self) -> List[str]:
+        return [
+            f"PRAGMA journal_mode={self.journal_mode}",
+            f"PRAGMA synchronous={self.synchronous}",
+            # Negative cache_size is in KiB
+            f"PRAGMA cache_size=-{self.cache_mb * 1024}",
+            f"PRAGMA mmap_size={self.mmap_mb * 1024 * 1024}",
+            f"PRAGMA busy_timeout={self.busy_timeout_ms}",
+            "PRAGMA temp_store=MEMORY",
+            "PRAGMA foreign_keys=ON",
+        ]
+
+
+# Indexes for the queries of the app, on top of the ones agno creates
+# (sessions: session_type, created_at; memories: user_id, updated_at)
+INDEXES = {
+    "sessions": [
+        # Sessions of a user, newest first (session selector)
+        ("user_type_created", ("user_id", "session_type", "created_at")),
+    ],
+    "memories": [
+        # Memories of a user, most recently updated first (memory panel)
+        ("user_updated", ("user_id", "updated_at")),
+    ],
+}
+
+
+def create_sqlite_engine(db_file: str, profile: Optional[SqliteProfile] = None) -> Engine:
+    """Create a pooled SQLAlchemy engine for a SQLite file with the performance profile applied.
+
+    Args:
+        db_file: Path of the database file
+        profile: Pragmas and pool settings. Defaults to the settings in config.
+    """
+    profile = profile or SqliteProfile()
+    db_path = Path(db_file).resolve()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        pool_size=profile.pool_size,
+        max_overflow=profile.pool_size,
+        pool_pre_ping=False,
+        connect_args={
+            # Connections are returned to the pool and used by other script threads
+            "check_same_thread": False,
+            # Wait time of the sqlite3 driver itself, in seconds
+            "timeout": profile.busy_timeout_ms / 1000,
+        },
+    )
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in profile.pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return engine
+
+
+class ProfiledSqliteDb(SqliteDb):
+    """SqliteDb that resolves each of its tables once and reuses it for every operation."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._resolved_tables: Dict[str, Any] = {}
+        self._table_lock = threading.Lock()
+
+    def _get_table(self, table_type: str, create_table_if_not_found: Optional[bool] = False):
+        table = self._resolved_tables.get(table_type)
+        if table is not None:
+            return table
+        with self._table_lock:
+            table = self._resolved_tables.get(table_type)
+            if table is None:
+                table = super()._get_table(table_type=table_type, create_table_if_not_found=create_table_if_not_found)
+                # Missing tables are not cached, they may be created by a later write
+                if table is not None:
+                    self._resolved_tables[table_type] = table
+        return table
+
+
+def ensure_indexes(db: SqliteDb, table_types=tuple(INDEXES)) -> None:
+    """Create tables of the app and their extra indexes if they do not exist yet.
+
+    Args:
+        db: The database
+        table_types: Tables used in this database ("sessions", "memories")
+    """
+    table_names = {"sessions": db.session_table_name, "memories": db.memory_table_name}
+    for table_type in table_types:
+        indexes = INDEXES[table_type]
+        try:
+            # agno creates its tables on first use; create them now so the indexes can be added
+            if db._get_table(table_type=table_type, create_table_if_not_found=True) is None:
+                continue
+            with db.db_engine.begin() as conn:
+                for name, columns in indexes:
+                    table = table_names[table_type]
+                    conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_{name} ON {table} ({', '.join(columns)})"))
+        except Exception as e:
+            logger.warning(f"Could not create indexes on the {table_type} table: {e}")
+
+
+def create_sqlite_db(db_file: str, profile: Optional[SqliteProfile] = None, table_types=tuple(INDEXES)) -> ProfiledSqliteDb:
+    """Open an agno SqliteDb with the performance profile and the extra indexes.
+
+    Args:
+        db_file: Path of the database file
+        profile: Pragmas and pool settings. Defaults to the settings in config.
+        table_types: Tables used in this database, their indexes are created up front
+    """
+    # db_file is passed as well so the id of the database stays the same as without the profile
+    db = ProfiledSqliteDb(db_engine=create_sqlite_engine(db_file, profile), db_file=str(db_file))
+    ensure_indexes(db, table_types)
+    return db
+
+
+def sqlite_stats(db: Any) -> Dict[str, Any]:
+    """Return the effective pragmas and the connection pool status of a database."""
+    stats: Dict[str, Any] = {}
+    try:
+        with db.db_engine.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+                stats[pragma] = conn.execute(text(f"PRAGMA {pragma}")).scalar()
+        stats["pool"] = db.db_engine.pool.status()
+    except Exception as e:
+        stats["error"] = str(e)
+    return stats
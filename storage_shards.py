@@ -0,0 +1,225 @@
+"""
+Per-user sharded session and memory storage.
+
+With a single tmp/halo_sessions.db (and tmp/halo_memory.db) every session of
+every doctor serializes on one SQLite write lock. With sharding enabled each
+``user_id`` is routed to its own database file:
+
+- ``STORAGE_SHARDING=hash``: one of ``STORAGE_SHARD_COUNT`` files
+  (tmp/shards/halo_sessions_03.db), chosen by a stable hash of the user id
+- ``STORAGE_SHARDING=user``: one file per user (tmp/shards/users/...)
+- ``STORAGE_SHARDING=off`` (default): the single files, as before
+
+Writes of users on different shards run in parallel. ``ShardRouter`` opens the
+shards on first use, lists sessions and memories across all shards for the
+admin views, and releases the connections of shards not used recently.
+``ShardedMemoryDb`` routes the memory operations of a ``MemoryManager`` to the
+shard of the user they belong to.
+
+Changing the mode or the shard count routes users to other files; existing
+data is not moved.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agno.utils.log import logger
+
+from config import config
+from sqlite_profile import create_sqlite_db
+
+SHARDING_MODES = ("off", "hash", "user")
+
+
+class ShardRouter:
+    """Routes user ids to SQLite databases and gives access to all of them."""
+
+    def __init__(
+        self,
+        base_path: Path,
+        mode: Optional[str] = None,
+        shard_count: Optional[int] = None,
+        table_types: Tuple[str, ...] = ("sessions", "memories"),
+        max_open: Optional[int] = None,
+    ):
+        """
+        Args:
+            base_path: Path of the unsharded database; shards are created next to it in shards/
+            mode: "hash" or "user". Defaults to config.STORAGE_SHARDING.
+            shard_count: Number of shards in hash mode. Defaults to config.STORAGE_SHARD_COUNT.
+            table_types: Tables used in the databases
+            max_open: Shards keeping pooled connections. Defaults to config.STORAGE_MAX_OPEN_SHARDS.
+        """
+        self.mode = mode or config.STORAGE_SHARDING
+        if self.mode not in SHARDING_MODES or self.mode == "off":
+            raise ValueError(f"Unsupported sharding mode: {self.mode}")
+        self.base_path = Path(base_path)
+        self.shard_count = max(1, shard_count or config.STORAGE_SHARD_COUNT)
+        self.table_types = table_types
+        self.max_open = max(1, max_open or config.STORAGE_MAX_OPEN_SHARDS)
+        self.shard_dir = self.base_path.parent.joinpath("shards")
+        self._dbs: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ShardRouter(mode={self.mode!r}, base={self.base_path.name!r}, open={len(self._dbs)})"
+
+    def shard_key(self, user_id: Optional[str]) -> str:
+        """Return the name of the shard of a user."""
+        user = str(user_id or "anonymous")
+        digest = hashlib.sha1(user.encode("utf-8")).hexdigest()
+        if self.mode == "hash":
+            return f"{int(digest[:8], 16) % self.shard_count:02d}"
+        # Readable and collision free: sanitized user id plus a digest
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", user)[:40]
+        return f"{slug}-{digest[:8]}"
+
+    def shard_path(self, key: str) -> Path:
+        if self.mode == "hash":
+            return self.shard_dir.joinpath(f"{self.base_path.stem}_{key}.db")
+        return self.shard_dir.joinpath("users", f"{self.base_path.stem}_{key}.db")
+
+    def _open(self, key: str) -> Any:
+        with self._lock:
+            db = self._dbs.get(key)
+            if db is None:
+                db = create_sqlite_db(str(self.shard_path(key)), table_types=self.table_types)
+                self._dbs[key] = db
+            self._dbs.move_to_end(key)
+            # Shards stay usable after their pooled connections are closed; they reconnect on demand
+            while len(self._dbs) > self.max_open:
+                _, idle = self._dbs.popitem(last=False)
+                idle.db_engine.dispose()
+        return db
+
+    def db_for(self, user_id: Optional[str]) -> Any:
+        """Return the database of a user, opening it on first use."""
+        return self._open(self.shard_key(user_id))
+
+    def shard_keys(self) -> List[str]:
+        """Names of all shards that exist on disk."""
+        pattern = f"{self.base_path.stem}_*.db"
+        folder = self.shard_dir if self.mode == "hash" else self.shard_dir.joinpath("users")
+        prefix = len(self.base_path.stem) + 1
+        return sorted(path.stem[prefix:] for path in folder.glob(pattern))
+
+    def all_dbs(self) -> Iterable[Any]:
+        """Yield the database of every existing shard."""
+        for key in self.shard_keys():
+            yield self._open(key)
+
+    def list_sessions(self, session_type: Any = None, limit: int = 50, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return the most recent sessions across all shards, newest first (for admin views).
+
+        Args:
+            session_type: Only sessions of this type
+            limit: Maximum number of sessions
+            user_id: Only the sessions of this user, read from their shard only
+        """
+        dbs = [self.db_for(user_id)] if user_id else list(self.all_dbs())
+        sessions: List[Dict[str, Any]] = []
+        for db in dbs:
+            try:
+                rows, _ = db.get_sessions(
+                    session_type=session_type, user_id=user_id, limit=limit,
+                    sort_by="created_at", sort_order="desc", deserialize=False,
+                )
+                sessions.extend(rows)
+            except Exception as e:
+                logger.warning(f"Listing the sessions of shard {db.db_file} failed: {e}")
+        sessions.sort(key=lambda s: s.get("created_at") or 0, reverse=True)
+        return sessions[:limit]
+
+    def list_user_memories(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the most recently updated memories across all shards (for admin views)."""
+        memories: List[Dict[str, Any]] = []
+        for db in self.all_dbs():
+            try:
+                rows, _ = db.get_user_memories(limit=limit, sort_by="updated_at", sort_order="desc", deserialize=False)
+                memories.extend(rows)
+            except Exception as e:
+                logger.warning(f"Listing the memories of shard {db.db_file} failed: {e}")
+        memories.sort(key=lambda m: m.get("updated_at") or 0, reverse=True)
+        return memories[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the mode, the shards on disk with their size and the shards with open connections."""
+        keys = self.shard_keys()
+        return {
+            "mode": self.mode,
+            "shard_count": self.shard_count if self.mode == "hash" else None,
+            "shards_on_disk": len(keys),
+            "open_shards": len(self._dbs),
+            "total_mb": round(sum(self.shard_path(key).stat().st_size for key in keys) / (1024 * 1024), 2),
+        }
+
+
+class ShardedMemoryDb:
+    """Memory database of a MemoryManager that routes each operation to the shard of its user.
+
+    Operations without a user (by memory id, or of all users) go to every shard.
+    Private members of SqliteDb are not forwarded, so code reaching for the SQL
+    tables falls back to the public methods.
+    """
+
+    def __init__(self, router: ShardRouter):
+        self.router = router
+
+    def __repr__(self) -> str:
+        return f"ShardedMemoryDb({self.router!r})"
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not defined here
+        if name.startswith("_") or name in ("Session", "db_engine"):
+            raise AttributeError(name)
+        return getattr(self.router.db_for(None), name)
+
+    def upsert_user_memory(self, memory: Any, *args, **kwargs) -> Any:
+        return self.router.db_for(getattr(memory, "user_id", None)).upsert_user_memory(memory, *args, **kwargs)
+
+    def upsert_memories(self, memories: List[Any], *args, **kwargs) -> List[Any]:
+        by_user: Dict[Optional[str], List[Any]] = {}
+        for memory in memories:
+            by_user.setdefault(getattr(memory, "user_id", None), []).append(memory)
+        results: List[Any] = []
+        for user_id, user_memories in by_user.items():
+            results.extend(self.router.db_for(user_id).upsert_memories(user_memories, *args, **kwargs) or [])
+        return results
+
+    def get_user_memories(self, user_id: Optional[str] = None, *args, **kwargs) -> Any:
+        if user_id is not None:
+            return self.router.db_for(user_id).get_user_memories(user_id, *args, **kwargs)
+        paginated = kwargs.get("deserialize") is False
+        memories: List[Any] = []
+        total = 0
+        for db in self.router.all_dbs():
+            result = db.get_user_memories(None, *args, **kwargs)
+            if paginated:
+                memories.extend(result[0])
+                total += result[1]
+            else:
+                memories.extend(result or [])
+        return (memories, total) if paginated else memories
+
+    def get_user_memory(self, memory_id: str, *args, **kwargs) -> Any:
+        for db in self.router.all_dbs():
+            memory = db.get_user_memory(memory_id, *args, **kwargs)
+            if memory is not None:
+                return memory
+        return None
+
+    def delete_user_memory(self, memory_id: str, *args, **kwargs) -> None:
+        for db in self.router.all_dbs():
+            db.delete_user_memory(memory_id, *args, **kwargs)
+
+    def delete_user_memories(self, memory_ids: List[str], *args, **kwargs) -> None:
+        for db in self.router.all_dbs():
+            db.delete_user_memories(memory_ids, *args, **kwargs)
+
+    def clear_memories(self) -> None:
+        for db in self.router.all_dbs():
+            db.clear_memories()
@@ -0,0 +1,243 @@
+"""
+Frame-rate limited rendering of streamed responses.
+
+Chunks from ``halo.arun(..., stream=True)`` are collected and the response
+placeholder is redrawn at most ``fps`` times per second, instead of once per
+chunk. Image links are detected incrementally: only the text that arrived since
+the last scan (plus a bounded tail that may hold an unfinished link) is searched.
+Time to first token and per-frame render time are recorded for every response.
+
+Tool calls of the stream are collected by ``ToolCallAccumulator``, indexed by
+their tool call id, so every event costs a dictionary lookup and only the entry
+that changed is redrawn.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import streamlit as st
+from agno.utils.log import logger
+
+from config import config
+from transcript import GENERATED_IMAGES_DIR, SANDBOX_PATTERN
+from utils import render_tool_call, summarize_tool_call
+
+# Team events that carry response content
+CONTENT_EVENTS = ("TeamRunResponseContent", "TeamRunContent", "run_content", "content")
+# Team events that carry a single tool call
+TOOL_CALL_EVENTS = ("TeamToolCallStarted", "TeamToolCallCompleted")
+
+# An unfinished link longer than this is not a link; stop carrying it between scans
+MAX_LINK_LENGTH = 512
+
+
+class StreamRenderer:
+    """Coalesces streamed chunks into frames and renders them into a placeholder."""
+
+    def __init__(self, container, image_container=None, fps: Optional[float] = None):
+        """
+        Args:
+            container: st.empty() placeholder that shows the response
+            image_container: Container that receives images linked in the response
+            fps: Maximum number of redraws per second. Defaults to config.STREAM_FPS.
+        """
+        self.container = container
+        self.image_container = image_container
+        self.frame_interval = 1.0 / (fps or config.STREAM_FPS)
+        self._parts: List[str] = []
+        self._length = 0
+        self._rendered_length = 0
+        self._scan_tail = ""
+        self.images: List[str] = []
+
+        self.started_at = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self._last_frame_at = 0.0
+        self.chunks = 0
+        self.frames = 0
+        self.frame_seconds_total = 0.0
+        self.frame_seconds_max = 0.0
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def append(self, content: str) -> None:
+        """Add a chunk of the response and redraw if a frame is due."""
+        if not content:
+            return
+        now = time.perf_counter()
+        if self.first_token_at is None:
+            self.first_token_at = now
+        self._parts.append(content)
+        self._length += len(content)
+        self.chunks += 1
+        self._scan(content)
+        if now - self._last_frame_at >= self.frame_interval:
+            self._render(now)
+
+    def _scan(self, content: str) -> None:
+        """Look for image links in the new text and the unfinished tail of the previous scan."""
+        text = self._scan_tail + content
+        end = 0
+        for match in SANDBOX_PATTERN.finditer(text):
+            self._add_image(match.group(1))
+            end = match.end()
+        # Keep what could be the start of a link that is not complete yet
+        start = text.rfind("[", end)
+        if start == -1 or len(text) - start > MAX_LINK_LENGTH:
+            self._scan_tail = ""
+        else:
+            self._scan_tail = text[start:]
+
+    def _add_image(self, img_filename: str) -> None:
+        img_path = os.path.join(GENERATED_IMAGES_DIR, img_filename)
+        if img_path in self.images or not os.path.exists(img_path):
+            return
+        self.images.append(img_path)
+        if self.image_container is not None:
+            with self.image_container:
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    st.image(img_path, caption=f"Generated Image: {img_filename}", use_container_width=True)
+
+    def _render(self, now: float) -> None:
+        if self._length == self._rendered_length:
+            return
+        self.container.markdown(self.text)
+        elapsed = time.perf_counter() - now
+        self._last_frame_at = now
+        self._rendered_length = self._length
+        self.frames += 1
+        self.frame_seconds_total += elapsed
+        self.frame_seconds_max = max(self.frame_seconds_max, elapsed)
+
+    def finish(self) -> str:
+        """Draw the final frame, log the stream metrics and return the full response."""
+        self._render(time.perf_counter())
+        metrics = self.metrics()
+        logger.info(
+            f"Streamed {metrics['chars']} chars in {metrics['chunks']} chunks / {metrics['frames']} frames, "
+            f"TTFT {metrics['ttft_seconds'] or 0:.2f}s, mean frame {metrics['frame_seconds_mean'] or 0:.4f}s"
+        )
+        return self.text
+
+    def metrics(self) -> Dict[str, Any]:
+        """Return time to first token, chunk/frame counts and render times of the stream."""
+        return {
+            "chars": self._length,
+            "chunks": self.chunks,
+            "frames": self.frames,
+            "ttft_seconds": self.first_token_at - self.started_at if self.first_token_at else None,
+            "total_seconds": time.perf_counter() - self.started_at,
+            "frame_seconds_mean": self.frame_seconds_total / self.frames if self.frames else None,
+            "frame_seconds_max": self.frame_seconds_max,
+            "images": list(self.images),
+        }
+
+
+def _tool_field(tool: Any, *names: str) -> Any:
+    """Return the first non-empty field of a tool call given as a dict or a ToolExecution."""
+    for name in names:
+        value = tool.get(name) if hasattr(tool, "get") else getattr(tool, name, None)
+        if value is not None:
+            return value
+    return None
+
+
+class ToolCallAccumulator:
+    """Latest state of every tool call of a streamed response, indexed by tool call id.
+
+    Each tool call gets its own placeholder in the container. An event for a
+    known call replaces the stored state and redraws only that placeholder, and
+    only if something visible (result, error or metrics) changed.
+    """
+
+    def __init__(self, container):
+        """
+        Args:
+            container: st.container() that receives one placeholder per tool call
+        """
+        self.container = container
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self.redraws = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(tool: Any) -> Optional[str]:
+        tool_call_id = _tool_field(tool, "tool_call_id", "id")
+        if tool_call_id:
+            return str(tool_call_id)
+        # Tool calls without an id (old dict format) are identified by their name
+        name = _tool_field(tool, "tool_name", "name")
+        return f"name:{name}" if name else None
+
+    @staticmethod
+    def _state(tool: Any) -> Tuple[bool, bool, bool]:
+        """What is visible of a tool call: whether it has a result, an error and metrics."""
+        return (
+            _tool_field(tool, "result", "content") is not None,
+            bool(_tool_field(tool, "tool_call_error")),
+            _tool_field(tool, "metrics") is not None,
+        )
+
+    def feed(self, chunk: Any) -> None:
+        """Record the tool calls carried by a stream event."""
+        event = getattr(chunk, "event", None)
+        if event in TOOL_CALL_EVENTS and getattr(chunk, "tool", None) is not None:
+            self.update(chunk.tool, completed=event.endswith("Completed"))
+        elif getattr(chunk, "tools", None):
+            for tool in chunk.tools:
+                self.update(tool)
+
+    def update(self, tool: Any, completed: bool = False) -> None:
+        """Store the latest state of a tool call and redraw its placeholder if it changed.
+
+        Args:
+            tool: Tool call as a dictionary or ToolExecution object
+            completed: Whether the event marks the end of the tool call
+        """
+        key = self._key(tool)
+        if key is None:
+            return
+        now = time.perf_counter()
+        state = self._state(tool)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"tool": tool, "state": None, "slot": self.container.empty(), "started_at": now, "finished_at": None}
+            self._entries[key] = entry
+        entry["tool"] = tool
+        if (completed or state[0] or state[1]) and entry["finished_at"] is None:
+            entry["finished_at"] = now
+        if state != entry["state"]:
+            entry["state"] = state
+            self._render(entry)
+
+    def _render(self, entry: Dict[str, Any]) -> None:
+        summary = summarize_tool_call(entry["tool"])
+        if not summary:
+            return
+        # Fall back to the time measured in the stream when the tool reports no metrics
+        if summary["time"] is None and entry["finished_at"] is not None:
+            summary["title"] += f" ({entry['finished_at'] - entry['started_at']:.4f}s)"
+        with entry["slot"].container():
+            render_tool_call(summary)
+        self.redraws += 1
+
+    def tool_calls(self) -> List[Any]:
+        """Return the latest state of every tool call, in the order they started."""
+        return [entry["tool"] for entry in self._entries.values()]
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Return name and duration in the stream of every tool call."""
+        return [
+            {
+                "tool_call_id": key,
+                "name": _tool_field(entry["tool"], "tool_name", "name"),
+                "seconds": entry["finished_at"] - entry["started_at"] if entry["finished_at"] is not None else None,
+            }
+            for key, entry in self._entries.items()
+        ]
@@ -0,0 +1,89 @@
+"""
+Tests of the manifest-driven sync of the knowledge directory.
+"""
+
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("AGNO_TELEMETRY", "false")
+
+from agno.knowledge.document import Document  # noqa: E402
+from agno.knowledge.embedder.base import Embedder  # noqa: E402
+from agno.vectordb.lancedb import LanceDb, SearchType  # noqa: E402
+
+from knowledge import HaloKnowledge  # noqa: E402
+
+
+class HashingEmbedder(Embedder):
+    """Deterministic embeddings without an embedding service."""
+
+    def get_embedding(self, text):
+        return self.get_embeddings_batch([text])[0]
+
+    def get_embedding_and_usage(self, text):
+        return self.get_embedding(text), None
+
+    def get_embeddings_batch(self, texts, batch_size=100):
+        return [[b / 255 for b in hashlib.sha256(t.encode()).digest()[:16]] for t in texts]
+
+
+def make_knowledge(tmp_path: Path) -> HaloKnowledge:
+    vector_db = LanceDb(
+        table_name="knowledge", uri=str(tmp_path / "db"), search_type=SearchType.vector,
+        embedder=HashingEmbedder(dimensions=16),
+    )
+    knowledge = HaloKnowledge(vector_db=vector_db)
+    knowledge.knowledge_dir = tmp_path / "docs"
+    knowledge.knowledge_dir.mkdir()
+    return knowledge
+
+
+def contents(knowledge: HaloKnowledge):
+    return sorted(doc.content for doc in knowledge.vector_db.search("guideline", limit=100))
+
+
+def test_removing_a_file_keeps_a_chunk_shared_with_another(tmp_path):
+    knowledge = make_knowledge(tmp_path)
+    shared = "Shared guideline on sepsis."
+    (knowledge.knowledge_dir / "a.txt").write_text(shared)
+    (knowledge.knowledge_dir / "b.txt").write_text(shared)
+
+    report = knowledge.load()
+    assert report.added == 2
+    assert knowledge.vector_db.get_count() == 2
+
+    (knowledge.knowledge_dir / "a.txt").unlink()
+    report = knowledge.sync()
+    assert report.removed == 1
+    assert report.unchanged == 1
+    assert report.chunks_deleted == 1
+    assert contents(knowledge) == [shared]
+
+
+def test_changing_a_file_keeps_a_chunk_shared_with_another(tmp_path):
+    knowledge = make_knowledge(tmp_path)
+    shared = "Shared guideline on sepsis."
+    (knowledge.knowledge_dir / "a.txt").write_text(shared)
+    (knowledge.knowledge_dir / "b.txt").write_text(shared)
+    knowledge.load()
+
+    changed = "Changed guideline on anemia."
+    (knowledge.knowledge_dir / "a.txt").write_text(changed)
+    report = knowledge.sync()
+    assert report.changed == 1
+    assert report.chunks_deleted == 1
+    assert contents(knowledge) == sorted([changed, shared])
+
+
+def test_loading_a_source_again_replaces_its_rows(tmp_path):
+    knowledge = make_knowledge(tmp_path)
+    knowledge.vector_db.create()
+    documents = [Document(content="Guideline on sepsis."), Document(content="Guideline on anemia.")]
+
+    assert knowledge.load_documents(documents, content_hash="upload") == 2
+    assert knowledge.load_documents([Document(content=doc.content) for doc in documents], content_hash="upload") == 2
+    assert knowledge.vector_db.get_count() == 2
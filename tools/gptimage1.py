@@ -13,6 +13,7 @@ from agno.media import Image
 from agno.team.team import Team
 from agno.tools import Toolkit
 from agno.utils.log import log_debug, logger
+from http_pool import http_pool
 
 # Windows-specific event loop policy for asyncio compatibility
 if sys.platform == 'win32':
@@ -74,7 +75,8 @@ class GPTImage1Tools(Toolkit):
             return "Please set the OPENAI_API_KEY"
 
         try:
-            client = OpenAI(api_key=self.api_key)
+            # Shared client, so image requests reuse pooled connections
+            client = http_pool.openai_client(api_key=self.api_key)
             log_debug(f"Generating image using prompt: {prompt}")
             log_debug(f"API parameters: model={self.model}, n={self.n}, size={self.size}")
             
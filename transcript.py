@@ -0,0 +1,200 @@
+"""
+Transcript rendering for the chat pages.
+
+Everything that is derived from a message to display it (tool call summaries,
+image links found in the content and their resolved files) is computed once and
+cached in the session state under the stable id of the message. Only the most
+recent messages are rendered on every rerun; older ones are loaded on demand.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import streamlit as st
+from agno.utils.log import log_debug
+
+from config import config
+from messages import ChatMessage
+from utils import display_tool_summaries, summarize_tool_call
+
+ROOT_DIR = str(config.THIS_DIR)
+UPLOADS_DIR = os.path.join(ROOT_DIR, "uploads")
+GENERATED_IMAGES_DIR = os.path.join(ROOT_DIR, "generated_images")
+
+# Links to images generated in the code interpreter sandbox, saved to generated_images
+SANDBOX_PATTERN = re.compile(r'\[.*?\]\(sandbox:/mnt/data/([a-f0-9\-]+\.(?:png|jpg|jpeg|gif))\)')
+# Links to charts saved by the visualization tools
+CHART_PATTERN = re.compile(r'\[.*?\]\(.*?(dashboard_charts|business_charts|charts)[/\\]([^)]+)\)')
+# Links to local image files
+FILE_PATTERN = re.compile(r'\[.*?\]\(file:///(.*?\.(?:png|jpg|jpeg|gif))\)')
+# Relative path image links (./path/image.png)
+RELATIVE_PATTERN = re.compile(r'\[.*?\]\(\.?/?([^)]*\.(?:png|jpg|jpeg|gif))\)')
+
+AVATARS = {"user": "👤", "assistant": "🤖"}
+
+
+def message_id(message: ChatMessage) -> str:
+    """Return the stable id of a message."""
+    return message.id
+
+
+def _find_chart(chart_dir: str, img_filename: str) -> str:
+    """Resolve a chart link to a file in the chart directory."""
+    chart_dir_path = os.path.join(ROOT_DIR, chart_dir)
+    if os.path.exists(chart_dir_path):
+        # Look for files that match the filename pattern
+        for file in os.listdir(chart_dir_path):
+            if file.startswith(img_filename.split('.')[0]):
+                return os.path.join(chart_dir_path, file)
+    return os.path.join(chart_dir_path, img_filename)
+
+
+def find_linked_images(content: str) -> List[Tuple[str, str]]:
+    """Find the image files linked in a message.
+
+    Args:
+        content: Markdown content of the message
+
+    Returns:
+        List of (path, caption) for every linked image that exists on disk
+    """
+    images: List[Tuple[str, str]] = []
+    seen = set()
+
+    def add(path: str, caption: str) -> None:
+        if path not in seen and os.path.isfile(path):
+            seen.add(path)
+            images.append((path, caption))
+
+    # Only the first chart found is shown
+    for chart_dir, img_filename in CHART_PATTERN.findall(content):
+        img_path = _find_chart(chart_dir, img_filename)
+        if os.path.isfile(img_path):
+            add(img_path, f"Chart: {img_filename}")
+            break
+
+    for img_filename in SANDBOX_PATTERN.findall(content):
+        add(os.path.join(GENERATED_IMAGES_DIR, img_filename), f"Generated Image: {img_filename}")
+
+    for img_path in FILE_PATTERN.findall(content):
+        add(img_path, f"Image: {os.path.basename(img_path)}")
+
+    for img_filename in RELATIVE_PATTERN.findall(content):
+        # Try different base paths, stop at the first one that exists
+        for full_path in (os.path.join(ROOT_DIR, "pages", img_filename), os.path.join(os.getcwd(), img_filename), img_filename):
+            if os.path.isfile(full_path):
+                add(full_path, f"Image: {os.path.basename(full_path)}")
+                break
+
+    log_debug(f"linked images: {images}")
+    return images
+
+
+def uploaded_images(message: ChatMessage) -> List[Tuple[str, str]]:
+    """Return (path, caption) of the uploaded images of a message that are still in the uploads folder."""
+    images = []
+    for idx, image in enumerate(message.images):
+        image_filepath = image.filepath or image.url
+        if not image_filepath:
+            continue
+        image_name = os.path.basename(str(image_filepath))
+        image_path = os.path.join(UPLOADS_DIR, image_name)
+        if os.path.isfile(image_path):
+            images.append((image_path, f"Image {idx + 1}: {image_name}"))
+    return images
+
+
+def is_visible(message: ChatMessage) -> bool:
+    """Check whether a message is shown in the transcript (user or assistant message with content)."""
+    if message.role not in AVATARS:
+        return False
+    # Skip messages with None or empty content
+    content = str(message.content or "").strip()
+    return content != "" and content.lower() != "none"
+
+
+def build_artifacts(message: ChatMessage) -> Dict[str, Any]:
+    """Derive everything needed to render a message."""
+    content = str(message.content)
+    artifacts = {"content": content, "tool_calls": [], "uploaded": [], "linked": []}
+
+    if message.tool_calls:
+        artifacts["tool_calls"] = [s for s in map(summarize_tool_call, message.tool_calls) if s]
+    if message.images:
+        artifacts["uploaded"] = uploaded_images(message)
+    else:
+        artifacts["linked"] = find_linked_images(content)
+    return artifacts
+
+
+def get_artifacts(message: ChatMessage) -> Dict[str, Any]:
+    """Return the cached render artifacts of a message, building them on first use."""
+    cache = st.session_state.setdefault("render_cache", {})
+    key = message_id(message)
+    artifacts = cache.get(key)
+    if artifacts is None:
+        artifacts = build_artifacts(message)
+        cache[key] = artifacts
+    return artifacts
+
+
+def render_message(message: ChatMessage, artifacts: Dict[str, Any]) -> None:
+    """Render one message from its artifacts."""
+    with st.chat_message(message.role, avatar=AVATARS.get(message.role)):
+        if artifacts["tool_calls"]:
+            display_tool_summaries(st.empty(), artifacts["tool_calls"])
+
+        # Display the message content
+        st.markdown(artifacts["content"])
+
+        # Display uploaded images (50% size)
+        if artifacts["uploaded"]:
+            col1, col2 = st.columns([1, 1])
+            for idx, (path, caption) in enumerate(artifacts["uploaded"]):
+                # Alternate between columns for multiple images
+                with col1 if idx % 2 == 0 else col2:
+                    st.write("**Uploaded Images:**")
+                    st.image(path, caption=caption, width=None)
+
+        # Display linked images at 50% of the container width
+        for path, caption in artifacts["linked"]:
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                try:
+                    st.image(path, caption=caption, use_container_width=True)
+                except Exception as e:
+                    st.error(f"Error displaying image: {e}")
+
+
+def render_transcript(messages: Sequence[ChatMessage], eager: Optional[int] = None) -> None:
+    """Render the chat transcript, the most recent messages first and older ones on demand.
+
+    Args:
+        messages: The messages of the session (a TranscriptStore or a list)
+        eager: Number of recent messages rendered on every rerun. Defaults to config.TRANSCRIPT_EAGER_MESSAGES.
+    """
+    eager = eager or config.TRANSCRIPT_EAGER_MESSAGES
+
+    # How many messages are shown is kept per session and grows by one page per click
+    window = max(st.session_state.get("transcript_window", eager), eager)
+    hidden = len(messages) - window
+    if hidden > 0:
+        if st.button(
+            f":material/history: Load older messages ({hidden} hidden)",
+            key="transcript_load_older",
+            use_container_width=True,
+        ):
+            window += eager
+            st.session_state["transcript_window"] = window
+            hidden = len(messages) - window
+
+    # Only the shown messages are read (older ones may be on disk) and get artifacts
+    rendered = {}
+    for message in messages[max(hidden, 0):]:
+        if is_visible(message):
+            rendered[message.id] = get_artifacts(message)
+            render_message(message, rendered[message.id])
+
+    # The artifact cache only keeps the messages on screen
+    st.session_state["render_cache"] = rendered
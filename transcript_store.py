@@ -0,0 +1,248 @@
+"""
+Bounded per-session transcript store.
+
+``TranscriptStore`` replaces the plain list in st.session_state["messages"]. The
+most recent messages stay in memory up to a byte budget (and a message count);
+older messages are pickled to a SQLite file shared by all sessions of the
+process and read back only when they are displayed or exported. The rows of a
+session are deleted when its store is cleared or garbage collected, and the
+file is removed when the process exits.
+
+``memory_stats()`` reports the resident memory of the process together with
+the hot and spilled messages of all live sessions.
+"""
+
+import atexit
+import os
+import pickle
+import sqlite3
+import threading
+import uuid
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from agno.utils.log import logger
+
+from config import config
+from messages import ChatMessage
+
+SPILL_BATCH = 50
+
+
+class SpillFile:
+    """SQLite file holding the spilled messages of every session of the process."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Script runs of different sessions use different threads; access is serialized by the lock
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages (store_id TEXT, seq INTEGER, payload BLOB, PRIMARY KEY (store_id, seq))"
+            )
+            atexit.register(self.remove)
+        return self._conn
+
+    def write(self, store_id: str, first_seq: int, messages: List[ChatMessage]) -> int:
+        """Append messages with consecutive sequence numbers and return the number of bytes written."""
+        rows = [(store_id, first_seq + i, pickle.dumps(m, pickle.HIGHEST_PROTOCOL)) for i, m in enumerate(messages)]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN")
+            conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        return sum(len(row[2]) for row in rows)
+
+    def read(self, store_id: str, start: int, stop: int) -> List[ChatMessage]:
+        """Return the messages with sequence numbers in [start, stop)."""
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                "SELECT payload FROM messages WHERE store_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (store_id, start, stop),
+            ).fetchall()
+        return [pickle.loads(row[0]) for row in rows]
+
+    def drop(self, store_id: str) -> None:
+        """Delete all messages of a store."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM messages WHERE store_id = ?", (store_id,))
+
+    def size(self) -> int:
+        """Size of the file on disk in bytes."""
+        total = 0
+        for suffix in ("", "-wal"):
+            path = Path(f"{self.path}{suffix}")
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+    def remove(self) -> None:
+        """Close the connection and delete the file."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{self.path}{suffix}")
+            except OSError:
+                pass
+
+
+# One spill file per process, created on the first spill
+spill_file = SpillFile(Path(config.THIS_DIR).joinpath("tmp", f"halo_transcripts_{os.getpid()}.db"))
+
+# Live stores, for the process memory accounting
+_stores: "weakref.WeakSet[TranscriptStore]" = weakref.WeakSet()
+
+
+class TranscriptStore:
+    """Messages of one session: recent ones in memory, older ones spilled to disk.
+
+    Supports the list operations the pages use: ``append``, ``len``, indexing
+    and slicing (``messages[-1]``, ``messages[-20:]``), iteration and ``clear``.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None, max_hot: Optional[int] = None):
+        """
+        Args:
+            budget_bytes: Memory budget of the hot messages. Defaults to config.TRANSCRIPT_MEMORY_BUDGET_MB.
+            max_hot: Maximum number of hot messages. Defaults to config.TRANSCRIPT_HOT_MESSAGES.
+        """
+        self.budget_bytes = budget_bytes or int(config.TRANSCRIPT_MEMORY_BUDGET_MB * 1024 * 1024)
+        self.max_hot = max_hot or config.TRANSCRIPT_HOT_MESSAGES
+        self.store_id = uuid.uuid4().hex
+        self._hot: Deque[Tuple[ChatMessage, int]] = deque()
+        self._hot_bytes = 0
+        self._spilled = 0
+        self._spilled_bytes = 0
+        _stores.add(self)
+        # Remove the spilled rows once the session (and its store) is gone
+        weakref.finalize(self, spill_file.drop, self.store_id)
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._hot)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __repr__(self) -> str:
+        return f"TranscriptStore(messages={len(self)}, spilled={self._spilled})"
+
+    def append(self, message: ChatMessage) -> None:
+        """Add a message, spilling the oldest hot messages if the budget is exceeded."""
+        size = message.approx_size()
+        self._hot.append((message, size))
+        self._hot_bytes += size
+        if self._hot_bytes > self.budget_bytes or len(self._hot) > self.max_hot:
+            self._spill()
+
+    def _spill(self) -> None:
+        # Spill in batches down to 3/4 of the limits, so appends do not write one row each
+        target_bytes = self.budget_bytes * 3 // 4
+        target_count = self.max_hot * 3 // 4
+        batch: List[ChatMessage] = []
+        # The newest message always stays in memory
+        while len(self._hot) > 1 and (self._hot_bytes > target_bytes or len(self._hot) > target_count):
+            message, size = self._hot.popleft()
+            self._hot_bytes -= size
+            batch.append(message)
+        for i in range(0, len(batch), SPILL_BATCH):
+            chunk = batch[i:i + SPILL_BATCH]
+            self._spilled_bytes += spill_file.write(self.store_id, self._spilled, chunk)
+            self._spilled += len(chunk)
+        if batch:
+            logger.debug(f"Spilled {len(batch)} messages of transcript {self.store_id} to disk")
+
+    def _range(self, start: int, stop: int) -> List[ChatMessage]:
+        messages: List[ChatMessage] = []
+        if start < self._spilled:
+            messages.extend(spill_file.read(self.store_id, start, min(stop, self._spilled)))
+        if stop > self._spilled:
+            hot_start = max(start - self._spilled, 0)
+            messages.extend(m for m, _ in list(self._hot)[hot_start:stop - self._spilled])
+        return messages
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[ChatMessage, List[ChatMessage]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self._range(start, stop)[::step] if stop > start else []
+            return self._range(start, stop) if stop > start else []
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transcript index out of range")
+        if index >= self._spilled:
+            return self._hot[index - self._spilled][0]
+        return self._range(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        for start in range(0, self._spilled, SPILL_BATCH):
+            yield from spill_file.read(self.store_id, start, min(start + SPILL_BATCH, self._spilled))
+        yield from [m for m, _ in self._hot]
+
+    def clear(self) -> None:
+        """Remove all messages."""
+        spill_file.drop(self.store_id)
+        self._hot.clear()
+        self._hot_bytes = 0
+        self._spilled = 0
+        self._spilled_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return message counts and sizes of the store."""
+        return {
+            "messages": len(self),
+            "hot_messages": len(self._hot),
+            "hot_bytes": self._hot_bytes,
+            "spilled_messages": self._spilled,
+            "spilled_bytes": self._spilled_bytes,
+        }
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident memory of the process, or its peak where the current value is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, ValueError):
+        return None
+
+
+def memory_stats() -> Dict[str, Any]:
+    """Return the memory of the process and of the transcripts of all live sessions."""
+    stores = [store.stats() for store in list(_stores)]
+    rss = _rss_bytes()
+    mb = 1024 * 1024
+    return {
+        "process_rss_mb": round(rss / mb, 1) if rss is not None else None,
+        "sessions": len(stores),
+        "messages": sum(s["messages"] for s in stores),
+        "hot_messages": sum(s["hot_messages"] for s in stores),
+        "hot_mb": round(sum(s["hot_bytes"] for s in stores) / mb, 2),
+        "spilled_messages": sum(s["spilled_messages"] for s in stores),
+        "spill_file_mb": round(spill_file.size() / mb, 2),
+        "budget_mb_per_session": config.TRANSCRIPT_MEMORY_BUDGET_MB,
+    }
@@ -0,0 +1,159 @@
+"""
+Transport manager for outbound HTTP requests of tools and readers.
+
+Many tools call the module-level helpers of ``requests`` (``requests.get``) and
+``httpx`` (``httpx.get``), which open a new connection pool for every call. The
+transport manager routes these helpers through long-lived sessions, one per
+host, so repeated tool calls reuse their connections:
+
+- ``requests.api.request`` goes through a pooled ``requests.Session`` per host
+- ``httpx._api.request`` goes through the per-host clients of ``http_pool``
+
+The pooled sessions and clients serve every user of the process, so they keep
+no cookies; cookies passed with a request are still sent with it.
+
+TLS verification uses the certifi bundle, or the bundle configured with
+``HALO_CA_BUNDLE``. Verification is only disabled when ``HALO_SSL_VERIFY=false``.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+import requests.api
+from agno.utils.log import logger
+from requests.adapters import HTTPAdapter
+
+from config import config
+from http_pool import ca_bundle, http_pool, no_cookies
+
+# httpx.request arguments that need a dedicated client; calls using them are not pooled
+_HTTPX_CLIENT_OPTIONS = ("proxy", "verify", "trust_env", "cookies")
+
+
+class TransportManager:
+    """Long-lived per-host sessions for ``requests`` and ``httpx`` module-level calls."""
+
+    def __init__(self, pool_maxsize: int = config.HTTP_MAX_CONNECTIONS_PER_HOST):
+        self.pool_maxsize = pool_maxsize
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+        self._original_requests_request = None
+        self._original_httpx_request = None
+        self.installed = False
+
+    @property
+    def verify(self):
+        """Value for the ``verify`` argument of requests: the CA bundle path, or False."""
+        return ca_bundle() or False
+
+    def session_for(self, url: str) -> requests.Session:
+        """Return the pooled requests session of the host of a URL.
+
+        Args:
+            url: URL of the request
+        """
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = requests.Session()
+                    session.verify = self.verify
+                    # Shared by all users: cookies set by a response must not be sent with another user's request
+                    session.cookies.set_policy(no_cookies())
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._sessions[key] = session
+        return session
+
+    def _requests_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        return self.session_for(url).request(method=method, url=url, **kwargs)
+
+    def _httpx_request(self, method: str, url: Any, **kwargs):
+        # httpx.get() and friends always pass their defaults; only the non-default ones need their own client
+        defaults = {"proxy": None, "verify": True, "trust_env": True, "cookies": None}
+        if any(kwargs.get(option, defaults[option]) != defaults[option] for option in _HTTPX_CLIENT_OPTIONS):
+            return self._original_httpx_request(method, url, **kwargs)
+        for option in _HTTPX_CLIENT_OPTIONS:
+            kwargs.pop(option, None)
+        client = http_pool.sync_client(urlparse(str(url)).netloc)
+        return client.request(method, url, **kwargs)
+
+    def install(self) -> None:
+        """Route the module-level helpers of requests and httpx through the pooled sessions."""
+        with self._lock:
+            if self.installed:
+                return
+            self._original_requests_request = requests.api.request
+            requests.api.request = self._requests_request
+
+            try:
+                import httpx._api
+
+                self._original_httpx_request = httpx._api.request
+                httpx._api.request = self._httpx_request
+                httpx.request = self._httpx_request
+            except ImportError:
+                pass
+
+            if not config.SSL_VERIFY:
+                import urllib3
+
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                logger.warning("TLS certificate verification is disabled (HALO_SSL_VERIFY=false)")
+            self.installed = True
+
+    def uninstall(self) -> None:
+        """Restore the original module-level helpers."""
+        with self._lock:
+            if not self.installed:
+                return
+            requests.api.request = self._original_requests_request
+            if self._original_httpx_request is not None:
+                import httpx._api
+
+                httpx._api.request = self._original_httpx_request
+                httpx.request = self._original_httpx_request
+            self.installed = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return connection reuse per host for requests sessions and the httpx pool."""
+        hosts: Dict[str, Dict[str, Optional[float]]] = {}
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for key, session in sessions:
+            connections = requests_count = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for pool_key in pools.keys():
+                    pool = pools.get(pool_key)
+                    if pool is not None:
+                        connections += pool.num_connections
+                        requests_count += pool.num_requests
+            hosts[key] = {
+                "requests": requests_count,
+                "connections": connections,
+                "hit_rate": 1 - connections / requests_count if requests_count else None,
+            }
+        return {
+            "installed": self.installed,
+            "verify": self.verify,
+            "requests": hosts,
+            "httpx": http_pool.stats()["hosts"],
+        }
+
+    def close(self) -> None:
+        """Close all pooled requests sessions."""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Single transport manager shared by the whole process
+transport_manager = TransportManager()
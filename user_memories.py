@@ -0,0 +1,262 @@
+"""
+Cached, paginated access to the user memories shown in the sidebar.
+
+A page of memories, with topics and timestamps, is read with a single query and
+kept in a process-wide cache per database, user and page. The cache is
+invalidated when memories are written or deleted: the write methods of the
+memory database are wrapped once, and every write bumps a generation counter
+of the affected user (or of the whole database when the user is not known).
+
+Selected memories, or all memories of a user, are erased in one transaction
+with ``erase_memories`` and ``clear_user_memories``.
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from agno.utils.log import logger
+
+from config import config
+
+# Memory database methods that change memories
+WRITE_METHODS = ("upsert_user_memory", "upsert_memories", "delete_user_memory", "delete_user_memories", "clear_memories")
+
+# Maximum number of cached pages across all users
+CACHE_SIZE = 256
+
+
+class MemoryRow(NamedTuple):
+    """A user memory as displayed in the memory panel."""
+
+    memory_id: Optional[str]
+    memory: str
+    topics: List[str]
+    updated: str
+
+
+class MemoryPage(NamedTuple):
+    rows: List[MemoryRow]
+    total: int
+    page: int
+    page_size: int
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+
+def _format_timestamp(value: Any) -> str:
+    if not value:
+        return "No timestamp"
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value).strftime("%Y-%m-%d %H:%M")
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).strftime("%Y-%m-%d %H:%M")
+        return value.strftime("%Y-%m-%d %H:%M")
+    except (ValueError, TypeError, AttributeError, OSError):
+        return str(value)
+
+
+def _row(record: Any) -> MemoryRow:
+    """Build a row from a memory dict (deserialize=False) or a UserMemory object."""
+    get = record.get if hasattr(record, "get") else lambda name, default=None: getattr(record, name, default)
+    memory = get("memory", "")
+    return MemoryRow(
+        memory_id=get("memory_id", None) or get("id", None),
+        memory=memory if isinstance(memory, str) else str(memory),
+        topics=list(get("topics", None) or []),
+        updated=_format_timestamp(get("updated_at", None) or get("created_at", None)),
+    )
+
+
+class MemoryCache:
+    """Pages of user memories, per database and user, invalidated by memory writes."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._pages: "OrderedDict[Tuple[int, str, int, int], Tuple[Tuple[int, int], MemoryPage]]" = OrderedDict()
+        self._generations: Dict[Tuple[int, Optional[str]], int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _generation(self, db: Any, user_id: str) -> Tuple[int, int]:
+        return self._generations.get((id(db), None), 0), self._generations.get((id(db), user_id), 0)
+
+    def invalidate(self, db: Any, user_id: Optional[str] = None) -> None:
+        """Mark the cached pages of a user (or of all users of a database) as stale."""
+        with self._lock:
+            key = (id(db), user_id)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def watch(self, db: Any) -> None:
+        """Wrap the write methods of a memory database so they invalidate the cache."""
+        if db is None or getattr(db, "_halo_memory_cache_watched", False):
+            return
+        for name in WRITE_METHODS:
+            method = getattr(db, name, None)
+            if method is not None:
+                setattr(db, name, self._invalidating(db, name, method))
+        db._halo_memory_cache_watched = True
+
+    def _invalidating(self, db: Any, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                memory = kwargs.get("memory") or (args[0] if args and name == "upsert_user_memory" else None)
+                user_id = getattr(memory, "user_id", None) if memory is not None else None
+                self.invalidate(db, user_id)
+
+        return wrapper
+
+    def get_page(self, db: Any, user_id: str, page: int = 1, page_size: Optional[int] = None, fallback=None) -> MemoryPage:
+        """Return a page of the memories of a user, newest first.
+
+        Args:
+            db: Memory database of the team
+            user_id: The user
+            page: Page number, starting at 1
+            page_size: Memories per page. Defaults to config.MEMORY_PANEL_PAGE_SIZE.
+            fallback: Callable returning all memories of the user, used if the database cannot paginate
+        """
+        page_size = page_size or config.MEMORY_PANEL_PAGE_SIZE
+        key = (id(db), user_id, page, page_size)
+        with self._lock:
+            generation = self._generation(db, user_id)
+            cached = self._pages.get(key)
+            if cached is not None and cached[0] == generation:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        result = self._query(db, user_id, page, page_size, fallback)
+        with self._lock:
+            self._pages[key] = (generation, result)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.size:
+                self._pages.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _query(db: Any, user_id: str, page: int, page_size: int, fallback) -> MemoryPage:
+        if db is not None and hasattr(db, "get_user_memories"):
+            try:
+                records, total = db.get_user_memories(
+                    user_id=user_id,
+                    limit=page_size,
+                    page=page,
+                    sort_by="updated_at",
+                    sort_order="desc",
+                    deserialize=False,
+                )
+                return MemoryPage([_row(r) for r in records], total or 0, page, page_size)
+            except Exception as e:
+                logger.debug(f"Paginated memory query failed: {e}")
+        memories = []
+        if fallback is not None:
+            try:
+                memories = fallback() or []
+            except Exception as e:
+                logger.debug(f"Loading memories failed: {e}")
+        start = (page - 1) * page_size
+        return MemoryPage([_row(m) for m in memories[start:start + page_size]], len(memories), page, page_size)
+
+
+# Single cache shared by all sessions of the process
+memory_cache = MemoryCache()
+
+
+def memory_db(halo_team: Any) -> Any:
+    """Return the database the team stores its user memories in."""
+    memory_manager = getattr(halo_team, "memory_manager", None)
+    return getattr(memory_manager, "db", None) or getattr(halo_team, "db", None)
+
+
+# SQLite limits the number of bound parameters of a statement
+DELETE_CHUNK = 500
+
+# Memory table of each database, resolved once
+_memory_tables: Dict[int, Any] = {}
+
+
+def _memory_table(db: Any) -> Any:
+    """Return the SQLAlchemy memory table of an agno SQL database, or None for other databases."""
+    table = _memory_tables.get(id(db))
+    if table is None and hasattr(db, "_get_table") and hasattr(db, "Session"):
+        try:
+            table = db._get_table(table_type="memories")
+        except Exception as e:
+            logger.debug(f"Could not resolve the memory table: {e}")
+            table = None
+        if table is not None:
+            _memory_tables[id(db)] = table
+    return table
+
+
+def erase_memories(db: Any, user_id: str, memory_ids: List[str]) -> Dict[str, str]:
+    """Delete memories of a user in a single transaction.
+
+    Args:
+        db: Memory database of the team
+        user_id: Owner of the memories; memories of other users are never deleted
+        memory_ids: Ids of the memories to delete
+
+    Returns:
+        Outcome per memory id: "deleted", "not_found" or "error: <message>". On error
+        the transaction is rolled back and every id reports the error.
+    """
+    ids = list(dict.fromkeys(memory_id for memory_id in memory_ids if memory_id))
+    if not ids:
+        return {}
+    table = _memory_table(db)
+    try:
+        if table is not None:
+            from sqlalchemy import delete, select
+
+            found = set()
+            with db.Session() as sess, sess.begin():
+                for start in range(0, len(ids), DELETE_CHUNK):
+                    chunk = ids[start:start + DELETE_CHUNK]
+                    where = (table.c.memory_id.in_(chunk), table.c.user_id == user_id)
+                    found.update(sess.execute(select(table.c.memory_id).where(*where)).scalars())
+                    sess.execute(delete(table).where(*where))
+            outcomes = {memory_id: "deleted" if memory_id in found else "not_found" for memory_id in ids}
+        else:
+            # Databases without SQL access have their own bulk delete
+            db.delete_user_memories(memory_ids=ids)
+            outcomes = {memory_id: "deleted" for memory_id in ids}
+    except Exception as e:
+        logger.error(f"Erasing {len(ids)} memories of {user_id} failed: {e}")
+        outcomes = {memory_id: f"error: {e}" for memory_id in ids}
+    finally:
+        memory_cache.invalidate(db, user_id)
+    logger.info(f"Erased {sum(o == 'deleted' for o in outcomes.values())} of {len(ids)} memories of {user_id}")
+    return outcomes
+
+
+def clear_user_memories(db: Any, user_id: str) -> int:
+    """Delete all memories of a user in a single transaction and return how many were deleted."""
+    table = _memory_table(db)
+    try:
+        if table is not None:
+            from sqlalchemy import delete
+
+            with db.Session() as sess, sess.begin():
+                deleted = sess.execute(delete(table).where(table.c.user_id == user_id)).rowcount
+        else:
+            memories = db.get_user_memories(user_id=user_id) or []
+            ids = [memory.memory_id for memory in memories if getattr(memory, "memory_id", None)]
+            if ids:
+                db.delete_user_memories(memory_ids=ids)
+            deleted = len(ids)
+    finally:
+        memory_cache.invalidate(db, user_id)
+    logger.info(f"Cleared {deleted} memories of {user_id}")
+    return deleted
@@ -1,22 +1,21 @@
+import functools
+import inspect
 import json
 import os
-import importlib
-import inspect
 from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
-from agno.knowledge.document import Document
-from agno.knowledge.reader import Reader
-from agno.knowledge.reader.csv_reader import CSVReader
-from agno.knowledge.reader.docx_reader import DocxReader
-from agno.knowledge.reader.pdf_reader import PDFReader
-from agno.knowledge.reader.text_reader import TextReader
-from agno.knowledge.reader.website_reader import WebsiteReader
 from agno.memory import MemoryManager
+from agno.run.base import RunStatus
 from agno.team import Team
 from agno.utils.log import logger
 from halo import HaloConfig, create_halo
+from agents.manifest import agent_options
 from config import config
+from ingestion import ingestion_queue
+from messages import ChatMessage, ImageRef, ToolCallSnapshot, load_tool_result
+from transcript_store import TranscriptStore
+from user_memories import clear_user_memories, erase_memories, memory_cache, memory_db
 
 async def initialize_session_state():
     logger.info(f"---*--- Initializing session state ---*---")
@@ -25,87 +24,122 @@ async def initialize_session_state():
     if "session_id" not in st.session_state:
         st.session_state["session_id"] = None
     if "messages" not in st.session_state:
-        st.session_state["messages"] = []
-
+        st.session_state["messages"] = TranscriptStore()
 
-import copy
 
 async def add_message(
     role: str,
     content: str,
-    tool_calls: Optional[List[Dict[str, Any]]] = None,
+    tool_calls: Optional[List[Any]] = None,
     intermediate_steps_displayed: bool = False,
     images: Optional[List[Any]] = None,
+    run_id: Optional[str] = None,
 ) -> None:
-    """Safely add a message to the session state"""
+    """Safely add a message to the session state
+
+    Tool calls are kept as size-capped snapshots and images as references, see messages.py.
+    """
+    text = str(content)
+    preview = text if len(text) <= 200 else f"{text[:200]}... ({len(text)} chars)"
     if role == "user":
-        logger.info(f"👤  {role}: {content}")
+        logger.info(f"👤  {role}: {preview}")
     else:
-        logger.info(f"🤖  {role}: {content}")
-        
-    # Create a deep copy of tool_calls to ensure they're preserved
-    preserved_tool_calls = None
-    if tool_calls:
+        logger.info(f"🤖  {role}: {preview}")
+
+    snapshots = []
+    for tool in _normalize_tool_calls(tool_calls) if tool_calls else []:
         try:
-            # Try to create a deep copy of the tool calls
-            preserved_tool_calls = copy.deepcopy(tool_calls)
+            snapshots.append(ToolCallSnapshot.from_tool(tool, run_id=run_id))
         except Exception as e:
-            logger.warning(f"Could not deep copy tool calls: {e}")
-            # Fallback: create a simplified representation
-            preserved_tool_calls = []
-            for tool in tool_calls:
-                try:
-                    if hasattr(tool, '__dict__'):
-                        # For object-like tools
-                        tool_copy = {}
-                        for key, value in tool.__dict__.items():
-                            if isinstance(value, (str, int, float, bool, type(None))):
-                                tool_copy[key] = value
-                            else:
-                                tool_copy[key] = str(value)
-                        preserved_tool_calls.append(tool_copy)
-                    elif hasattr(tool, 'get') or isinstance(tool, dict):
-                        # For dictionary-like tools
-                        preserved_tool_calls.append(dict(tool))
-                    else:
-                        # For other types
-                        preserved_tool_calls.append({"name": str(tool)})
-                except Exception:
-                    # Last resort fallback
-                    preserved_tool_calls.append({"name": "Unknown Tool"})
-    
-    # Add the message with preserved tool calls and images to the session state
-    message_data = {
-        "role": role,
-        "content": content,
-        "tool_calls": preserved_tool_calls,
-        "intermediate_steps_displayed": intermediate_steps_displayed,
-    }
-    
-    # Add images if provided
-    if images:
-        # Convert ImageArtifact objects to dictionaries to prevent serialization issues
-        serialized_images = []
-        for img in images:
-            if hasattr(img, 'model_dump'):
-                # This is a Pydantic model (ImageArtifact), serialize it
-                serialized_images.append(img.model_dump(exclude_none=True))
-            elif isinstance(img, dict):
-                # Already a dictionary
-                serialized_images.append(img)
-            else:
-                # Convert other objects to dict representation
-                serialized_images.append({
-                    "id": getattr(img, 'id', None),
-                    "url": getattr(img, 'url', None),
-                    "content": getattr(img, 'content', None),
-                    "mime_type": getattr(img, 'mime_type', 'image/png'),
-                    "alt_text": getattr(img, 'alt_text', ''),
-                })
-        message_data["images"] = serialized_images
-        logger.info(f"Added {len(serialized_images)} images to message")
-    
-    st.session_state["messages"].append(message_data)
+            logger.warning(f"Could not keep tool call: {e}")
+            snapshots.append(ToolCallSnapshot(tool_name=str(getattr(tool, "tool_name", None) or "Unknown Tool"), run_id=run_id))
+
+    image_refs = tuple(ImageRef.from_image(img) for img in images or [])
+    if image_refs:
+        logger.info(f"Added {len(image_refs)} images to message")
+
+    st.session_state["messages"].append(ChatMessage(
+        role,
+        text,
+        tool_calls=tuple(snapshots),
+        images=image_refs,
+        run_id=run_id,
+        intermediate_steps_displayed=intermediate_steps_displayed,
+    ))
+
+
+def _session_runs(halo: Team, session_id: str) -> List[Any]:
+    """Return the completed main team runs of a session, oldest first."""
+    session = halo.get_session(session_id=session_id)
+    if session is None or not session.runs:
+        return []
+    runs = [run for run in session.runs if getattr(run, "parent_run_id", None) is None]
+    if halo.id:
+        runs = [run for run in runs if getattr(run, "team_id", None) == halo.id]
+    return [run for run in runs if getattr(run, "status", None) not in (RunStatus.paused, RunStatus.cancelled, RunStatus.error)]
+
+
+async def sync_chat_history(halo: Team, session_id: str, refresh: bool = False) -> None:
+    """Bring st.session_state["messages"] in line with the chat history of a session.
+
+    A cursor remembers the session and the last run loaded from the database. The
+    history is only reloaded in full when the session changes. Otherwise nothing is
+    read, since new turns are appended by the page itself, unless ``refresh`` is set,
+    in which case only the runs after the cursor are appended.
+
+    Args:
+        halo: The HALO team
+        session_id: The current session id
+        refresh: Append runs stored after the cursor, e.g. by another browser tab
+    """
+    cursor = st.session_state.get("history_cursor")
+    full_reload = cursor is None or cursor.get("session_id") != session_id
+    if not full_reload and not refresh:
+        return
+
+    try:
+        runs = _session_runs(halo, session_id)
+    except Exception as e:
+        logger.warning(f"Failed to load chat history: {e}")
+        return
+
+    if not full_reload:
+        run_ids = [run.run_id for run in runs]
+        if cursor.get("run_id") in run_ids:
+            runs = runs[run_ids.index(cursor["run_id"]) + 1:]
+        elif cursor.get("run_id") is not None:
+            # The cursor run is gone (e.g. the session was rewritten), start over
+            full_reload = True
+
+    if full_reload:
+        st.session_state["messages"] = TranscriptStore()
+        # Start with only the most recent messages rendered again
+        st.session_state.pop("transcript_window", None)
+        logger.info(f"Loading chat history of session {session_id}")
+
+    for run in runs:
+        for message in run.messages or []:
+            if getattr(message, "from_history", False):
+                continue
+            try:
+                if message.role == "user":
+                    await add_message(message.role, str(message.content), run_id=run.run_id)
+                elif message.role == "assistant":
+                    # Check if tool_calls attribute exists
+                    tool_calls = getattr(message, "tool_calls", None)
+                    await add_message("assistant", str(message.content), tool_calls, run_id=run.run_id)
+            except Exception as e:
+                logger.warning(f"Error processing message: {e}")
+                continue
+
+    last_run_id = runs[-1].run_id if runs else (None if full_reload else cursor.get("run_id"))
+    st.session_state["history_cursor"] = {"session_id": session_id, "run_id": last_run_id}
+
+
+def advance_history_cursor(session_id: str, run_id: Optional[str]) -> None:
+    """Move the history cursor past a run whose messages the page has already added."""
+    if run_id is not None:
+        st.session_state["history_cursor"] = {"session_id": session_id, "run_id": run_id}
 
 
 async def selected_model() -> str:
@@ -318,122 +352,55 @@ async def selected_agents() -> List[str]:
     return selected_agents
 
 
-def get_memory_timestamp(halo_team, memory, user_id):
-    """Try to get timestamp from the database for a memory."""
-    try:
-        # Try to access the database directly to get timestamp information
-        if hasattr(halo_team, 'db') and hasattr(halo_team.db, 'connection'):
-            # Check if memory has an ID we can use to query the database
-            memory_id = getattr(memory, 'memory_id', None) or getattr(memory, 'id', None)
-            if memory_id:
-                # Try to query the database for creation timestamp
-                try:
-                    # Execute a raw SQL query to get the timestamp
-                    query = "SELECT created_at FROM agno_memories WHERE id = ? AND user_id = ?"
-                    result = halo_team.db.connection.execute(query, (memory_id, user_id)).fetchone()
-                    if result and result[0]:
-                        from datetime import datetime
-                        if isinstance(result[0], str):
-                            timestamp = datetime.fromisoformat(result[0].replace('Z', '+00:00'))
-                        else:
-                            timestamp = result[0]
-                        return timestamp.strftime("%Y-%m-%d %H:%M")
-                except Exception as e:
-                    logger.debug(f"Could not query database for timestamp: {e}")
-        
-        # Fallback: check if memory object has any timestamp attributes
-        for attr in ['created_at', 'created', 'timestamp', 'date_created', 'updated_at', 'last_updated']:
-            if hasattr(memory, attr):
-                timestamp = getattr(memory, attr)
-                if timestamp:
-                    try:
-                        return timestamp.strftime("%Y-%m-%d %H:%M")
-                    except:
-                        return str(timestamp)
-        
-        return "No timestamp"
-    except Exception as e:
-        logger.debug(f"Error getting memory timestamp: {e}")
-        return "No timestamp"
-
-
 async def show_user_memories(halo_team, user_id: str) -> None:
-    """Show user memories in a streamlit container."""
+    """Show user memories in a streamlit container.
+
+    Memories are read one page at a time with a single query and cached until the
+    memory database is written to (see user_memories.py). Where Streamlit supports
+    it, nothing is read until the panel is expanded.
+    """
 
     with st.container():
-        # Get user memories from the Team's memory system
-        user_memories = []
-        try:
-            # Try multiple methods to get user memories
-            if hasattr(halo_team, 'get_user_memories'):
-                try:
-                    memories = halo_team.get_user_memories(user_id=user_id)
-                    if memories is not None:
-                        user_memories = memories
-                except Exception as e:
-                    logger.debug(f"get_user_memories failed: {e}")
-            
-            # If no memories from Team method, try database directly
-            if not user_memories and hasattr(halo_team, 'db'):
-                try:
-                    # Try to access memories directly from the database
-                    if hasattr(halo_team.db, 'get_user_memories'):
-                        memories = halo_team.db.get_user_memories(user_id=user_id)
-                        if memories:
-                            user_memories = memories
-                    elif hasattr(halo_team.db, 'connection'):
-                        # Direct SQL query as fallback
-                        query = "SELECT * FROM agno_memories WHERE user_id = ? ORDER BY created_at DESC"
-                        cursor = halo_team.db.connection.execute(query, (user_id,))
-                        rows = cursor.fetchall()
-                        if rows:
-                            # Convert rows to memory-like objects (simplified)
-                            user_memories = []
-                            for row in rows:
-                                # Create a simple object with the memory data
-                                memory_obj = type('Memory', (), {
-                                    'memory_id': row[0] if len(row) > 0 else None,
-                                    'memory': row[1] if len(row) > 1 else str(row),
-                                    'topics': [],
-                                    'user_id': user_id
-                                })()
-                                user_memories.append(memory_obj)
-                except Exception as e:
-                    logger.debug(f"Database direct access failed: {e}")
-            
-            # Ensure we always have a list
-            if user_memories is None:
-                user_memories = []
-                
-        except Exception as e:
-            logger.error(f"Error getting user memories: {e}")
-            user_memories = []
-            
-        with st.expander(f"💭 Memories for {user_id}", expanded=False):
-            # Debug: Log memory object attributes if memories exist
-            if user_memories and len(user_memories) > 0:
-                first_memory = user_memories[0]
-                #logger.debug(f"UserMemory object attributes: {dir(first_memory)}")
-                #logger.debug(f"UserMemory object type: {type(first_memory)}")
-                #logger.debug(f"UserMemory object vars: {vars(first_memory) if hasattr(first_memory, '__dict__') else 'No __dict__'}")
-            
-            # Initialize session state for memory selection
+        db = memory_db(halo_team)
+        memory_cache.watch(db)
+
+        if _lazy_expanders():
+            expander = st.expander(f"💭 Memories for {user_id}", expanded=False, key="memory_panel", on_change="rerun")
+            if not expander.open:
+                return
+        else:
+            expander = st.expander(f"💭 Memories for {user_id}", expanded=False)
+
+        with expander:
+            page_number = st.session_state.get("memory_page", 1)
+            try:
+                memory_page = memory_cache.get_page(
+                    db,
+                    user_id,
+                    page=page_number,
+                    fallback=lambda: halo_team.get_user_memories(user_id=user_id) if hasattr(halo_team, "get_user_memories") else [],
+                )
+                if page_number > memory_page.pages:
+                    # The last page was emptied (e.g. after erasing), show the new last page
+                    page_number = st.session_state["memory_page"] = memory_page.pages
+                    memory_page = memory_cache.get_page(db, user_id, page=page_number)
+            except Exception as e:
+                logger.error(f"Error getting user memories: {e}")
+                memory_page = None
+            user_memories = memory_page.rows if memory_page else []
+
+            # Selections are kept per memory id, so they survive paging
             if "selected_memories" not in st.session_state:
                 st.session_state.selected_memories = {}
-            
+
             # Always show the memory table (empty if no memories)
             if user_memories and len(user_memories) > 0:
                 # Create a dataframe from the memories with checkbox column
                 memory_data = {
-                    "Select": [st.session_state.selected_memories.get(i, False) for i in range(len(user_memories))],
-                    "Memory": [getattr(memory, 'memory', str(memory)) for memory in user_memories],
-                    "Topics": [
-                        ", ".join(getattr(memory, 'topics', [])) if hasattr(memory, 'topics') and memory.topics else ""
-                        for memory in user_memories
-                    ],
-                    "Created": [
-                        get_memory_timestamp(halo_team, memory, user_id) for memory in user_memories
-                    ],
+                    "Select": [st.session_state.selected_memories.get(memory.memory_id, False) for memory in user_memories],
+                    "Memory": [memory.memory for memory in user_memories],
+                    "Topics": [", ".join(memory.topics) for memory in user_memories],
+                    "Updated": [memory.updated for memory in user_memories],
                 }
 
                 # Display as an editable table with checkbox column
@@ -444,17 +411,17 @@ async def show_user_memories(halo_team, user_id: str) -> None:
                         "Select": st.column_config.CheckboxColumn("Select", width="small"),
                         "Memory": st.column_config.TextColumn("Memory", width="medium", disabled=True),
                         "Topics": st.column_config.TextColumn("Topics", width="small", disabled=True),
-                        "Created": st.column_config.TextColumn(
-                            "Created", width="small", disabled=True
+                        "Updated": st.column_config.TextColumn(
+                            "Updated", width="small", disabled=True
                         ),
                     },
                     hide_index=True,
-                    key="memory_editor"
+                    key=f"memory_editor_{page_number}"
                 )
                 
                 # Update session state with checkbox selections
-                for i, selected in enumerate(edited_data["Select"]):
-                    st.session_state.selected_memories[i] = selected
+                for memory, selected in zip(user_memories, edited_data["Select"]):
+                    st.session_state.selected_memories[memory.memory_id] = selected
                 
                 # Count selected memories
                 selected_count = sum(edited_data["Select"])
@@ -462,6 +429,19 @@ async def show_user_memories(halo_team, user_id: str) -> None:
                 # Show selection info
                 if selected_count > 0:
                     st.info(f"{selected_count} memory/memories selected")
+
+                if memory_page.pages > 1:
+                    prev_col, info_col, next_col = st.columns([0.25, 0.5, 0.25])
+                    with prev_col:
+                        if st.button("‹ Newer", key="memory_page_prev", disabled=page_number <= 1):
+                            st.session_state["memory_page"] = page_number - 1
+                            st.rerun()
+                    with info_col:
+                        st.caption(f"Page {page_number} of {memory_page.pages} ({memory_page.total} memories)")
+                    with next_col:
+                        if st.button("Older ›", key="memory_page_next", disabled=page_number >= memory_page.pages):
+                            st.session_state["memory_page"] = page_number + 1
+                            st.rerun()
             else:
                 # Show empty state but still allow refresh
                 st.info("No memories found, tell me about yourself!")
@@ -476,14 +456,13 @@ async def show_user_memories(halo_team, user_id: str) -> None:
                 col3 = None
             
             with col1:
-                if st.button("Clear all memories", key="clear_all_memories"):
-                    await add_message("user", "Clear all my memories")
-                    if "memory_refresh_count" not in st.session_state:
-                        st.session_state.memory_refresh_count = 0
-                    st.session_state.memory_refresh_count += 1
+                if st.button("Clear all memories", key="clear_all_memories", disabled=not user_memories):
+                    st.session_state["confirm_clear_memories"] = True
             
             with col2:
                 if st.button("Refresh memories", key="refresh_memories"):
+                    # Memories may have been changed outside this process
+                    memory_cache.invalidate(db, user_id)
                     if "memory_refresh_count" not in st.session_state:
                         st.session_state.memory_refresh_count = 0
                     st.session_state.memory_refresh_count += 1
@@ -493,135 +472,45 @@ async def show_user_memories(halo_team, user_id: str) -> None:
             # Delete selected memories button
             if col3 is not None:
                 with col3:
-                    # Create two sub-columns for the delete buttons
-                    subcol1, subcol2 = st.columns([0.5, 0.5])
-                    with subcol2:
-                        st.markdown(" ")
-                    
-                    #with subcol1:
-                    #    if st.button(f"Forget ({selected_count})", key="delete_selected_memories", type="secondary", help="Send delete request to HALO"):
-                    #        # Get selected memory indices
-                    #        selected_indices = [i for i, selected in enumerate(edited_data["Select"]) if selected]
-                    #        
-                    #        if selected_indices:
-                    #            # Create delete message with selected memories
-                    #            selected_memories_text = []
-                    #            for idx in selected_indices:
-                    #                if idx < len(user_memories):
-                    #                    memory_preview = user_memories[idx].memory[:100] + "..." if len(user_memories[idx].memory) > 100 else user_memories[idx].memory
-                    #                    selected_memories_text.append(f"- {memory_preview}")
-                    #            
-                    #            delete_message = f"Update the following memories, that the user dislikes them:\n" + "\n".join(selected_memories_text)
-                    #            await add_message("user", delete_message)
-                    #            
-                    #            # Clear selection state
-                    #            st.session_state.selected_memories = {}
-                    #            
-                    #            # Trigger refresh
-                    #            if "memory_refresh_count" not in st.session_state:
-                    #                st.session_state.memory_refresh_count = 0
-                    #            st.session_state.memory_refresh_count += 1
-                    
-                    with subcol2:
-                        if st.button(f"Erase ({selected_count})", key="erase_selected_memories", type="primary", help="Directly erase from memory"):
-                            # Get selected memory indices
-                            selected_indices = [i for i, selected in enumerate(edited_data["Select"]) if selected]
-                            
-                            if selected_indices:
-                                # Directly delete memories from halo_memory using their IDs
-                                deleted_count = 0
-                                failed_deletions = []
-                                
-                                for idx in selected_indices:
-                                    if idx < len(user_memories):
-                                        try:
-                                            memory_to_delete = user_memories[idx]
-                                            
-                                            # Debug: Show memory object structure
-                                            logger.info(f"Attempting to delete memory {idx}: {vars(memory_to_delete) if hasattr(memory_to_delete, '__dict__') else str(memory_to_delete)}")
-                                            
-                                            # Use the memory_id to delete from the Team's database
-                                            memory_id = getattr(memory_to_delete, 'memory_id', None) or getattr(memory_to_delete, 'id', None)
-                                            logger.info(f"Memory ID found: {memory_id}")
-                                            
-                                            if memory_id:
-                                                # Try to delete using the Team's database
-                                                if hasattr(halo_team, 'db') and hasattr(halo_team.db, 'delete_user_memory'):
-                                                    logger.info(f"Using db.delete_user_memory method")
-                                                    try:
-                                                        # Try with just memory_id (current Agno framework signature)
-                                                        halo_team.db.delete_user_memory(memory_id=memory_id)
-                                                        deleted_count += 1
-                                                        logger.info(f"Successfully deleted memory {memory_id} using db method")
-                                                    except TypeError as te:
-                                                        logger.debug(f"delete_user_memory signature error: {te}")
-                                                        # Try alternative method signatures
-                                                        try:
-                                                            halo_team.db.delete_user_memory(memory_id)
-                                                            deleted_count += 1
-                                                            logger.info(f"Successfully deleted memory {memory_id} using alternative signature")
-                                                        except Exception as alt_e:
-                                                            logger.error(f"Alternative method failed: {alt_e}")
-                                                            raise te  # Fall back to SQL deletion
-                                                else:
-                                                    # Fallback: try direct database deletion with multiple table names
-                                                    if hasattr(halo_team, 'db') and hasattr(halo_team.db, 'connection'):
-                                                        try:
-                                                            # Try different possible table names
-                                                            table_names = ['agno_memories', 'memories', 'user_memories', 'agno_user_memories']
-                                                            deleted = False
-                                                            
-                                                            for table_name in table_names:
-                                                                try:
-                                                                    query = f"DELETE FROM {table_name} WHERE id = ? AND user_id = ?"
-                                                                    cursor = halo_team.db.connection.execute(query, (memory_id, user_id))
-                                                                    rows_affected = cursor.rowcount
-                                                                    halo_team.db.connection.commit()
-                                                                    
-                                                                    if rows_affected > 0:
-                                                                        deleted_count += 1
-                                                                        deleted = True
-                                                                        logger.info(f"Successfully deleted memory {memory_id} from table {table_name}")
-                                                                        break
-                                                                except Exception as table_e:
-                                                                    logger.debug(f"Failed to delete from table {table_name}: {table_e}")
-                                                                    continue
-                                                            
-                                                            if not deleted:
-                                                                logger.error(f"Could not delete memory {memory_id} from any table")
-                                                                failed_deletions.append(f"Memory {idx + 1} (not found in DB)")
-                                                                
-                                                        except Exception as db_e:
-                                                            logger.error(f"Database deletion failed: {db_e}")
-                                                            failed_deletions.append(f"Memory {idx + 1} (DB error)")
-                                                    else:
-                                                        logger.warning("No database deletion method available")
-                                                        failed_deletions.append(f"Memory {idx + 1} (no delete method)")
-                                            else:
-                                                logger.warning(f"Memory at index {idx} has no memory_id")
-                                                failed_deletions.append(f"Memory {idx + 1} (no ID)")
-                                        except Exception as e:
-                                            memory_id = getattr(memory_to_delete, 'memory_id', 'unknown')
-                                            logger.error(f"Failed to delete memory {memory_id}: {e}")
-                                            failed_deletions.append(f"Memory {idx + 1}")
-                                
-                                # Show results
-                                if deleted_count > 0:
-                                    st.success(f"Successfully erased {deleted_count} memory/memories")
-                                
-                                if failed_deletions:
-                                    st.error(f"Failed to erase: {', '.join(failed_deletions)}")
-                                
-                                # Clear selection state
-                                st.session_state.selected_memories = {}
-                                
-                                # Trigger refresh to reload the memory list
-                                if "memory_refresh_count" not in st.session_state:
-                                    st.session_state.memory_refresh_count = 0
-                                st.session_state.memory_refresh_count += 1
-                                
-                                # Force page refresh to show updated memory list
-                                st.rerun()
+                    if st.button(f"Erase ({selected_count})", key="erase_selected_memories", type="primary", help="Directly erase from memory"):
+                        selected_ids = [memory.memory_id for memory, selected in zip(user_memories, edited_data["Select"]) if selected]
+                        outcomes = erase_memories(db, user_id, selected_ids)
+                        erased = [memory_id for memory_id, outcome in outcomes.items() if outcome == "deleted"]
+                        failed = {memory_id: outcome for memory_id, outcome in outcomes.items() if outcome != "deleted"}
+                        st.session_state["memory_erase_result"] = (len(erased), failed)
+                        # Clear selection state
+                        st.session_state.selected_memories = {}
+                        # Force page refresh to show updated memory list
+                        st.rerun()
+
+            # Clearing all memories needs a confirmation, it runs without an agent turn
+            if st.session_state.get("confirm_clear_memories"):
+                st.warning(f"Erase all {memory_page.total if memory_page else 0} memories of {user_id}? This cannot be undone.")
+                confirm_col, cancel_col = st.columns([0.5, 0.5])
+                with confirm_col:
+                    if st.button("Erase all", key="confirm_clear_all_memories", type="primary"):
+                        st.session_state.pop("confirm_clear_memories", None)
+                        try:
+                            st.session_state["memory_erase_result"] = (clear_user_memories(db, user_id), {})
+                        except Exception as e:
+                            logger.error(f"Clearing memories failed: {e}")
+                            st.session_state["memory_erase_result"] = (0, {"all": f"error: {e}"})
+                        st.session_state.selected_memories = {}
+                        st.session_state["memory_page"] = 1
+                        st.rerun()
+                with cancel_col:
+                    if st.button("Cancel", key="cancel_clear_all_memories"):
+                        st.session_state.pop("confirm_clear_memories", None)
+                        st.rerun()
+
+            # Show the outcome of the last erase once
+            erase_result = st.session_state.pop("memory_erase_result", None)
+            if erase_result:
+                erased_count, failed = erase_result
+                if erased_count > 0:
+                    st.success(f"Successfully erased {erased_count} memory/memories")
+                if failed:
+                    st.error("Failed to erase: " + ", ".join(f"{memory_id} ({outcome})" for memory_id, outcome in failed.items()))
 
 
 async def example_inputs() -> None:
@@ -694,6 +583,303 @@ def is_json(myjson):
     return True
 
 
+def _normalize_tool_calls(tools) -> List[Any]:
+    """Normalize the different tool call formats to a list of tool calls."""
+    # Handle single tool_call dict case and other possible formats
+    if isinstance(tools, dict):
+        return [tools]
+    if isinstance(tools, (str, int, float, bool)):
+        # Handle primitive types by wrapping them in a simple structure
+        return [{"name": "Tool Call", "content": str(tools)}]
+    if not isinstance(tools, list):
+        # Try to convert to list if it's an iterable
+        try:
+            return list(tools)
+        except (TypeError, ValueError):
+            logger.warning(f"Unexpected tools format: {type(tools)}. Skipping display.")
+            return []
+    return tools
+
+
+def _tool_call_title(tool_name: str, tool_args: Any) -> str:
+    """Build the expander title of a tool call from its name and arguments."""
+    # Convert tool_name to string if it's not already to prevent attribute errors
+    tool_name_str = str(tool_name).lower() if tool_name is not None else ""
+
+    # More robust pattern matching for different tool types
+    is_task_transfer = any(transfer_term in tool_name_str for transfer_term in [
+        "transfer_task", "delegate", "assign_to", "handoff", "task_to_member"
+    ])
+
+    is_memory_task = any(memory_term in tool_name_str for memory_term in [
+        "user_memory", "memory", "remember", "recall", "store_memory"
+    ])
+
+    if is_task_transfer:
+        # Handle both dictionary and object access for tool_args with better error handling
+        member_id = "Unknown Member"
+        try:
+            if hasattr(tool_args, 'get'):
+                member_id = tool_args.get("member_id", "")
+                if not member_id:
+                    # Try alternative keys
+                    member_id = (tool_args.get("agent_id") or
+                                 tool_args.get("agent") or
+                                 tool_args.get("member") or
+                                 "Unknown Member")
+            else:
+                member_id = getattr(tool_args, "member_id", "")
+                if not member_id:
+                    # Try alternative attributes
+                    member_id = (getattr(tool_args, "agent_id", None) or
+                                 getattr(tool_args, "agent", None) or
+                                 getattr(tool_args, "member", None) or
+                                 "Unknown Member")
+        except Exception as e:
+            logger.debug(f"Error getting member_id: {e}")
+            member_id = "Unknown Member"
+
+        # Ensure member_id is a string and properly formatted
+        member_id = str(member_id).replace("_", " ").title()
+        return f":material/smart_toy: {member_id}"
+    if is_memory_task:
+        return f":material/network_intelligence_update: Updating Memory"
+    # Format the tool name for better readability
+    formatted_tool_name = tool_name_str.replace("_", " ").title()
+    return f":material/construction: {formatted_tool_name}"
+
+
+def summarize_tool_call(tool_call: Any) -> Optional[Dict[str, Any]]:
+    """Extract everything needed to display a tool call, so it can be cached and rendered cheaply.
+
+    Args:
+        tool_call: Tool call as a dictionary or ToolExecution object
+
+    Returns:
+        Dict with the expander title, code block, arguments and formatted results,
+        or None if there is nothing to display
+    """
+    if tool_call is None:
+        return None
+
+    # Initialize default values
+    tool_name = "Unknown Tool"
+    tool_args = {}
+    content = None
+    metrics = None
+
+    try:
+        # Normalize access to tool details based on object type
+        if hasattr(tool_call, 'get'):
+            # Old style: dictionary-like object with get method
+            tool_name = tool_call.get("tool_name") or tool_call.get("name", "Unknown Tool")
+            tool_args = tool_call.get("tool_args") or tool_call.get("args", {})
+            content = tool_call.get("content", tool_call.get("result", None))
+            metrics = tool_call.get("metrics", None)
+        else:
+            # New style: ToolExecution object (Agno 2 keeps the output in result)
+            tool_name = getattr(tool_call, "tool_name", None) or getattr(tool_call, "name", "Unknown Tool")
+            tool_args = getattr(tool_call, "tool_args", None) or getattr(tool_call, "args", {})
+            content = getattr(tool_call, "content", None)
+            if content is None:
+                content = getattr(tool_call, "result", None)
+            metrics = getattr(tool_call, "metrics", None)
+
+        # Ensure tool_name is a string
+        if tool_name is None:
+            tool_name = "Unknown Tool"
+        tool_name = str(tool_name)
+    except Exception as e:
+        logger.error(f"Error extracting tool details: {str(e)}")
+        # Continue with default values set above
+
+    # Add timing information safely
+    execution_time = None
+    try:
+        if metrics is not None:
+            # Handle both object and dictionary metrics
+            if hasattr(metrics, "time"):
+                execution_time = metrics.time
+            elif isinstance(metrics, dict) and "time" in metrics:
+                execution_time = metrics["time"]
+    except Exception as e:
+        logger.error(f"Error getting tool metrics time: {str(e)}")
+
+    try:
+        title = _tool_call_title(tool_name, tool_args)
+    except Exception as e:
+        logger.debug(f"Error determining tool type: {e}")
+        # Fallback to a generic title with the raw tool name
+        title = f":material/construction: Tool Call"
+    if execution_time is not None:
+        title += f" ({execution_time:.4f}s)"
+
+    # Show query/code/command with syntax highlighting; only one code block if multiple are present
+    code = None
+    for key, lang in [("query", "sql"), ("code", "python"), ("command", "bash")]:
+        if isinstance(tool_args, dict):
+            value = tool_args.get(key)
+        elif hasattr(tool_args, "__dict__"):
+            value = getattr(tool_args, key, None)
+        else:
+            value = None
+        if value:
+            code = (str(value), lang)
+            break
+
+    # Extract arguments based on tool_args type
+    args = {}
+    if isinstance(tool_args, dict):
+        args = {k: v for k, v in tool_args.items() if k not in ["query", "code", "command"] and v is not None}
+    elif hasattr(tool_args, "__dict__"):
+        args = {k: v for k, v in tool_args.__dict__.items() if k not in ["query", "code", "command"] and v is not None}
+    elif tool_args is not None:
+        # For other types, try to create a simple representation
+        args = {"value": str(tool_args)}
+    try:
+        # Test if serializable
+        json.dumps(args)
+        args_json = True
+    except (TypeError, ValueError, OverflowError):
+        args = str(args)
+        args_json = False
+
+    # Decide once how the results are displayed
+    content, result_kind = _prepare_result(content)
+
+    # Snapshots whose result was cut (or is stored with the run) can fetch it from the session database
+    ref = None
+    if getattr(tool_call, "complete", True) is False and getattr(tool_call, "run_id", None) and getattr(tool_call, "tool_call_id", None):
+        ref = (tool_call.run_id, tool_call.tool_call_id)
+
+    return {
+        "name": tool_name,
+        "title": title,
+        "ref": ref,
+        "time": execution_time,
+        "code": code,
+        "args": args,
+        "args_json": args_json,
+        "content": content,
+        "result_kind": result_kind,
+    }
+
+
+def _result_kind(content: Any) -> Optional[str]:
+    """Decide how a tool result is displayed."""
+    if content is None:
+        return None
+    if isinstance(content, (dict, list)):
+        return "json"
+    if isinstance(content, str):
+        if content.strip().startswith("<html") or content.strip().startswith("<!DOCTYPE"):
+            return "html"
+        # Very long content goes into a scrollable code block
+        return "code" if len(content) > 1000 else "text"
+    return "text"
+
+
+def _prepare_result(content: Any) -> Tuple[Any, Optional[str]]:
+    """Return a tool result as displayed (JSON strings parsed, other objects as text) and its kind."""
+    if isinstance(content, str) and is_json(content):
+        try:
+            return json.loads(content), "json"
+        except Exception:
+            return content, "json_code"
+    if content is not None and not isinstance(content, (str, dict, list)):
+        content = str(content)
+    return content, _result_kind(content)
+
+
+@functools.lru_cache(maxsize=None)
+def _lazy_expanders() -> bool:
+    """Whether st.expander can report that it was opened (Streamlit versions with on_change)."""
+    return "on_change" in inspect.signature(st.expander).parameters
+
+
+def _full_result(summary: Dict[str, Any], expander) -> None:
+    """Replace the cut result of a summary by the full result once the user asks for it."""
+    if _lazy_expanders():
+        requested = bool(getattr(expander, "open", False))
+    else:
+        requested = st.button("Load full result", key=f"tool_result_{summary['ref'][0]}_{summary['ref'][1]}")
+    if not requested:
+        return
+    result = load_tool_result(*summary["ref"])
+    if result is None:
+        return
+    summary["content"], summary["result_kind"] = _prepare_result(result)
+
+
+def render_tool_call(summary: Dict[str, Any]) -> None:
+    """Draw a tool call summary built by summarize_tool_call as an expander."""
+    try:
+        if summary.get("ref") and _lazy_expanders():
+            # The expander reruns the script when opened, the full result is only fetched then
+            expander = st.expander(summary["title"], expanded=False, key=f"tool_{summary['ref'][0]}_{summary['ref'][1]}", on_change="rerun")
+        else:
+            expander = st.expander(summary["title"], expanded=False)
+        with expander:
+            if summary.get("ref"):
+                # Work on a copy, the cached summary keeps the cut result
+                summary = dict(summary)
+                _full_result(summary, expander)
+            if summary["code"]:
+                st.code(summary["code"][0], language=summary["code"][1])
+
+            # Display arguments if they exist
+            if summary["args"]:
+                st.markdown("**Arguments:**")
+                if summary["args_json"]:
+                    st.json(summary["args"])
+                else:
+                    st.write(summary["args"])
+
+            # Display content/results
+            kind = summary["result_kind"]
+            if kind is not None:
+                st.markdown("**Results:**")
+                content = summary["content"]
+                try:
+                    if kind == "json":
+                        st.json(content)
+                    elif kind == "json_code":
+                        st.code(content, language="json")
+                    elif kind == "html":
+                        st.code(content, language="html")
+                    elif kind == "code":
+                        st.code(content)
+                    else:
+                        st.write(content)
+                except Exception as e:
+                    logger.debug(f"Could not display tool content: {e}")
+                    st.error("Could not display tool results.")
+    except (Exception, RuntimeError) as e:
+        # Handle both general exceptions and Streamlit runtime errors
+        if isinstance(e, RuntimeError) and "This Streamlit app is no longer running" in str(e):
+            logger.debug("Streamlit app no longer running, skipping display")
+        else:
+            logger.error(f"Error displaying tool call: {str(e)}")
+            # Fallback minimal display if expander fails
+            st.error(f"Tool call: {summary['name']} (display error)")
+
+    # Add a small separator between tool calls for better readability
+    st.markdown("")
+
+
+def display_tool_summaries(tool_calls_container, summaries: List[Dict[str, Any]]) -> None:
+    """Display tool call summaries (see summarize_tool_call) in a streamlit container."""
+    if tool_calls_container is None or not summaries:
+        return
+    try:
+        with tool_calls_container.container():
+            for summary in summaries:
+                render_tool_call(summary)
+    except Exception as e:
+        logger.error(f"Error displaying tool calls: {str(e)}")
+        tool_calls_container.error("Failed to display tool results")
+
+
 def display_tool_calls(tool_calls_container, tools):
     """Display tool calls in a streamlit container with expandable sections.
 
@@ -705,275 +891,53 @@ def display_tool_calls(tool_calls_container, tools):
     if tools is None:
         logger.debug("No tools provided to display_tool_calls")
         return
-        
+
     # Ensure we have a valid container
     if tool_calls_container is None:
         logger.warning("No container provided to display_tool_calls")
         return
-        
-    try:
-        with tool_calls_container.container():
-            # Handle single tool_call dict case and other possible formats
-            if isinstance(tools, dict):
-                tools = [tools]
-            elif isinstance(tools, (str, int, float, bool)):
-                # Handle primitive types by wrapping them in a simple structure
-                tools = [{"name": "Tool Call", "content": str(tools)}]
-            elif not isinstance(tools, list):
-                # Try to convert to list if it's an iterable
-                try:
-                    tools = list(tools)
-                except (TypeError, ValueError):
-                    logger.warning(
-                        f"Unexpected tools format: {type(tools)}. Skipping display."
-                    )
-                    return
-                    
-            # Skip if empty list
-            if not tools:
-                logger.debug("Empty tools list provided to display_tool_calls")
-                return
 
-            for tool_call in tools:
-                # Initialize default values
-                tool_name = "Unknown Tool"
-                tool_args = {}
-                content = None
-                metrics = None
-                
-                try:
-                    # Normalize access to tool details based on object type
-                    if tool_call is None:
-                        continue
-                        
-                    if hasattr(tool_call, 'get'):
-                        # Old style: dictionary-like object with get method
-                        tool_name = tool_call.get("tool_name") or tool_call.get(
-                            "name", "Unknown Tool"
-                        )
-                        tool_args = tool_call.get("tool_args") or tool_call.get("args", {})
-                        content = tool_call.get("content", None)
-                        metrics = tool_call.get("metrics", None)
-                    else:
-                        # New style: ToolExecution object in Agno 1.5.5
-                        tool_name = getattr(tool_call, "tool_name", None) or getattr(
-                            tool_call, "name", "Unknown Tool"
-                        )
-                        tool_args = getattr(tool_call, "tool_args", None) or getattr(
-                            tool_call, "args", {}
-                        )
-                        content = getattr(tool_call, "content", None)
-                        metrics = getattr(tool_call, "metrics", None)
-                        
-                    # Ensure tool_name is a string
-                    if tool_name is None:
-                        tool_name = "Unknown Tool"
-                    tool_name = str(tool_name)
-                except Exception as e:
-                    logger.error(f"Error extracting tool details: {str(e)}")
-                    # Continue with default values set above
+    summaries = [summary for summary in map(summarize_tool_call, _normalize_tool_calls(tools)) if summary]
+    if not summaries:
+        logger.debug("Empty tools list provided to display_tool_calls")
+        return
+    display_tool_summaries(tool_calls_container, summaries)
 
-                # Add timing information safely
-                execution_time_str = "N/A"
-                try:
-                    if metrics is not None:
-                        # Handle both object and dictionary metrics
-                        if hasattr(metrics, "time"):
-                            execution_time = metrics.time
-                            if execution_time is not None:
-                                execution_time_str = f"{execution_time:.4f}s"
-                        elif isinstance(metrics, dict) and "time" in metrics:
-                            execution_time = metrics["time"]
-                            if execution_time is not None:
-                                execution_time_str = f"{execution_time:.4f}s"
-                except Exception as e:
-                    logger.error(f"Error getting tool metrics time: {str(e)}")
-                    # Keep default "N/A"
 
-                # Check if this is a transfer task or memory task with more robust detection
-                try:
-                    # Convert tool_name to string if it's not already to prevent attribute errors
-                    tool_name_str = str(tool_name).lower() if tool_name is not None else ""
-                    
-                    # More robust pattern matching for different tool types
-                    is_task_transfer = any(transfer_term in tool_name_str for transfer_term in [
-                        "transfer_task", "delegate", "assign_to", "handoff", "task_to_member"
-                    ])
-                    
-                    is_memory_task = any(memory_term in tool_name_str for memory_term in [
-                        "user_memory", "memory", "remember", "recall", "store_memory"
-                    ])
-                    
-                    # Default expander title
-                    expander_title = ":material/construction:"
-                    
-                    if is_task_transfer:
-                        # Handle both dictionary and object access for tool_args with better error handling
-                        member_id = "Unknown Member"
-                        try:
-                            if hasattr(tool_args, 'get'):
-                                member_id = tool_args.get("member_id", "")
-                                if not member_id:
-                                    # Try alternative keys
-                                    member_id = (tool_args.get("agent_id") or 
-                                                tool_args.get("agent") or 
-                                                tool_args.get("member") or 
-                                                "Unknown Member")
-                            else:
-                                member_id = getattr(tool_args, "member_id", "")
-                                if not member_id:
-                                    # Try alternative attributes
-                                    member_id = (getattr(tool_args, "agent_id", None) or 
-                                                getattr(tool_args, "agent", None) or 
-                                                getattr(tool_args, "member", None) or 
-                                                "Unknown Member")
-                        except Exception as e:
-                            logger.debug(f"Error getting member_id: {e}")
-                            member_id = "Unknown Member"
-                            
-                        # Ensure member_id is a string and properly formatted
-                        member_id = str(member_id).replace("_", " ").title()
-                        expander_title = f":material/smart_toy: {member_id}"
-                    elif is_memory_task:
-                        expander_title = f":material/network_intelligence_update: Updating Memory"
-                    else:
-                        # Format the tool name for better readability
-                        formatted_tool_name = tool_name_str.replace("_", " ").title()
-                        expander_title = f":material/construction: {formatted_tool_name}"
-                except Exception as e:
-                    logger.debug(f"Error determining tool type: {e}")
-                    # Fallback to a generic title with the raw tool name
-                    expander_title = f":material/construction: Tool Call"
+def _ingestion_status(job_ids: List[str]) -> None:
+    """Show the progress of the ingestion jobs of this session."""
+    for job_id in job_ids[-5:]:
+        job = ingestion_queue.get(job_id)
+        if job is None:
+            continue
+        name = job.name if len(job.name) <= 40 else f"…{job.name[-39:]}"
+        if job.status == "done":
+            st.success(f"{name}: {job.total} chunks added in {job.seconds}s", icon="🧠")
+        elif job.status == "failed":
+            st.error(f"{name}: {job.error}")
+        else:
+            detail = f" {job.done}/{job.total}" if job.status == "embedding" and job.total else ""
+            retry = f" (attempt {job.attempts})" if job.attempts > 1 else ""
+            st.progress(job.progress, text=f"{name}: {job.status}{detail}{retry}")
 
-                if execution_time_str != "N/A":
-                    expander_title += f" ({execution_time_str})"
 
-                try:
-                    with st.expander(
-                        expander_title,
-                        expanded=False,
-                    ):
-                        try:
-                            # Show query/code/command with syntax highlighting with better error handling
-                            if tool_args is not None:
-                                # Handle dictionary-like tool_args
-                                if isinstance(tool_args, dict):
-                                    # Check for special keys with robust error handling
-                                    for key, lang in [("query", "sql"), ("code", "python"), ("command", "bash")]:
-                                        if key in tool_args and tool_args[key] is not None:
-                                            try:
-                                                st.code(str(tool_args[key]), language=lang)
-                                                break  # Only show one code block if multiple are present
-                                            except Exception as e:
-                                                logger.debug(f"Error displaying {key}: {e}")
-                                                st.error(f"Could not display {key} content.")
-                                
-                                # Handle object-like tool_args
-                                elif hasattr(tool_args, "__dict__"):
-                                    for key, lang in [("query", "sql"), ("code", "python"), ("command", "bash")]:
-                                        if hasattr(tool_args, key) and getattr(tool_args, key) is not None:
-                                            try:
-                                                value = getattr(tool_args, key)
-                                                if value:  # Check if not empty
-                                                    st.code(str(value), language=lang)
-                                                    break  # Only show one code block if multiple are present
-                                            except Exception as e:
-                                                logger.debug(f"Error displaying {key}: {e}")
-                                                st.error(f"Could not display {key} content.")
-                        except Exception as e:
-                            logger.debug(f"Error displaying code/query/command: {e}")
-                        
-                        # Display arguments with improved error handling
-                        try:
-                            args_to_show = {}
-                            
-                            # Extract arguments based on tool_args type
-                            if isinstance(tool_args, dict):
-                                args_to_show = {
-                                    k: v
-                                    for k, v in tool_args.items()
-                                    if k not in ["query", "code", "command"] and v is not None
-                                }
-                            elif hasattr(tool_args, "__dict__"):
-                                args_to_show = {
-                                    k: v
-                                    for k, v in tool_args.__dict__.items()
-                                    if k not in ["query", "code", "command"] and v is not None
-                                }
-                            elif tool_args is not None:
-                                # For other types, try to create a simple representation
-                                args_to_show = {"value": str(tool_args)}
-                                
-                            # Display arguments if they exist
-                            if args_to_show:
-                                st.markdown("**Arguments:**")
-                                try:
-                                    # Try to convert to JSON-serializable format
-                                    import json
-                                    # Test if serializable
-                                    json.dumps(args_to_show)
-                                    st.json(args_to_show)
-                                except (TypeError, ValueError, OverflowError):
-                                    # Fallback for non-serializable args
-                                    st.write(str(args_to_show))
-                        except Exception as e:
-                            logger.debug(f"Error displaying tool arguments: {e}")
-                            st.error("Could not display tool arguments.")
-
-                        # Display content/results with improved error handling
-                        if content is not None:
-                            try:
-                                st.markdown("**Results:**")
-                                
-                                # Handle different content types
-                                if isinstance(content, str):
-                                    if is_json(content):
-                                        try:
-                                            parsed_json = json.loads(content)
-                                            st.json(parsed_json)
-                                        except Exception:
-                                            st.code(content, language="json")
-                                    elif content.strip().startswith("<html") or content.strip().startswith("<!DOCTYPE"):
-                                        st.code(content, language="html")
-                                    elif len(content) > 1000:
-                                        # For very long content, use a scrollable code block
-                                        st.code(content)
-                                    else:
-                                        # Regular text content
-                                        st.write(content)
-                                elif isinstance(content, (dict, list)):
-                                    # Handle dictionary and list content
-                                    try:
-                                        st.json(content)
-                                    except Exception:
-                                        st.write(str(content))
-                                else:
-                                    # Handle other content types
-                                    st.write(str(content))
-                            except Exception as e:
-                                logger.debug(f"Could not display tool content: {e}")
-                                st.error("Could not display tool results.")
-                except (Exception, RuntimeError) as e:
-                    # Handle both general exceptions and Streamlit runtime errors
-                    if isinstance(e, RuntimeError) and "This Streamlit app is no longer running" in str(e):
-                        logger.debug("Streamlit app no longer running, skipping display")
-                    else:
-                        logger.error(f"Error displaying tool call: {str(e)}")
-                        # Fallback minimal display if expander fails
-                        st.error(f"Tool call: {tool_name} (display error)")
-                        
-                # Add a small separator between tool calls for better readability
-                st.markdown("")
-                
-    except Exception as e:
-        logger.error(f"Error displaying tool calls: {str(e)}")
-        tool_calls_container.error("Failed to display tool results")
+def _fragment(run_every: float):
+    """st.fragment refreshing every run_every seconds, or a plain call on Streamlit versions without fragments."""
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    return fragment(run_every=run_every) if fragment is not None else (lambda func: func)
+
+
+# Polls the jobs without rerunning the page while any of them is active
+_ingestion_status_live = _fragment(config.INGEST_POLL_SECONDS)(_ingestion_status)
 
 
 async def knowledge_widget(halo: Team) -> None:
     """Display a knowledge widget in the sidebar."""
     st.sidebar.markdown("# :material/network_intel_node: Knowledge")
     if halo is not None and halo.knowledge is not None:
+        # Parsing, embedding and writing run in the ingestion queue; the widget only enqueues and polls
+        jobs: List[str] = st.session_state.setdefault("ingestion_jobs", [])
+
         # Add websites to knowledge base
         if "url_scrape_key" not in st.session_state:
             st.session_state["url_scrape_key"] = 0
@@ -983,18 +947,10 @@ async def knowledge_widget(halo: Team) -> None:
             key=st.session_state["url_scrape_key"],
         )
         add_url_button = st.sidebar.button("Add URL")
-        if add_url_button:
-            if input_url is not None:
-                alert = st.sidebar.info("Processing URLs...", icon="ℹ️")
-                if f"{input_url}_scraped" not in st.session_state:
-                    scraper = WebsiteReader(max_links=2, max_depth=1)
-                    web_documents: List[Document] = scraper.read(input_url)
-                    if web_documents:
-                        halo.knowledge.load_documents(web_documents, upsert=True)
-                    else:
-                        st.sidebar.error("Could not read website")
-                    st.session_state[f"{input_url}_uploaded"] = True
-                alert.empty()
+        if add_url_button and input_url:
+            job_id = ingestion_queue.submit_url(halo.knowledge, input_url)
+            if job_id not in jobs:
+                jobs.append(job_id)
 
         # Add documents to knowledge base
         if "file_uploader_key" not in st.session_state:
@@ -1004,30 +960,25 @@ async def knowledge_widget(halo: Team) -> None:
             key=st.session_state["file_uploader_key"],
         )
         if uploaded_file is not None:
-            alert = st.sidebar.info("Processing document...", icon="🧠")
-            document_name = uploaded_file.name.split(".")[0]
-            if f"{document_name}_uploaded" not in st.session_state:
-                file_type = uploaded_file.name.split(".")[-1].lower()
-
-                reader: Reader
-                if file_type == "pdf":
-                    reader = PDFReader()
-                elif file_type == "csv":
-                    reader = CSVReader()
-                elif file_type == "txt":
-                    reader = TextReader()
-                elif file_type == "docx":
-                    reader = DocxReader()
-                else:
+            # The uploader keeps its file across reruns; queue it only once
+            submitted = st.session_state.setdefault("ingested_uploads", set())
+            upload_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            if upload_key not in submitted:
+                try:
+                    job_id = ingestion_queue.submit_file(halo.knowledge, uploaded_file.name, uploaded_file.getvalue())
+                except ValueError:
                     st.sidebar.error("Unsupported file type")
                     return
-                uploaded_file_documents: List[Document] = reader.read(uploaded_file)
-                if uploaded_file_documents:
-                    halo.knowledge.load_documents(uploaded_file_documents, upsert=True)
+                submitted.add(upload_key)
+                if job_id not in jobs:
+                    jobs.append(job_id)
+
+        if jobs:
+            with st.sidebar:
+                if any(job.active for job in (ingestion_queue.get(job_id) for job_id in jobs) if job is not None):
+                    _ingestion_status_live(jobs)
                 else:
-                    st.sidebar.error("Could not read document")
-                st.session_state[f"{document_name}_uploaded"] = True
-            alert.empty()
+                    _ingestion_status(jobs)
 
         # Load and delete knowledge
         if st.sidebar.button(":material/delete: Delete Knowledge"):
@@ -1064,7 +1015,7 @@ async def session_selector(halo: Team, halo_config: HaloConfig) -> None:
                 session_id=new_session_id,
             )
             # Clear messages for new session
-            st.session_state["messages"] = []
+            st.session_state["messages"] = TranscriptStore()
             st.rerun()
 
         # Show the rename session widget if we have a valid session
@@ -1086,30 +1037,18 @@ def export_chat_history():
 
     chat_text = f"# HALO - Chat History\n\n"
     for msg in st.session_state["messages"]:
-        role_label = "🤖 Assistant" if msg["role"] == "assistant" else "👤 User"
-        chat_text += f"### {role_label}\n{msg['content']}\n\n"
+        role_label = "🤖 Assistant" if msg.role == "assistant" else "👤 User"
+        chat_text += f"### {role_label}\n{msg.content}\n\n"
 
         # Include tool calls if present
-        if msg.get("tool_calls"):
+        if msg.tool_calls:
             chat_text += "#### Tool Calls:\n"
-            for i, tool_call in enumerate(msg["tool_calls"]):
-                # Handle both dictionary-like objects and ToolExecution objects
-                if hasattr(tool_call, 'get'):
-                    # Old style: dictionary-like object with get method
-                    tool_name = tool_call.get("name", "Unknown Tool")
-                    arguments = tool_call.get("arguments", "")
-                    content = tool_call.get("content", "")
-                else:
-                    # New style: ToolExecution object in Agno 1.5.5
-                    tool_name = getattr(tool_call, "name", "Unknown Tool")
-                    arguments = getattr(tool_call, "arguments", "")
-                    content = getattr(tool_call, "content", "")
-                
-                chat_text += f"**{i + 1}. {tool_name}**\n\n"
-                if arguments:
-                    chat_text += f"Arguments: ```json\n{arguments}\n```\n\n"
-                if content:
-                    chat_text += f"Results: ```\n{content}\n```\n\n"
+            for i, tool_call in enumerate(msg.tool_calls):
+                chat_text += f"**{i + 1}. {tool_call.tool_name}**\n\n"
+                if tool_call.tool_args:
+                    chat_text += f"Arguments: ```json\n{json.dumps(tool_call.tool_args, default=str)}\n```\n\n"
+                if tool_call.result:
+                    chat_text += f"Results: ```\n{tool_call.result}\n```\n\n"
 
     return chat_text
 
@@ -1138,7 +1077,7 @@ def restart_halo():
     logger.debug("---*--- Restarting HALO ---*---")
     st.session_state["halo"] = None
     st.session_state["session_id"] = None
-    st.session_state["messages"] = []
+    st.session_state["messages"] = TranscriptStore()
     if "url_scrape_key" in st.session_state:
         st.session_state["url_scrape_key"] += 1
     if "file_uploader_key" in st.session_state:
@@ -1148,47 +1087,11 @@ def restart_halo():
 
 def discover_available_agents() -> Dict[str, str]:
     """
-    Dynamically discover available agents from the agents directory.
-    
+    Get the available agents from the agent manifest.
+
+    Agent modules are not imported here; they are loaded when a team using them is built.
+
     Returns:
         Dict[str, str]: Dictionary mapping display names to agent IDs
     """
-    agent_options = {}
-    
-    # Get the agents directory path
-    agents_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents")
-    
-    # Find all potential agent modules (files ending with _agent.py)
-    for filename in os.listdir(agents_dir):
-        if filename.endswith('_agent.py') and filename != '__init__.py':
-            module_name = filename[:-3]  # Remove .py extension
-            
-            # Skip commented out modules
-            if module_name == 'crawler_agent':
-                continue
-                
-            try:
-                # Import the module
-                module = importlib.import_module(f'agents.{module_name}')
-                
-                # Find factory functions (those starting with create_)
-                for name, obj in inspect.getmembers(module):
-                    if name.startswith('create_') and inspect.isfunction(obj):
-                        # Extract agent name from function name (remove 'create_' and '_agent' if present)
-                        agent_id = name.replace('create_', '', 1)
-                        if agent_id.endswith('_agent'):
-                            agent_id = agent_id[:-6]
-                        
-                        # Create a display name (convert snake_case to Title Case)
-                        display_name = ' '.join(word.capitalize() for word in agent_id.split('_'))
-                        
-                        # Special case for gptimage1
-                        if agent_id == 'gptimage1':
-                            display_name = 'Image Agent'
-                            
-                        # Add to agent options
-                        agent_options[display_name] = agent_id
-            except ImportError as e:
-                logger.warning(f"Could not import agent module {module_name}: {e}")
-    
-    return agent_options
+    return agent_options()